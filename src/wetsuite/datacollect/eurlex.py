@@ -8,6 +8,7 @@ import urllib.parse
 import json
 
 import wetsuite.helpers.net
+import wetsuite.helpers.util
 
 import bs4
 
@@ -28,6 +29,7 @@ def fetch_by_resource_type(typ="JUDG"):
       - 'REG'   for regulations (but there are a handful of related things)
 
     @return: a (possibly-many-item'd) nested structure (python structure, loaded from JSON)
+    For larger types this single query may time out; see iter_by_resource_type() for a paged alternative.
 
     The structure you get back looks like:  ( see also https://www.w3.org/TR/2013/REC-sparql11-results-json-20130321/ ) ::
         {
@@ -64,23 +66,45 @@ def fetch_by_resource_type(typ="JUDG"):
         }
     """
     # The proper way would be to use a library like sparqlwrapper
-    #   but for now we can get away with hardcodig a query like:
-    query = (
-        """PREFIX cdm: <http://publications.europa.eu/ontology/cdm#>
+    #   but for now we can get away with hardcodig a query
+    resp = wetsuite.helpers.net.download(_sparql_url(_resource_type_query(typ)), timeout=120)
+    return json.loads(resp)
+
+
+def _resource_type_query(typ, after_work=None, limit=None):
+    """Constructs the SPARQL query that fetch_by_resource_type() and iter_by_resource_type() send.
+
+    @param typ: the resource type, see fetch_by_resource_type()
+    @param after_work: if not None, only ask for works whose URI sorts after this one (keyset pagination)
+    @param limit: if not None, ask for the results sorted by work, and at most this many rows
+    """
+    after_filter = ""
+    if after_work is not None:
+        after_filter = 'FILTER(STR(?work) > "%s")' % after_work.replace("\\", "\\\\").replace('"', '\\"')
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "ORDER BY ?work LIMIT %d" % limit
+    return """PREFIX cdm: <http://publications.europa.eu/ontology/cdm#>
       select distinct ?work ?type ?celex ?date ?force 
       WHERE {
           ?work cdm:work_has_resource-type ?type. 
           FILTER(?type=<http://publications.europa.eu/resource/authority/resource-type/%s>)
           FILTER not exists{?work cdm:work_has_resource-type <http://publications.europa.eu/resource/authority/resource-type/CORRIGENDUM>
       } 
+      %s
       OPTIONAL { ?work cdm:resource_legal_id_celex ?celex. } 
       OPTIONAL { ?work cdm:work_date_document ?date. } 
       OPTIONAL { ?work cdm:resource_legal_in-force ?force. } 
-      FILTER not exists{?work cdm:do_not_index "true"^^<http://www.w3.org/2001/XMLSchema#boolean>}. }"""
-        % typ
+      FILTER not exists{?work cdm:do_not_index "true"^^<http://www.w3.org/2001/XMLSchema#boolean>}. } %s""" % (
+        typ,
+        after_filter,
+        limit_clause,
     )
 
-    url = "".join(
+
+def _sparql_url(query):
+    "Constructs the URL that asks the publications.europa.eu SPARQL endpoint for a query, with JSON results"
+    return "".join(
         [
             "https://publications.europa.eu/webapi/rdf/sparql?default-graph-uri=&query=",
             urllib.parse.quote(query),
@@ -88,8 +112,113 @@ def fetch_by_resource_type(typ="JUDG"):
         ]
     )
 
-    resp = wetsuite.helpers.net.download(url, timeout=120)
-    return json.loads(resp)
+
+def _sparql_json(query, cache_store=None, timeout=120):
+    """Sends a SPARQL query, returns the parsed JSON result.
+
+    If cache_store is given (a str:bytes LocalKV), the response is stored under the hash of the query,
+    and later calls with the same query return that instead of asking again.
+    """
+    cache_key = None
+    if cache_store is not None:
+        cache_key = wetsuite.helpers.util.hash_hex(query)
+        cached = cache_store.get(cache_key, missing_as_none=True)
+        if cached is not None:
+            return json.loads(cached)
+
+    resp = wetsuite.helpers.net.download(_sparql_url(query), timeout=timeout)
+    ret = json.loads(resp)  # parse before storing, so that we don't store error responses
+    if cache_store is not None:
+        cache_store.put(cache_key, resp)
+    return ret
+
+
+def iter_by_resource_type(typ="JUDG", page_size: int = 5000, cache_store=None, timeout=120):
+    """Like fetch_by_resource_type(), but fetches the results in pages, and yields one binding dict at a time
+    (the items from the 'bindings' list in that function's docstring).
+
+    This lets large resource types come through, where the single query of fetch_by_resource_type() tends to time out,
+    and means that only a page of results is in memory at a time.
+
+    Paging is done by sorting on the work URI and asking for what comes after the last one we saw,
+    rather than by OFFSET, which the endpoint refuses to do deep into large results.
+    Because a work can have multiple rows (e.g. multiple dates), we hold back the rows of the last work on a full page,
+    and ask for them again as part of the next page.
+
+    @param typ: the type to fetch, see fetch_by_resource_type()
+    @param page_size: the amount of rows to ask for per query
+    @param cache_store: optionally, a str:bytes LocalKV that result pages are cached in (keyed by a hash of the query),
+    so that re-running this (e.g. after an interruption) only asks for pages it did not get before.
+    Note that this also means you will not see changes since, unless you use a fresh store.
+    @param timeout: timeout for each page's fetch
+    @return: a generator of dicts
+    """
+    after_work = None
+    while True:
+        page = _sparql_json(
+            _resource_type_query(typ, after_work=after_work, limit=page_size),
+            cache_store=cache_store,
+            timeout=timeout,
+        )
+        bindings = page["results"]["bindings"]
+        if len(bindings) < page_size:  # last page
+            yield from bindings
+            break
+
+        last_work = bindings[-1]["work"]["value"]
+        complete = list(b for b in bindings if b["work"]["value"] != last_work)
+        if len(complete) == 0:  # a single work with more rows than a page. Unlikely, and we can't do better than this:
+            warnings.warn("More than %d rows for %r, some may be missing; consider a larger page_size" % (page_size, last_work))
+            complete = bindings
+        yield from complete
+        after_work = complete[-1]["work"]["value"]
+
+
+def fetch_html_many(celexes, store=None, lang="EN", workers: int = 4, max_per_sec: float = 2):
+    """Fetches the document pages for a series of CELEX identifiers, in parallel, and yields what extract_html() makes of them.
+
+    The fetching is done by a pool of threads (see wetsuite.helpers.net.download_many),
+    the parsing happens in the thread that consumes this generator.
+
+    @param celexes: an iterable of CELEX identifiers, e.g. from the 'celex' values of iter_by_resource_type()
+    @param store: optionally, a str:bytes LocalKV that the fetched HTML is stored in (keyed by URL, like cached_fetch()),
+    and that we read from instead of fetching, when the page is already there.
+    @param lang: the language of the page to fetch
+    @param workers: how many fetches may be in flight at the same time
+    @param max_per_sec: cap on the amount of fetches started per second, to be nice to the server
+    @return: a generator of (celex, extracted dict, exception) tuples, in order of completion rather than input order.
+    When the fetch or parse failed, the dict is None and exception is set, otherwise exception is None.
+    """
+    url_celex = {}
+    for celex in celexes:
+        url_celex["https://eur-lex.europa.eu/legal-content/%s/ALL/?uri=CELEX:%s" % (lang, celex)] = celex
+
+    def handle(url, htmlbytes):
+        try:
+            return url_celex[url], extract_html(htmlbytes), None
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            return url_celex[url], None, exc
+
+    to_fetch = []
+    for url in url_celex:
+        htmlbytes = None
+        if store is not None:
+            htmlbytes = store.get(url, missing_as_none=True)
+        if htmlbytes is None:
+            to_fetch.append(url)
+        else:
+            yield handle(url, htmlbytes)
+
+    rate_limiter = wetsuite.helpers.net.RateLimiter(max_per_sec)
+    for url, htmlbytes, exc in wetsuite.helpers.net.download_many(
+        to_fetch, workers=workers, rate_limiter=rate_limiter
+    ):
+        if exc is not None:
+            yield url_celex[url], None, exc
+            continue
+        if store is not None:
+            store.put(url, htmlbytes)
+        yield handle(url, htmlbytes)
 
 
 def extract_html(htmlbytes):
@@ -12,13 +12,81 @@ import random
 import urllib
 
 import bs4
+import lxml.etree
 import requests
 
+import wetsuite.helpers.etree
 import wetsuite.helpers.net
 import wetsuite.helpers.localdata
 import wetsuite.helpers.koop_parse
 
 
+# the XPath equivalents of the CSS selectors we used with BeautifulSoup, compiled once
+_xpath_items = lxml.etree.XPath(
+    "//ul[contains(@class,'list--sources')]/li"
+)
+_xpath_item_info_text = lxml.etree.XPath(
+    "(.//div[contains(@class,'list--source__information')])[1]/text()"
+)
+_xpath_item_href = lxml.etree.XPath("(.//a)[1]/@href")
+_xpath_folders = lxml.etree.XPath(
+    "//div/ul[contains(@class,'browse__list')]/li[contains(@class,'browse__item')]/a"
+)
+_xpath_first_text = lxml.etree.XPath("(.//text())[1]")
+_xpath_pagination = lxml.etree.XPath(
+    "//div[contains(@class,'pagination__index')]/ul/li/a/@href"
+)
+
+
+def parse_listing(pagebytes: bytes, base_url: str, parser: str = "lxml"):
+    """Picks the links we care about out of a repository.overheid.nl/frbr/ listing page.
+
+    @param pagebytes: the HTML of the page, as bytes
+    @param base_url: the URL that page came from, to resolve relative links against
+    @param parser: 'lxml' (the default) uses wetsuite.helpers.etree.parse_html and precompiled XPath expressions,
+    'bs4' uses BeautifulSoup and CSS selectors.  Both should extract the same things; the first is a good deal faster.
+    @return: a dict with keys
+      - 'items':   list of (absolute url, description), for things that are documents
+      - 'folders': list of (absolute url, text), for things that are deeper folders
+      - 'pages':   list of absolute urls, for pagination of the current listing
+    """
+    ret = {"items": [], "folders": [], "pages": []}
+    if parser == "lxml":
+        tree = wetsuite.helpers.etree.parse_html(pagebytes)
+        for li in _xpath_items(tree):
+            txt = _xpath_item_info_text(li)[0]
+            href = _xpath_item_href(li)[0]
+            ret["items"].append((urllib.parse.urljoin(base_url, href), str(txt)))
+        for a in _xpath_folders(tree):
+            texts = _xpath_first_text(a)
+            text = str(texts[0]) if len(texts) > 0 else None
+            ret["folders"].append((urllib.parse.urljoin(base_url, a.get("href")), text))
+        for href in _xpath_pagination(tree):
+            ret["pages"].append(urllib.parse.urljoin(base_url, href))
+
+    elif parser == "bs4":
+        soup = bs4.BeautifulSoup(pagebytes, features="lxml")
+        for li in soup.select("ul[class*='list--sources'] > li "):
+            si = li.select("div[class*='list--source__information'] ")[0]
+            a = li.find("a")
+            txt = si.find_all(string=True, recursive=False)[0]
+            ret["items"].append((urllib.parse.urljoin(base_url, a.get("href")), str(txt)))
+        for a in soup.select(
+            "div > ul[class*='browse__list'] > li[class*='browse__item'] > a "
+        ):
+            text = a.find(string=True)
+            if text is not None:
+                text = str(text)
+            ret["folders"].append((urllib.parse.urljoin(base_url, a.get("href")), text))
+        for a in soup.select("div[class*='pagination__index'] > ul > li > a"):
+            ret["pages"].append(urllib.parse.urljoin(base_url, a.get("href")))
+
+    else:
+        raise ValueError("Don't know parser %r, expected 'lxml' or 'bs4'" % parser)
+
+    return ret
+
+
 class FRBRFetcher:
     """Helper class to fetch data from an area of https://repository.overheid.nl/frbr/
     See the constructor's docstring for more.
@@ -28,7 +96,7 @@ class FRBRFetcher:
     (SFTP imitating anonymous FTP, which is a grea idea in theory).
     """
 
-    def __init__(self, fetch_store, cache_store, verbose=True, waittime_sec=1.0):
+    def __init__(self, fetch_store, cache_store, verbose=True, waittime_sec=1.0, workers=1, max_per_sec=None, parser="lxml"):
         """Hand in two LocalKV-style stores: 
         - one that the documents will get fetched into (almost all useful content), 
         - one that the intermediate folders get fetched into (mostly pointless outside of this fetcher)
@@ -45,7 +113,14 @@ class FRBRFetcher:
         @param fetch_store:
         @param cache_store:
         @param verbose:
-        @param waittime_sec: How long to sleep after every actual network fetch, to be nicer to the servers.
+        @param waittime_sec: How long to sleep after every actual network fetch of a folder or page, to be nicer to the servers.
+        @param workers: how many of the documents listed in a folder to download at the same time.
+        This hides latency; it does not by itself make for more requests per second, see max_per_sec.
+        The default, 1, fetches one at a time.
+        @param max_per_sec: an overall cap on the amount of document downloads started per second
+        (shared between the workers). None means no cap, which is only advisable with few workers.
+        @param parser: how to parse the listing pages, see parse_listing(). 
+        'lxml' is faster; 'bs4' is what we used before, and is kept in case the site changes in a way only it copes with.
         """
         self.fetch_store = fetch_store
         self.cache_store = cache_store
@@ -54,6 +129,9 @@ class FRBRFetcher:
         self.to_fetch_folders = set()
         self.fetched = {}  # url -> True
         self.waittime_sec = waittime_sec
+        self.workers = max(1, int(workers))
+        self.rate_limiter = wetsuite.helpers.net.RateLimiter(max_per_sec)
+        self.parser = parser
         self.count_fetches = 0
         self.count_cacheds = 0
         self.count_items = 0
@@ -128,6 +206,49 @@ class FRBRFetcher:
                 print("ADD_FOL", folder_url)
             self.to_fetch_folders.add(folder_url)
 
+    def fetch_items(self, items):
+        """Fetch documents into the fetch_store, skipping those we already have.
+
+        The downloads are done by up to self.workers threads (subject to max_per_sec),
+        the store writes happen in this thread, and are committed once at the end, rather than per item.
+        Mostly intended to be used by handle_url()
+
+        @param items: a list of (url, description) tuples, the description is only used in verbose output
+        """
+        descriptions = {}
+        for fil_absurl, txt in items:
+            if fil_absurl in self.fetch_store:
+                self.count_items += 1
+                self.count_cacheds += 1
+                if self.verbose >= 2:
+                    print(f" ITEM CACHED  {txt:25s}  {fil_absurl}")
+            else:
+                descriptions[fil_absurl] = txt
+
+        if len(descriptions) == 0:
+            return
+
+        try:
+            for fil_absurl, data, exc in wetsuite.helpers.net.download_many(
+                descriptions, workers=self.workers, rate_limiter=self.rate_limiter
+            ):
+                txt = descriptions[fil_absurl]
+                if exc is None:
+                    try:
+                        self.fetch_store.put(fil_absurl, data, commit=False)
+                        self.count_items += 1
+                        self.count_fetches += 1
+                        if self.verbose >= 2:
+                            print(f" ITEM FETCHED {txt:25s}  {fil_absurl}")
+                    except Exception as e:  # e.g. OperationalError
+                        print(f" ERROR TODO:HANDLE {repr(e):25s}  {fil_absurl}")
+                elif isinstance(exc, ValueError):  # probably a 404
+                    print(f" ERROR {repr(exc):25s}  {fil_absurl}")
+                else:
+                    print(f" ERROR TODO:HANDLE {repr(exc):25s}  {fil_absurl}")
+        finally:
+            self.fetch_store.commit()
+
     def handle_url(self, h_url, is_folder=False):
         """handle a URL that should be what we consider either a page or folder"""
         if is_folder:
@@ -143,39 +264,13 @@ class FRBRFetcher:
                 # TODO: count error
                 return
         self.fetched[h_url] = True
-        soup = bs4.BeautifulSoup(pagebytes, features="lxml")
+        listing = parse_listing(pagebytes, h_url, parser=self.parser)
         # browse items that are files - download
-        for li in soup.select("ul[class*='list--sources'] > li "):
-            si = li.select("div[class*='list--source__information'] ")[0]
-            a = li.find("a")
-            txt = si.find_all(string=True, recursive=False)[0]
-            fil_absurl = urllib.parse.urljoin(h_url, a.get("href"))
-            try:
-                _, cached = wetsuite.helpers.localdata.cached_fetch(
-                    self.fetch_store, fil_absurl
-                )
-                self.count_items += 1
-                if cached:
-                    self.count_cacheds += 1
-                    if self.verbose >= 2:
-                        print(f" ITEM CACHED  {txt:25s}  {fil_absurl}")
-                else:
-                    self.count_fetches += 1
-                    if self.verbose >= 2:
-                        print(f" ITEM FETCHED {txt:25s}  {fil_absurl}")
-            except ValueError as ve:  # probably a 404
-                print(f" ERROR {repr(ve):25s}  {fil_absurl}")
-            except Exception as e:  # e.g. OperationalError
-                print(f" ERROR TODO:HANDLE {repr(e):25s}  {fil_absurl}")
+        self.fetch_items(listing["items"])
         # browse items that are folders - recurse
-        folder_soup = soup.select(
-            "div > ul[class*='browse__list'] > li[class*='browse__item'] > a "
-        )
-        folder_names = list(a.find(string=True) for a in folder_soup)
+        folder_names = list(text for _, text in listing["folders"])
         chosen_types = wetsuite.helpers.koop_parse.prefer_types(folder_names)
-        for a in folder_soup:
-            fol_absurl = urllib.parse.urljoin(h_url, a.get("href"))
-            text = a.find(string=True)
+        for fol_absurl, text in listing["folders"]:
             # self.itemlinks[ fol_absurl ] = text
             # TODO: change to 'decide what subset to fetch based on what there is'
             if text not in chosen_types:
@@ -190,8 +285,7 @@ class FRBRFetcher:
                 ):
                     self.add_folder(fol_absurl)
         # get links to other pagination - add and get to eventually
-        for a in soup.select("div[class*='pagination__index'] > ul > li > a"):
-            pag_absurl = urllib.parse.urljoin(h_url, a.get("href"))
+        for pag_absurl in listing["pages"]:
             if "start=" in pag_absurl:
                 if (
                     pag_absurl not in self.fetched
@@ -17,9 +17,10 @@ I'm not sure whether we're supposed to use it like this, but it's one of the bet
 """
 
 import re
+import json
+import datetime
 import urllib.parse
 
-# import json
 # import requests
 
 import wetsuite.helpers.net
@@ -119,6 +120,185 @@ def parse_search_results(tree):
     return ret
 
 
+def search_all(params, page_size: int = 1000, rate_limiter=None):
+    """Pages through all results for a search,
+    by repeating search() with increasing 'from' until a page comes back less than full.
+
+    Yields the same dicts that parse_search_results() returns, one at a time,
+    so that you don't need to hold all of a large result in memory.
+
+    @param params: like search()'s, but should not include 'from' or 'max', since we control those.
+    @param page_size: how many results to ask for per search request; 1000 is the maximum the service allows.
+    @param rate_limiter: optionally, a wetsuite.helpers.net.RateLimiter to wait on before each search request.
+    @return: a generator of dicts.
+    """
+    params = list(params.items()) if isinstance(params, dict) else list(params)
+    offset = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        tree = search(params + [("from", str(offset)), ("max", str(page_size))])
+        entries = parse_search_results(tree)
+        yield from entries
+        if len(entries) < page_size:
+            break
+        offset += len(entries)
+
+
+def _modified_ranges(modified_from, modified_to, interval):
+    """Splits a datetime range into consecutive (start, end) string pairs, in the format the 'modified' search parameter wants.
+    Helper for harvest()
+    """
+    ret = []
+    start = modified_from
+    while start < modified_to:
+        end = min(start + interval, modified_to)
+        ret.append((start.strftime("%Y-%m-%dT%H:%M:%S"), end.strftime("%Y-%m-%dT%H:%M:%S")))
+        start = end
+    return ret
+
+
+def _fetch_content(content_store, entries, refetch_existing, workers, rate_limiter, verbose):
+    """Fetches and stores the content documents for a batch of search result dicts, committing once at the end.
+    Helper for harvest(); alters the dicts of failed fetches to have an 'error' key.
+    """
+    by_url = {}
+    for entry in entries:
+        if refetch_existing or entry["xml"] not in content_store:
+            by_url[entry["xml"]] = entry
+    try:
+        for url, data, exc in wetsuite.helpers.net.download_many(
+            by_url, workers=workers, rate_limiter=rate_limiter
+        ):
+            if exc is None:
+                content_store.put(url, data, commit=False)
+            else:
+                by_url[url]["error"] = repr(exc)
+                if verbose:
+                    print(" ERROR %r  %s" % (exc, url))
+    finally:
+        content_store.commit()
+    if verbose:
+        print(" fetched %d of %d documents" % (len(by_url), len(entries)))
+
+
+def _record_failures(checkpoint_store, checkpoint_key, entries):
+    """Remembers the search result dicts whose content fetch failed (under checkpoint_key+':failed:'+url, as JSON),
+    and forgets those that worked this time, so that harvest() can retry them on a later call.
+    Helper for harvest()
+    """
+    prefix = checkpoint_key + ":failed:"
+    for entry in entries:
+        key = prefix + entry["xml"]
+        if "error" in entry:
+            checkpoint_store.put(key, json.dumps( dict( (k, v)  for k, v in entry.items()  if k != "error" ) ), commit=False)
+        elif key in checkpoint_store:
+            checkpoint_store.delete(key, commit=False)
+    checkpoint_store.commit()
+
+
+def harvest(
+    content_store,
+    modified_from,
+    modified_to=None,
+    interval=datetime.timedelta(days=1),
+    params=(("return", "DOC"),),
+    workers: int = 4,
+    max_per_sec: float = 5,
+    refetch_existing: bool = True,
+    checkpoint_store=None,
+    checkpoint_key: str = "rechtspraaknl_harvest_modified",
+    verbose: bool = False,
+):
+    """Fetches the content XML for everything that was modified within a date range, into a store,
+    yielding the search result dicts as it goes.
+
+    This is meant for keeping a local mirror up to date (and for creating one, 
+    though see the module docstring for a cheaper start):
+      - the range is split into smaller 'modified' intervals, each of which is paged through with search_all()
+      - for each page of results, the content?id= documents are downloaded by a pool of threads (see wetsuite.helpers.net.download_many)
+        and are put() into content_store, keyed by that URL (the same way cached_fetch() would), committed once per page
+      - when you hand in a checkpoint_store, the end of each completed interval is recorded in it,
+        and a later call with the same checkpoint_key starts from there rather than from modified_from,
+        so you can restart after interruption, or run this regularly with an old modified_from and only get new changes.
+        Documents that failed to fetch are also recorded there, and retried (and yielded again) at the start of the next call,
+        so that moving the checkpoint past them does not leave them missing.
+
+    For example::
+        store = wetsuite.helpers.localdata.LocalKV('rechtspraaknl_content.db', str, bytes)
+        checkpoints = wetsuite.helpers.localdata.LocalKV('rechtspraaknl_checkpoints.db', str, str)
+        for entry in harvest(store, datetime.datetime(2024,1,1), checkpoint_store=checkpoints):
+            pass
+
+    @param content_store: a str:bytes LocalKV to store the content XML into
+    @param modified_from: datetime (or date) to start at
+    @param modified_to: datetime (or date) to end at, defaults to now
+    @param interval: timedelta of the ranges to search in. Smaller means less lost work on interruption, larger means fewer requests.
+    @param params: other search parameters, see search().  The default asks for only things that have documents.
+    @param workers: how many content fetches may be in flight at the same time
+    @param max_per_sec: cap on the amount of requests (searches and content fetches together) started per second.
+    @param refetch_existing: whether to fetch documents that are already in the store. 
+    True by default, because appearing in a 'modified' range means the document changed.
+    Set to False e.g. when you pre-filled the store from the bulk download, and are filling in what it lacks.
+    @param checkpoint_store: a str:str LocalKV to record progress (and failed fetches) in, or None to not do so.
+    @param checkpoint_key: the key to record progress under, in case you use the same checkpoint store for different harvests.
+    @param verbose: whether to print progress
+    @return: a generator of dicts as parse_search_results() gives them,
+    which get an additional 'error' key (with a string) if fetching the content failed.
+    """
+    if not isinstance(modified_from, datetime.datetime):  # also accept dates
+        modified_from = datetime.datetime.combine(modified_from, datetime.time())
+    if modified_to is None:
+        modified_to = datetime.datetime.now()
+    elif not isinstance(modified_to, datetime.datetime):
+        modified_to = datetime.datetime.combine(modified_to, datetime.time())
+
+    if checkpoint_store is not None:
+        done_until = checkpoint_store.get(checkpoint_key, missing_as_none=True)
+        if done_until is not None:
+            done_until = datetime.datetime.strptime(done_until, "%Y-%m-%dT%H:%M:%S")
+            if done_until > modified_from:
+                if verbose:
+                    print("CHECKPOINT: continuing from %s" % done_until)
+                modified_from = done_until
+
+    params = list(params.items()) if isinstance(params, dict) else list(params)
+    rate_limiter = wetsuite.helpers.net.RateLimiter(max_per_sec)
+
+    if checkpoint_store is not None:
+        prefix = checkpoint_key + ":failed:"
+        retry = list( json.loads(value)  for key, value in checkpoint_store.iteritems()  if key.startswith(prefix) )
+        if len(retry) > 0:
+            if verbose:
+                print("RETRYING %d fetches that failed before" % len(retry))
+            _fetch_content(content_store, retry, True, workers, rate_limiter, verbose)
+            _record_failures(checkpoint_store, checkpoint_key, retry)
+            yield from retry
+
+    for range_start, range_end in _modified_ranges(modified_from, modified_to, interval):
+        if verbose:
+            print("RANGE %s .. %s" % (range_start, range_end))
+        range_params = params + [("modified", range_start), ("modified", range_end)]
+
+        page = []
+        for entry in search_all(range_params, rate_limiter=rate_limiter):
+            page.append(entry)
+            if len(page) >= 1000:
+                _fetch_content(content_store, page, refetch_existing, workers, rate_limiter, verbose)
+                if checkpoint_store is not None:
+                    _record_failures(checkpoint_store, checkpoint_key, page)
+                yield from page
+                page = []
+        if len(page) > 0:
+            _fetch_content(content_store, page, refetch_existing, workers, rate_limiter, verbose)
+            if checkpoint_store is not None:
+                _record_failures(checkpoint_store, checkpoint_key, page)
+            yield from page
+
+        if checkpoint_store is not None:  # (failures in this range were recorded above, so it is safe to move past it)
+            checkpoint_store.put(checkpoint_key, range_end)
+
+
 def _para_text(treenode):
     """Given the open-rechtspraak XML,
     specifically the uitspraak or conclusie node under the root,
@@ -239,10 +419,11 @@ def parse_content(tree):
     TODO: actually read the schema - see https://www.rechtspraak.nl/Uitspraken/paginas/open-data.aspx
     """
     if isinstance(tree, bytes):  # be robust to people not reading the documentation
-        tree = wetsuite.helpers.etree.fromstring(tree)
+        tree = wetsuite.helpers.etree.fromstring_stripped(tree)  # our own, so no need to copy
+    else:
+        tree = wetsuite.helpers.etree.strip_namespace(tree)
 
     ret = {}
-    tree = wetsuite.helpers.etree.strip_namespace(tree)
 
     for descr in tree.findall(
         "RDF/Description"
@@ -11,6 +11,7 @@ import time
 import urllib.parse
 
 import bs4
+import lxml.etree
 
 import wetsuite.helpers.net
 import wetsuite.helpers.strings
@@ -94,8 +95,20 @@ doctypes = [
 # In both cases, the first is the form value, the second the description. These currently match.
 
 
+# XPath equivalents of the CSS selectors used in scrape_pagination, compiled once
+def _xpath_has_class(classname):
+    " XPath condition for what CSS would write as .classname "
+    return "contains(concat(' ', normalize-space(@class), ' '), ' %s ')"%classname
 
-def scrape_pagination(doctype, detail_page_callback,  from_date=None, to_date=None, debug=False):
+_xpath_paging_links = lxml.etree.XPath(
+    "//ul[%s]//li//a"%_xpath_has_class('paging__numbers') )
+_xpath_result_items = lxml.etree.XPath(
+    "//main//ol[%s]//li[%s]"%(_xpath_has_class('results'), _xpath_has_class('results__item')) )
+_xpath_result_item_link = lxml.etree.XPath(
+    ".//a[%s]"%_xpath_has_class('publication') )
+
+
+def scrape_pagination(doctype, detail_page_callback,  from_date=None, to_date=None, debug=False, parser='bs4'):
     ''' Go through the pagination for a specific document type,
         calls a callback for each item's detail page URL.
 
@@ -122,7 +135,13 @@ def scrape_pagination(doctype, detail_page_callback,  from_date=None, to_date=No
         @param detail_page_callback: this is called for each item. It should accept two arguments
           - soup fragment for it on the pagination page (you can often ignore this)
           - a detail page URL
+
+        @param parser: 'bs4' parses the pagination pages with BeautifulSoup, and hands soup fragments to your callback.
+        'lxml' uses wetsuite.helpers.etree.parse_html and precompiled XPath, which is faster,
+        and hands lxml.html elements to your callback instead - so only use it if your callback doesn't care about that fragment, or can deal with that.
     '''
+    if parser not in ('bs4', 'lxml'):
+        raise ValueError("Don't know parser %r, expected 'lxml' or 'bs4'"%parser)
 
     if from_date is None and to_date is None:
         from_date = (datetime.datetime.now() - datetime.timedelta(days=4*7))
@@ -163,9 +182,14 @@ def scrape_pagination(doctype, detail_page_callback,  from_date=None, to_date=No
         if debug:
             print('PAGE', result_page_url)
         page_bytes = wetsuite.helpers.net.download( result_page_url ) # fetch
-        result_page_soup = bs4.BeautifulSoup(page_bytes, features='lxml') # parse HTML
-        for a in result_page_soup.select("ul.paging__numbers li a"): # look for links to other pages
-            other_page_url = a.get('href')
+        if parser == 'lxml':
+            result_page_tree = wetsuite.helpers.etree.parse_html(page_bytes) # parse HTML
+            other_page_urls = list( a.get('href') for a in _xpath_paging_links(result_page_tree) ) # look for links to other pages
+        else:
+            result_page_soup = bs4.BeautifulSoup(page_bytes, features='lxml') # parse HTML
+            other_page_urls = list( a.get('href') for a in result_page_soup.select("ul.paging__numbers li a") ) # look for links to other pages
+
+        for other_page_url in other_page_urls:
             if 'pagina' in other_page_url  and  other_page_url not in pagination_fetched:
                 pagination_to_fetch.add(other_page_url) # add to the 'still to fetch' set
                 if 'pagina=50' in other_page_url:
@@ -175,10 +199,15 @@ def scrape_pagination(doctype, detail_page_callback,  from_date=None, to_date=No
         pagination_fetched[result_page_url] = True
         time.sleep(2)  # be slightly nice to the server  (makes up most of the time spent)
 
-        for li in result_page_soup.select('main ol.results li.results__item'):
+        if parser == 'lxml':
+            result_items = list( (li, _xpath_result_item_link(li)[0])  for li in _xpath_result_items(result_page_tree) )
+        else:
+            result_items = list( (li, li.select('a.publication')[0])  for li in result_page_soup.select('main ol.results li.results__item') )
+
+        for li, a in result_items:
             # each result item on that page is mostly a short summary,
             #   and a link to a detail page at another URL, which duplicates most information so we only focus on the detail page
-            a = li.select('a.publication')[0] # assumes there is just one a in the item / li
+            #   (we assume there is just one a in the item / li)
             url = urllib.parse.urljoin( result_page_url, a.get('href') ) # relative to the page, so resolve it relative to the page URL we're on
 
             detail_page_callback(li, url)
@@ -100,7 +100,7 @@ class SRUBase:
         if readable:
             tree = wetsuite.helpers.etree.fromstring(r.content)
             if strip_namespaces is True:
-                tree = wetsuite.helpers.etree.strip_namespace(
+                wetsuite.helpers.etree.strip_namespace_inplace(
                     tree
                 )  # easier without namespaces
             tree = wetsuite.helpers.etree.indent(tree)
@@ -123,8 +123,7 @@ class SRUBase:
         if self.verbose:
             print(url)
         r = requests.get(url, timeout=timeout)
-        tree = wetsuite.helpers.etree.fromstring(r.content)
-        tree = wetsuite.helpers.etree.strip_namespace(tree)  # easier without namespaces
+        tree = wetsuite.helpers.etree.fromstring_stripped(r.content)  # easier without namespaces
 
         explain = tree.find("record/recordData/explain")
 
@@ -285,27 +284,24 @@ class SRUBase:
 
         # easier without namespaces, they serve no disambiguating function in most of these cases anyway
         # TODO: think about that, user code may not expact that
-        tree = wetsuite.helpers.etree.strip_namespace(tree)
+        wetsuite.helpers.etree.strip_namespace_inplace(tree)  # we just parsed it, so no need to copy
 
         # TODO: it seems some errors messages are actually incorrect XML; figure out whether we want to handle that
 
         if tree.tag == "diagnostics":  # TODO: figure out if this actually happened
             raise RuntimeError(
                 "SRU server said: "+
-                wetsuite.helpers.etree.strip_namespace(tree)
-                .find("diagnostic/message")
+                tree.find("diagnostic/message")
                 .text
             )
         elif tree.find("diagnostics") is not None:
             raise RuntimeError(
                 "SRU server said: "+
-                wetsuite.helpers.etree.strip_namespace(tree)
-                .find("diagnostics/diagnostic/message")
+                tree.find("diagnostics/diagnostic/message")
                 .text
             )
 
         elif tree.tag == "explainResponse":
-            tree = wetsuite.helpers.etree.strip_namespace(tree)  # bit lazy
             raise RuntimeError("SRU search returned explain response instead")
 
         if verbose:
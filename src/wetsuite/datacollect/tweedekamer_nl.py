@@ -22,6 +22,11 @@
     (though we can get those via e.g. https://zoek.officielebekendmakingen.nl/dossier/36267)
 """
 
+import io
+import urllib.parse
+
+import lxml.etree
+
 import wetsuite.helpers.net
 import wetsuite.helpers.etree
 
@@ -108,14 +113,13 @@ def fetch_all(soort="Persoon", break_actually=False, timeout=60):
 
     This is not immediately useful,
     and you probably want to feed this into L{merge_etrees} to make a single large document
-    (some types are hundreds of MByte, though).
+    (some types are hundreds of MByte, though - see L{iter_entries} for a way to avoid holding all of that in memory).
     """
     url = f"{SYNCFEED_BASE}Feed?category=%s" % soort
     ret = []
     while True:
         xml = wetsuite.helpers.net.download(url, timeout=timeout)
-        tree = wetsuite.helpers.etree.fromstring(xml)
-        tree = wetsuite.helpers.etree.strip_namespace(tree)
+        tree = wetsuite.helpers.etree.fromstring_stripped(xml)
 
         # is there a next page?
         url = None
@@ -216,3 +220,81 @@ def entry_dicts(feed_etree):
     for entry_node in feed_etree.findall("entry"):
         ret.append(_entry_dict_from_node(entry_node))
     return ret
+
+
+_ATOM_NS = "http://www.w3.org/2005/Atom"
+
+
+def _iterparse_feed_page(xmlbytes):
+    """Helper for L{iter_entries}: parses a single SyncFeed page incrementally,
+    yielding a dict (see L{_entry_dict_from_node}) for each entry,
+    and clearing each entry once handled, so that the page's tree never fully exists in memory.
+
+    @return: (as the generator's return value, so use  next_url = yield from ...)
+    the href of the rel="next" link, or None if there was none.
+    """
+    next_url = None
+    for _, elem in lxml.etree.iterparse(
+        io.BytesIO(xmlbytes),
+        events=("end",),
+        tag=("{%s}entry" % _ATOM_NS, "{%s}link" % _ATOM_NS),
+    ):
+        parent = elem.getparent()
+        if parent is None or parent.getparent() is not None:
+            continue  # not directly under the feed element (e.g. a link inside an entry), which we handle as part of that entry
+
+        if elem.tag == "{%s}link" % _ATOM_NS:
+            if elem.get("rel") == "next":
+                next_url = elem.get("href")
+        else:
+            wetsuite.helpers.etree.strip_namespace_inplace(elem)  # it's ours, and cleared right after
+            yield _entry_dict_from_node(elem)
+
+        # free what we have handled, and what came before it
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
+    return next_url
+
+
+def iter_entries(soort="Persoon", skiptoken=None, state_store=None, timeout=60):
+    """Fetches all feed items of a single soort, like L{fetch_all}, but yields them one at a time
+    (as the same dicts that L{entry_dicts} gives you),
+    and parses each page incrementally, so that memory use does not grow with the size of the soort.
+
+    It can also continue where it left off, because the rel="next" links contain a skiptoken:
+      - if you hand in a skiptoken, we start from there
+      - if you hand in a state_store (a str:str LocalKV), we record the skiptoken after every page we have completely yielded,
+        and if you did not hand in a skiptoken, we start from the one we recorded.
+        After the last page, we record the skiptoken that fetched that last page,
+        which means a later run re-yields that page's entries, and then everything that changed since.
+
+    @param soort: what object type to fetch, see L{fetch_all}
+    @param skiptoken: where to start, None means from the start (or from the state_store, if given)
+    @param state_store: a LocalKV to keep the skiptoken in, under a key like 'skiptoken_Persoon'
+    @param timeout: timeout of each page fetch
+    @return: a generator of dicts
+    """
+    state_key = "skiptoken_%s" % soort
+    if skiptoken is None and state_store is not None:
+        skiptoken = state_store.get(state_key, missing_as_none=True)
+
+    params = {"category": soort}
+    if skiptoken is not None:
+        params["skiptoken"] = skiptoken
+    url = f"{SYNCFEED_BASE}Feed?" + urllib.parse.urlencode(params)
+
+    while url is not None:
+        xml = wetsuite.helpers.net.download(url, timeout=timeout)
+        next_url = yield from _iterparse_feed_page(xml)
+        del xml
+
+        if next_url is not None:
+            page_skiptoken = urllib.parse.parse_qs(urllib.parse.urlparse(next_url).query).get("skiptoken", [None])[0]
+        else:
+            page_skiptoken = skiptoken
+        if state_store is not None and page_skiptoken is not None:
+            state_store.put(state_key, page_skiptoken)
+        skiptoken = page_skiptoken
+
+        url = next_url
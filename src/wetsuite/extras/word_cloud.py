@@ -55,10 +55,12 @@ def count_from_stringlist(string_list: List[str], stopwords=(), stopwords_i=()):
 
 
 def merge_counts(count_dicts: List[dict]):
-    " Take a sequence of string-to-count dicts,  add counts together into one dict "
+    """ Take a sequence of string-to-count dicts,  add counts together into one dict 
+        (For counting a whole corpus, also look at wetsuite.helpers.counting, which need not keep everything in memory)
+    """
     count = collections.Counter()
     for count_dict in count_dicts:
-        count += collections.Counter( count_dict )
+        count.update( count_dict )  # (rather than +=, which makes a new Counter each time, so becomes slow with many dicts)
     return count
 
 
@@ -0,0 +1,323 @@
+"""
+An index of which documents cite what, built from the output of wetsuite.helpers.patterns.find_references().
+
+Answering questions like "which rulings cite ECLI:NL:HR:2005:AT4537",
+"which documents cite BWBR0005537 artikel 8:1", or "what laws were cited most in 2020"
+from the reference lists themselves means going through all of them each time.
+
+This module normalizes each reference into a (kind, target, detail) edge, e.g.
+  - C{('ecli', 'ECLI:NL:HR:2005:AT4537', '')}
+  - C{('artikel', 'BWBR0005537', '8:1')}
+  - C{('bekend', 'stb-2000-123', '')}   (a C{Stb. 2000, 123} vindplaats becomes the same thing as the identifier)
+and stores those edges in an indexed sqlite table, so that those questions become lookups.
+
+For example::
+    refs  = wetsuite.helpers.localdata.MsgpackKV('rechtspraak_refs.db')   # e.g. filled by patterns.find_references_many
+    index = CitationIndex('rechtspraak_citations.db')
+    index.update_from_store( refs )          # only does the documents it has not seen yet
+    index.cited_by('ECLI:NL:HR:2005:AT4537')
+    index.cited_by('BWBR0005537', '8:1')
+    index.most_cited(kind='bwb', year=2020)
+
+The index is a plain sqlite file (path handling like LocalKV), so you can also query it yourself, e.g.
+C{sqlite3 citations.db 'select target, count(*) from edges group by target order by 2 desc limit 10'}
+"""
+
+import re
+import sqlite3
+import warnings
+
+import wetsuite.helpers.meta
+import wetsuite.helpers.localdata
+
+
+_law_ids_cache = None
+
+
+def _law_ids():
+    """ Law name -> BWB-id, for the names that map to exactly one BWB-id, loaded on first use (see patterns._wetnamen).
+        If that cannot be loaded, we warn and use an empty dict, meaning artikel references are indexed under the law's name.
+    """
+    global _law_ids_cache
+    if _law_ids_cache is None:
+        import wetsuite.helpers.patterns # only when needed
+        try:
+            _law_ids_cache = {}
+            for name, bwbids in wetsuite.helpers.patterns._wetnamen().items(): # pylint: disable=protected-access
+                if isinstance(bwbids, str):
+                    bwbids = [bwbids]
+                if len( set(bwbids) ) == 1:
+                    _law_ids_cache[name.lower()] = bwbids[0]
+        except Exception as e: # mostly network trouble, pylint: disable=broad-exception-caught
+            warnings.warn( 'Could not load law names (%s), artikel references will be indexed by name'%e )
+            _law_ids_cache = {}
+    return _law_ids_cache
+
+
+_RE_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_reference(match:dict, law_ids:dict=None):
+    """ Turns a single match from find_references() into the (kind, target, detail) we index on,
+        or None if it is not something we can usefully point at (e.g. an artikel without a law we know).
+
+        Matches that find_references() marked 'invalid' (its details function did not understand them) are skipped,
+        except for CELEX numbers that parse once we strip trailing punctuation (a CELEX followed by a comma is marked invalid).
+
+        @param match: a dict as find_references() returns them in its list.
+
+        @param law_ids: a dict from lowercased law name to BWB-id, used to turn artikel references with a nameref
+        into the law they point at. If None, we use one based on the wetnamen dataset (see _law_ids).
+        Names we do not know (or a law_ids of {}) mean the target is the name as it was written.
+
+        @return: a (kind, target, detail) tuple of strings, where
+          - kind is C{'ecli'}, C{'celex'}, C{'bwb'}, C{'cvdr'}, C{'ljn'}, C{'bekend'}, C{'kamerstukken'}, C{'euoj'}, C{'eudir'}, C{'eureg'},
+            or C{'artikel'} (target is then a BWB-id or law name, and detail the article number),
+          - detail is '' for everything but artikel references.
+    """
+    kind = match['type']
+    text = match['text']
+    details = match.get('details') or {}
+
+    if kind == 'ecli':
+        return 'ecli', details.get('normalized', text.upper().rstrip('.')), ''
+
+    if kind == 'celex':
+        # the match can include trailing punctuation (e.g. '32016R0679,' from a sentence), which parse_celex would not accept
+        text = text.strip().rstrip('.,;:')
+        try:
+            return 'celex', wetsuite.helpers.meta.parse_celex( text )['id'], ''
+        except ValueError:
+            if match.get('invalid', False):
+                return None
+            return 'celex', text.upper(), ''
+
+    if match.get('invalid', False):
+        return None
+
+    if kind == 'bwb':
+        return 'bwb', text.upper(), ''
+
+    if kind == 'cvdr':
+        if 'workid' in details:
+            return 'cvdr', 'CVDR%s'%details['workid'], ''
+        return 'cvdr', text.upper(), ''
+
+    if kind == 'vindplaats':
+        if details.get('nummer') is None:
+            return None
+        return 'bekend', '%s-%s-%s'%(details['what'].lower(), details['jaar'], details['nummer']), ''
+
+    if kind == 'bekend':
+        return 'bekend', text.lower(), ''
+
+    if kind == 'artikel':
+        if 'artikel' not in details  or  'nameref' not in details:
+            return None
+        if law_ids is None:
+            law_ids = _law_ids()
+        nameref = _RE_WHITESPACE.sub(' ', details['nameref']).strip()
+        return 'artikel', law_ids.get(nameref.lower(), nameref), details['artikel']
+
+    # the less structured ones: only normalize whitespace
+    return kind, _RE_WHITESPACE.sub(' ', text).strip(), ''
+
+
+_ANY_KIND = '*'
+_ANY_YEAR = -1
+_UNKNOWN_YEAR = 0
+
+
+def _count_keys(edges, year):
+    """ For the (kind, target) pairs a document cites, the counts rows that document contributes to
+        (each target once per kind and once for any kind, each for its year and for any year).
+    """
+    if year is None:
+        year = _UNKNOWN_YEAR
+    keys = set()
+    for kind, target in edges:
+        for count_kind in (kind, _ANY_KIND):
+            keys.add( (count_kind, target, year) )
+            keys.add( (count_kind, target, _ANY_YEAR) )
+    return sorted(keys)
+
+
+class CitationIndex:
+    """ A sqlite-backed index of (source document) -> (kind, target, detail) edges.
+
+        Adding a source again replaces its edges, so you can update it incrementally,
+        e.g. as more documents get fetched and have their references extracted.
+
+        @ivar conn: connection to the sqlite database that we set up
+        @ivar path: the path we opened (after resolving, see localdata.resolve_path)
+        @ivar read_only: whether we have told ourselves to treat this as read-only.
+    """
+
+    def __init__(self, path, read_only:bool=False, law_ids:dict=None):
+        """
+        @param path: database name/path, resolved like LocalKV does it (so a bare name goes to the wetsuite directory, and ':memory:' works)
+        @param read_only: refuse writes (and tell sqlite so)
+        @param law_ids: handed to normalize_reference()
+        """
+        self.path = wetsuite.helpers.localdata.resolve_path( path )
+        self.read_only = read_only
+        self.law_ids = law_ids
+
+        self.conn = sqlite3.connect( self.path, timeout=3.0 )
+        with self.conn:
+            if self.read_only:
+                self.conn.execute("PRAGMA query_only = true")
+            else:
+                # the source's year is kept separately so that per-year questions do not need to parse anything
+                self.conn.execute("CREATE TABLE IF NOT EXISTS sources (source text PRIMARY KEY NOT NULL, year integer)")
+                self.conn.execute("CREATE TABLE IF NOT EXISTS edges (source text NOT NULL, kind text NOT NULL, target text NOT NULL, detail text NOT NULL, count integer NOT NULL)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS edges_target ON edges (target, detail)")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS edges_source ON edges (source)")
+                # counts of citing documents per (kind, target, year), kept up to date by add() and remove(),
+                #   so that most_cited() is an index lookup rather than a GROUP BY over all edges.
+                #   Also has rows for any kind (_ANY_KIND) and any year (_ANY_YEAR); an unknown year is stored as _UNKNOWN_YEAR.
+                self.conn.execute("CREATE TABLE IF NOT EXISTS counts (kind text NOT NULL, target text NOT NULL, year integer NOT NULL, n integer NOT NULL, PRIMARY KEY (kind, target, year))")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS counts_top ON counts (kind, year, n)")
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Attempted to alter a CitationIndex that was opened read-only")
+
+    def add(self, source:str, matches:list, year:int=None, commit:bool=True):
+        """ Indexes the references of one document, replacing whatever we had for it.
+
+            References to the source itself (e.g. a ruling mentioning its own ECLI) are left out.
+
+            @param source: the document's identifier, e.g. its ECLI, or the key in the store you got it from.
+            @param matches: the list that find_references() gave for that document.
+            @param year: the document's year, for most_cited(year=...).
+            If None and the source is an ECLI, we take the year from that.
+            @param commit: False lets you do bulk adds in one transaction (call commit() afterwards), which is much faster.
+        """
+        self._check_writable()
+        if year is None  and  source.startswith('ECLI:'):
+            try:
+                year = int( wetsuite.helpers.meta.parse_ecli( source )['year'] )
+            except ValueError:
+                pass
+
+        counts = {}
+        for match in matches:
+            edge = normalize_reference( match, law_ids=self.law_ids )
+            if edge is None  or  edge[1] == source:
+                continue
+            counts[edge] = counts.get(edge, 0) + 1
+
+        self._uncount( source )
+        self.conn.execute("DELETE FROM edges WHERE source = ?", (source,))
+        self.conn.execute("INSERT OR REPLACE INTO sources (source, year) VALUES (?, ?)", (source, year))
+        self.conn.executemany("INSERT INTO counts (kind, target, year, n) VALUES (?, ?, ?, 1) ON CONFLICT (kind, target, year) DO UPDATE SET n = n + 1",
+                              _count_keys( set( (kind, target)  for kind, target, _ in counts ), year ))
+        self.conn.executemany("INSERT INTO edges (source, kind, target, detail, count) VALUES (?, ?, ?, ?, ?)",
+                              list( (source, kind, target, detail, count)  for (kind, target, detail), count in counts.items() ))
+        if commit:
+            self.commit()
+
+    def _uncount(self, source:str):
+        " takes what a source's current edges contributed out of the counts table "
+        row = self.conn.execute("SELECT year FROM sources WHERE source = ?", (source,)).fetchone()
+        if row is None:
+            return
+        keys = _count_keys( self.conn.execute("SELECT DISTINCT kind, target FROM edges WHERE source = ?", (source,)), row[0] )
+        self.conn.executemany("UPDATE counts SET n = n - 1 WHERE kind = ? AND target = ? AND year = ?", keys)
+        self.conn.executemany("DELETE FROM counts WHERE kind = ? AND target = ? AND year = ? AND n <= 0", keys)
+
+    def remove(self, source:str, commit:bool=True):
+        """ Removes a document and its edges from the index.  Does not complain if it was not there. """
+        self._check_writable()
+        self._uncount( source )
+        self.conn.execute("DELETE FROM edges WHERE source = ?", (source,))
+        self.conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+        if commit:
+            self.commit()
+
+    def update_from_store(self, store, refresh:bool=False, year_function=None):
+        """ Adds the documents from a store of key -> find_references() output (e.g. as find_references_many makes)
+            that we do not have yet.
+
+            @param store: a LocalKV-style store (something with keys() and get())
+            @param refresh: if True, also re-adds documents we already have.
+            @param year_function: if not None, a function that takes a key and returns that document's year (or None)
+            @return: the amount of documents added.
+        """
+        self._check_writable()
+        added = 0
+        for key in list( store.keys() ):
+            if not refresh  and  key in self:
+                continue
+            year = None if year_function is None else year_function(key)
+            self.add( key, store.get(key), year=year, commit=False )
+            added += 1
+            if added % 1000 == 0:
+                self.commit()
+        self.commit()
+        return added
+
+    def cited_by(self, target:str, detail:str=None):
+        """ Which documents cite this target?
+
+            @param target: the normalized target, e.g. C{'ECLI:NL:HR:2005:AT4537'}, C{'BWBR0005537'}, C{'stb-2000-123'}
+            (see normalize_reference; ECLI and BWB-ids are uppercased for you)
+            @param detail: if None, documents citing the target at all (for a law: any artikel, or the law itself);
+            if a string (for laws: the article number), only those that cite that.
+            @return: a sorted list of source identifiers
+        """
+        if target[:4].upper() in ('ECLI', 'BWBR', 'BWBV'):
+            target = target.upper()
+        if detail is None:
+            rows = self.conn.execute("SELECT DISTINCT source FROM edges WHERE target = ?", (target,))
+        else:
+            rows = self.conn.execute("SELECT DISTINCT source FROM edges WHERE target = ? AND detail = ?", (target, detail))
+        return sorted( row[0]  for row in rows )
+
+    def cites(self, source:str):
+        """ What does this document cite?
+            @return: a list of (kind, target, detail, count) tuples, sorted.
+        """
+        return sorted( self.conn.execute("SELECT kind, target, detail, count FROM edges WHERE source = ?", (source,)) )
+
+    def most_cited(self, kind:str=None, year:int=None, n:int=25):
+        """ The targets cited by the most documents.
+
+            @param kind: only count edges of this kind (see normalize_reference). Note that for laws, you probably want
+            to consider both 'bwb' and 'artikel' - None counts all kinds, and counts a document once per target.
+            (These counts are kept up to date as you add documents, so this is fast even on a large index)
+            @param year: only count documents from this year
+            @param n: how many to return
+            @return: a list of (target, number_of_citing_documents), most cited first
+        """
+        return list( self.conn.execute("SELECT target, n FROM counts WHERE kind = ? AND year = ? ORDER BY n DESC, target LIMIT ?",
+                                       (_ANY_KIND if kind is None else kind,  _ANY_YEAR if year is None else year,  n)) )
+
+    def commit(self):
+        "commit changes - for when you use add() or remove() with commit=False"
+        self.conn.commit()
+
+    def close(self):
+        "Closes the database. Uncommitted changes are rolled back."
+        self.conn.rollback()
+        self.conn.close()
+
+    def __contains__(self, source:str):
+        "whether we have indexed this source (even if it cited nothing)"
+        return self.conn.execute("SELECT 1 FROM sources WHERE source = ?", (source,)).fetchone() is not None
+
+    def __len__(self):
+        "the amount of indexed sources"
+        return self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+
+    def __repr__(self):
+        return "<CitationIndex(%r)>"%(self.path,)
+
+    def __enter__(self):
+        "supports use as a context manager"
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        "supports use as a context manager - close()s on exit"
+        self.close()
@@ -1,14 +1,29 @@
 #!/usr/bin/python
 """ Quick and dirty version of some collocation code.
 
-    TODO: 
-    * add some code that give memory use a limit
+    Internally, words are given integer IDs (see C{Collocation.vocab}),
+    and n-grams are counted as rows of those IDs in numpy arrays, rather than as tuples of strings in a dict,
+    which takes a lot less memory, and makes cleanup and scoring vectorizable.
+    You still see string tuples when you look at C{grams} or the output of C{score_ngrams}.
+    Note that C{uni} and C{grams} are a snapshot and a read-only view of those arrays, respectively,
+    so counts are changed via consume_tokens(), add_uni() and add_gram(), not by assigning to them.
+
+    For larger amounts of text, look at collocations_from_texts(), which can count in multiple processes
+    (each counting into its own Collocation, which are then merge()d)
+    and can limit memory use by pruning rare n-grams while counting.
+
+    TODO:
     * look at different scoring methods, e.g. NLTK's association.py
 """
 
 from functools import reduce
 import operator
-from collections import defaultdict
+import collections.abc
+
+import numpy
+
+import wetsuite.helpers.strings
+import wetsuite.helpers.util
 
 
 def product(l):
@@ -16,70 +31,264 @@ def product(l):
     return reduce(operator.mul, l, 1)
 
 
+_ID_DTYPE = numpy.uint32  # so we can have ~4 billion distinct words, and an n-gram key takes 4*n bytes
+
+
+def _rows_as_void(keys):
+    """ Views a (amount, n) array of word IDs as a 1D array with one opaque item per row,
+        so that numpy can sort, unique, and searchsorted whole n-grams at once (it compares them bytewise, which is consistent, if not meaningful)
+    """
+    keys = numpy.ascontiguousarray(keys, dtype=_ID_DTYPE)
+    return keys.view( numpy.dtype( (numpy.void, keys.dtype.itemsize * keys.shape[1]) ) ).ravel()
+
+
+def _void_as_rows(voids, n):
+    " the inverse of _rows_as_void "
+    return voids.view(_ID_DTYPE).reshape(-1, n)
+
+
+class _GramsView(collections.abc.Mapping):
+    " Read-only dict-like view of a Collocation's n-gram counts, with string tuples as keys (see Collocation.grams) "
+
+    def __init__(self, coll):
+        self._coll = coll
+        coll._consolidate()  # pylint: disable=protected-access
+
+    def __getitem__(self, strtup):
+        coll = self._coll
+        ids = []
+        for s in strtup:
+            if s not in coll.vocab:
+                raise KeyError(strtup)
+            ids.append( coll.vocab[s] )
+        n = len(ids)
+        if n not in coll._gram_keys:  # pylint: disable=protected-access
+            raise KeyError(strtup)
+        keys = _rows_as_void( coll._gram_keys[n] )  # pylint: disable=protected-access
+        want = _rows_as_void( numpy.array([ids], dtype=_ID_DTYPE) )
+        at = numpy.searchsorted( keys, want )[0]
+        if at < len(keys)  and  keys[at] == want[0]:
+            return int( coll._gram_counts[n][at] )  # pylint: disable=protected-access
+        raise KeyError(strtup)
+
+    def __iter__(self):
+        coll = self._coll
+        for n in sorted(coll._gram_keys):  # pylint: disable=protected-access
+            for row in coll._gram_keys[n].tolist():  # pylint: disable=protected-access
+                yield tuple( coll.id_strings[i]  for i in row )
+
+    def __len__(self):
+        return sum( len(counts)  for counts in self._coll._gram_counts.values() )  # pylint: disable=protected-access
+
+    def __repr__(self):
+        return "<grams view with %d n-grams>" % len(self)
+
+
 class Collocation:
-    """A basic collocation calculator class."""
+    """A basic collocation calculator class.
+
+    @ivar vocab: dict from word string to its integer ID
+    @ivar id_strings: list from integer ID to word string
+    @ivar saw_tokens: how many tokens we have consumed
+    """
 
-    def __init__(self, connectors=()):
+    def __init__(self, connectors=(), max_ngrams:int=None):
         """connectors takes a list of words that,
         are removed when they appear at the _edge_ of an n-gram (for n > 1),
         but are left if they are inside (so for n >= 3)
+
+        max_ngrams, if not None, bounds memory use: whenever we have more (distinct) n-grams than that,
+        we remove the rarest, down to about half of max_ngrams.
+        This means counts can be underestimated (a removed n-gram starts again from zero when seen again),
+        but n-grams that are common throughout the text will be fine, and those are what collocation is usually about.
         """
         self.connectors = connectors
-        self.uni = defaultdict(int)
-        self.grams = defaultdict(int)
+        self.max_ngrams = max_ngrams
+
+        self.vocab = {}
+        self.id_strings = []
+        self._is_connector = numpy.zeros(1024, dtype=bool)  # indexed by ID, grown as needed, like _uni_counts
+        self._uni_counts = numpy.zeros(1024, dtype=numpy.int64)
+
+        # n -> (amount, n)-shaped array of word IDs, sorted (as _rows_as_void), unique;   n -> counts for each of those rows
+        self._gram_keys = {}
+        self._gram_counts = {}
+        # n-grams not yet merged into the above, as lists of (keys, counts) - merging in batches is much cheaper than per document
+        self._pending = collections.defaultdict(list)
+        self._pending_rows = 0         # rows added to _pending since the last _consolidate
+        self._consolidate_at = 500000
+
         self.saw_tokens = 0
 
+    def _ids(self, token_list):
+        " returns a numpy array with the ID for each token, adding new words to the vocabulary as necessary "
+        vocab = self.vocab
+        ret = numpy.empty( len(token_list), dtype=_ID_DTYPE )
+        for i, token in enumerate(token_list):
+            token_id = vocab.get(token)
+            if token_id is None:
+                token_id = self._add_word(token)
+            ret[i] = token_id
+        return ret
+
+    def _add_word(self, s):
+        " gives a new word an ID "
+        token_id = len(self.id_strings)
+        self.vocab[s] = token_id
+        self.id_strings.append(s)
+        if token_id >= len(self._uni_counts):
+            self._uni_counts = numpy.concatenate( (self._uni_counts, numpy.zeros(len(self._uni_counts), dtype=numpy.int64)) )
+            self._is_connector = numpy.concatenate( (self._is_connector, numpy.zeros(len(self._is_connector), dtype=bool)) )
+        self._is_connector[token_id] = s in self.connectors
+        return token_id
+
     def consume_tokens(self, token_list, gramlens=(2, 3, 4)):
         """Takes a list of string tokens.
         Counts unigram and n-gram from it, for given values of n.
         """
         self.saw_tokens += len(token_list)
-        for i, val in enumerate(token_list):
-            self.add_uni(val)
+        ids = self._ids(token_list)
+        numpy.add.at( self._uni_counts, ids, 1 )
 
         for gramlen in gramlens:
-            for i in range(len(token_list) - (gramlen - 1)):
-                gram = tuple(token_list[i : i + gramlen])
-                self.add_gram(gram)
+            amount = len(ids) - (gramlen - 1)
+            if amount <= 0:
+                continue
+            keys = numpy.stack( list( ids[i : i + amount]  for i in range(gramlen) ), axis=1 )
+            # skip those with connectors at the edges
+            keep = ~( self._is_connector[ keys[:, 0] ] | self._is_connector[ keys[:, -1] ] )
+            keys = keys[keep]
+            self._pending[gramlen].append( (keys, None) )
+            self._pending_rows += len(keys)
+
+        if self._pending_rows >= self._consolidate_at:
+            self._consolidate( full=False )
 
     def add_uni(self, s, cnt=1):
-        "Used by consume_tokens, you typically should not need this"
-        self.uni[s] += cnt
+        "Mostly used by consume_tokens, you typically should not need this"
+        token_id = self.vocab.get(s)
+        if token_id is None:
+            token_id = self._add_word(s)
+        self._uni_counts[token_id] += cnt
 
     def add_gram(self, strtup, cnt=1):
-        "Used by consume_tokens, you typically should not need this"
+        "Mostly used by consume_tokens, you typically should not need this"
         if strtup[0] in self.connectors:
             # print("IGNORE %r because of connector at pos 0"%(strtup,))
             return
         if strtup[-1] in self.connectors:
             # print("IGNORE %r because of connector at pos -1"%(strtup,))
             return
-        self.grams[strtup] += cnt
+        keys = self._ids(strtup).reshape(1, -1)
+        self._pending[len(strtup)].append( (keys, numpy.array([cnt], dtype=numpy.int64)) )
+        self._pending_rows += 1
+
+    @staticmethod
+    def _unique_counts(n, pending):
+        " sums a list of (keys, counts) into unique sorted keys and their counts (counts None means each row counts once) "
+        all_keys = numpy.concatenate( list( keys  for keys, _ in pending ) )
+        all_counts = numpy.concatenate( list( (numpy.ones(len(keys), dtype=numpy.int64)  if counts is None  else counts)
+                                              for keys, counts in pending ) )
+        unique, inverse = numpy.unique( _rows_as_void(all_keys), return_inverse=True )
+        return ( _void_as_rows( unique, n ).copy(),
+                 numpy.bincount( inverse.ravel(), weights=all_counts, minlength=len(unique) ).astype(numpy.int64) )
+
+    def _consolidate(self, full:bool=True):
+        """ Merges pending n-gram counts into the main arrays, and prunes if we have more n-grams than max_ngrams.
+
+            full=False (used while counting) only sums up the pending counts among themselves,
+            unless that has become as large as the main arrays (merging into those means re-sorting all of them,
+            so doing that only when the pending part has grown comparably large keeps it from becoming quadratic)
+        """
+        merged_into_main = False
+        for n, pending in self._pending.items():
+            if len(pending) == 0:
+                continue
+            keys, counts = self._unique_counts( n, pending )
+            main_size = len( self._gram_counts.get(n, ()) )
+            if full  or  len(counts) >= main_size:
+                if main_size > 0:
+                    keys, counts = self._unique_counts( n, [(keys, counts), (self._gram_keys[n], self._gram_counts[n])] )
+                self._gram_keys[n], self._gram_counts[n] = keys, counts
+                self._pending[n] = []
+                merged_into_main = True
+            else:
+                self._pending[n] = [ (keys, counts) ]
+        self._pending_rows = 0
+
+        if merged_into_main  and  self.max_ngrams is not None  and  len(self._gram_counts) > 0:
+            total = sum( len(counts)  for counts in self._gram_counts.values() )
+            if total > self.max_ngrams:
+                all_counts = numpy.concatenate( list(self._gram_counts.values()) )
+                # remove everything at or below the count that would leave about half of max_ngrams
+                threshold = numpy.partition( all_counts, total - self.max_ngrams//2 - 1 )[total - self.max_ngrams//2 - 1]
+                self._filter_grams( lambda n, keys, counts: counts > threshold )
+
+    def _filter_grams(self, keep_func):
+        " keep_func(n, keys, counts) returns a boolean array for which n-grams to keep "
+        for n in list(self._gram_keys):
+            keep = keep_func( n, self._gram_keys[n], self._gram_counts[n] )
+            self._gram_keys[n] = self._gram_keys[n][keep]
+            self._gram_counts[n] = self._gram_counts[n][keep]
+
+    @property
+    def uni(self):
+        """ A defaultdict(int) from word string to count, so unseen words give 0.
+            This is a snapshot, made when you ask for it (not cheap for a large vocabulary),
+            so altering it does not alter our counts - use add_uni() for that.
+        """
+        counts = self._uni_counts[:len(self.id_strings)]
+        return collections.defaultdict( int, ( (self.id_strings[i], int(counts[i]))  for i in numpy.flatnonzero(counts) ) )
+
+    @property
+    def grams(self):
+        """ A read-only dict-like view from n-gram (as tuple of strings) to count.
+            Assigning to it raises a TypeError - use add_gram() to add counts.
+        """
+        return _GramsView(self)
+
+    def merge(self, other):
+        """ Adds the counts from another Collocation object (e.g. one that counted in another process) into this one """
+        if not isinstance(other, Collocation):
+            raise TypeError("Can only merge a Collocation, not a %s" % other.__class__.__name__)
+        if set(other.connectors) != set(self.connectors):
+            raise ValueError("Can only merge a Collocation with the same connectors")
+        other._consolidate()  # pylint: disable=protected-access
+        # map the other's word IDs to ours
+        remap = self._ids( other.id_strings )
+        other_uni = other._uni_counts[:len(other.id_strings)]  # pylint: disable=protected-access
+        numpy.add.at( self._uni_counts, remap, other_uni )
+        for n, keys in other._gram_keys.items():  # pylint: disable=protected-access
+            if len(keys) > 0:
+                self._pending[n].append( (remap[keys], other._gram_counts[n]) )  # pylint: disable=protected-access
+                self._pending_rows += len(keys)
+        self.saw_tokens += other.saw_tokens
+        # not a full _consolidate: with many merges (e.g. one per chunk in collocations_from_texts) re-sorting everything each time would be quadratic
+        if self._pending_rows >= self._consolidate_at:
+            self._consolidate( full=False )
 
     def cleanup_unigrams(self, mincount=2, disqualify_func=None):
         """Remove unigrams that are rare - by default: that appear just once. You may wish to increase this.
-        ideally we remove all n-grams using them too, but it's faster to waste the memory and leave them there.
+        Also removes the n-grams that use them (which score_ngrams would skip anyway).
         """
         if mincount in (None,1)  and  disqualify_func is None:
             return # do nothing, like you asked us to
             #raise ValueError("Neither mincount or disqualify_func apply, you're not asking to do anything")
 
-        new_uni = defaultdict(int)
-        for string, count in self.uni.items():
-            keep = True
-            if mincount is not None:
-                if count < mincount:
-                    keep = False
-            if keep is True  and  disqualify_func is not None: # if we already disqualified it, there's no reason to check this too
-                if disqualify_func(string, count):
-                    keep = False
-            if keep:
-                new_uni[string] = count
-        self.uni = new_uni
+        counts = self._uni_counts[:len(self.id_strings)]
+        if mincount is not None:
+            counts[ counts < mincount ] = 0
+        if disqualify_func is not None: # if we already disqualified it, there's no reason to check this too
+            for i in numpy.flatnonzero(counts):
+                if disqualify_func(self.id_strings[i], int(counts[i])):
+                    counts[i] = 0
+
+        self._consolidate()
+        self._filter_grams( lambda n, keys, gram_counts: (self._uni_counts[keys] > 0).all(axis=1) )
 
     def cleanup_ngrams(self, mincount=2, disqualify_func=None):
         """CONSIDER: allow different threshold for each length, e.g. via a list for mincount
-           remove n-grams if either 
+           remove n-grams if either
              - they occur less than mincount
              - func returns true for them (the function itself gets (the n-gram string tuple, the count) as a parameter)
            Both can be None (though mincount==1 is functionally the same as None)
@@ -88,72 +297,125 @@ class Collocation:
             return # do nothing, like you asked us to
             #raise ValueError("Neither mincount or disqualify_func apply, you're not asking to do anything")
 
-        new_grams = defaultdict(int)
-        for string, count in self.grams.items():
-            keep = True
-            if mincount is not None:
-                if count < mincount:
-                    keep = False
-            if keep is True  and  disqualify_func is not None: # if we already disqualified it, there's no reason to check this too
-                if disqualify_func(string, count):
-                    keep = False
-            if keep:
-                new_grams[string] = count
+        self._consolidate()
+        if mincount is not None:
+            self._filter_grams( lambda n, keys, counts: counts >= mincount )
 
-        self.grams = new_grams
+        if disqualify_func is not None: # only called for what survived the above
+            id_strings = self.id_strings
+            def keep_func(n, keys, counts):
+                return numpy.fromiter( (not disqualify_func( tuple(id_strings[i] for i in row), int(count) )
+                                        for row, count in zip(keys.tolist(), counts.tolist())),
+                                       dtype=bool, count=len(counts) )
+            self._filter_grams( keep_func )
 
+    def score_arrays(self, method="mik2"):
+        """ The vectorized core of score_ngrams: for each n, numpy arrays for the n-grams that have all their unigrams.
 
-    def score_ngrams(self, method="mik2", sort=True):
-        """Takes the counts we already did, returns a list of items like::
-            (string_tuple,              score,   count_combo,  [count, part, ...])
-        e.g.::
-            (('aangetekende', 'brief'), 1085.12, 16, [17, 17])
-
-        The scoring logic is currently somewhat arbitrary,
-        and needs work before it is meaningful in a _remotely_ linear way.
+            @return: a dict from n to a tuple of arrays: (word ID rows, scores, n-gram counts, unigram counts)
+            (use id_strings to turn IDs into strings)
         """
-        ret = []
-        for strtup, tup_count in self.grams.items():
+        if method == "mik":
+            power = 1
+        elif method == "mik2":
+            power = 2
+        elif method == "mik3":
+            power = 3
+        else:
+            raise ValueError("%r not a known scoring method" % method)
+
+        self._consolidate()
+        ret = {}
+        for n, keys in self._gram_keys.items():
+            uni_counts = self._uni_counts[keys]
             # if you did a clean-unigrams, we should ignore anything involving the things that removed
             # CONSIDER: unseen unigrams as min(available scores) or tiny percentile or such
-            skip_entry = False
-            for s in strtup:
-                if s not in self.uni:  # TODO: rethink, together with cleanup
-                    skip_entry = True
-                    break
-            if skip_entry:
-                continue
-
-            uni_counts = list(self.uni[s] for s in strtup)
-            mul = product(uni_counts)
+            has_all = (uni_counts > 0).all(axis=1)
+            keys, uni_counts, tup_counts = keys[has_all], uni_counts[has_all], self._gram_counts[n][has_all]
 
             # TODO: evaluate decent methods of collocation scoring. The ones I've seen so far seem statistically iffy.
-            if method == "mik":
-                score = (float(tup_count)) / mul
+            scores = tup_counts.astype(numpy.float64) ** power / uni_counts.astype(numpy.float64).prod(axis=1)
+            scores *= 35.0 ** n  # fudge factor to get larger-n  n-grams on roughly the same scale.
+            # TODO: remove, or think about this more.   More related more to vocab size?
+            ret[n] = (keys, scores, tup_counts, uni_counts)
+        return ret
 
-            elif method == "mik2":
-                score = (float(tup_count) ** 2) / mul
-            elif method == "mik3":
-                score = (float(tup_count) ** 3) / mul
-            else:
-                raise ValueError("%r not a known scoring method" % method)
+    def score_ngrams(self, method="mik2", sort=True, top:int=None):
+        """Takes the counts we already did, returns a list of items like::
+            (string_tuple,              score,   count_combo,  [count, part, ...])
+        e.g.::
+            (('aangetekende', 'brief'), 1085.12, 16, [17, 17])
 
-            score *= 35.0 ** len(
-                strtup
-            )  # fudge factor to get larger-n  n-grams on roughly the same scale.
-            # TODO: remove, or think about this more.   More related more to vocab size?
+        The scoring logic is currently somewhat arbitrary,
+        and needs work before it is meaningful in a _remotely_ linear way.
 
-            ret.append((strtup, score, tup_count, uni_counts))
+        @param sort: sort by score (ascending)
+        @param top: if not None, return only the this many highest-scoring  (saves a lot of time and memory on large counts)
+        """
+        per_n = self.score_arrays(method)
+        if len(per_n) == 0:
+            return []
+        lengths = list( per_n )
+        scores = numpy.concatenate( list( per_n[n][1]  for n in lengths ) )
+        which_n = numpy.concatenate( list( numpy.full(len(per_n[n][1]), n)  for n in lengths ) )
+        offset_in_n = numpy.concatenate( list( numpy.arange(len(per_n[n][1]))  for n in lengths ) )
 
+        if top is not None  and  top < len(scores):
+            chosen = numpy.argpartition( scores, len(scores) - top )[len(scores) - top:]
+        else:
+            chosen = numpy.arange( len(scores) )
         if sort:
-            ret.sort(key=lambda x: x[1])
+            chosen = chosen[ numpy.argsort( scores[chosen], kind="stable" ) ]
 
+        ret = []
+        for n, i in zip( which_n[chosen].tolist(), offset_in_n[chosen].tolist() ):
+            keys, n_scores, tup_counts, uni_counts = per_n[n]
+            ret.append( (tuple( self.id_strings[word_id]  for word_id in keys[i].tolist() ),
+                         float(n_scores[i]),  int(tup_counts[i]),  uni_counts[i].tolist()) )
         return ret
 
     def counts(self):
         "returns counts of tokens, unigrams, and n>2-grams"
+        self._consolidate()
         return {
             "from_tokens": self.saw_tokens,
-            "unigrams": len(self.uni),
-            "ngrams": len(self.grams),
+            "unigrams": int( numpy.count_nonzero(self._uni_counts) ),
+            "ngrams": sum( len(counts)  for counts in self._gram_counts.values() ),
         }
+
+    def __getstate__(self):
+        " consolidate before pickling (e.g. to send back from a worker process), which makes it smaller "
+        self._consolidate()
+        return self.__dict__
+
+
+def _collocations_chunk(texts, tokenizer, gramlens, connectors, max_ngrams):
+    " worker side of collocations_from_texts (module-level so that a process pool can pickle it) "
+    coll = Collocation( connectors=connectors, max_ngrams=max_ngrams )
+    for text in texts:
+        coll.consume_tokens( tokenizer(text), gramlens=gramlens )
+    return coll
+
+
+def collocations_from_texts(texts, tokenizer=wetsuite.helpers.strings.simple_tokenize, gramlens=(2, 3, 4), connectors=(),
+                            max_ngrams:int=None, workers:int=1, chunksize:int=100):
+    """ Tokenizes and counts many texts into one Collocation object, optionally spread over multiple processes,
+        each counting chunks of texts into their own Collocation, which are merged as they come back.
+
+        @param texts: an iterable of strings (e.g. a store's values()). Read as we go, so can be larger than memory.
+        @param tokenizer: a function from a string to a list of strings. Must be picklable (so not a lambda) when workers>1.
+        @param gramlens: handed to consume_tokens
+        @param connectors: handed to Collocation
+        @param max_ngrams: handed to Collocation, used both in the workers and in the merged result
+        @param workers: number of worker processes. 1 (the default) means do it in this process. None means the amount of CPUs.
+        @param chunksize: how many texts to hand to a worker at a time.
+        @return: a Collocation object
+    """
+    if workers == 1:  # one Collocation, nothing to merge
+        return _collocations_chunk( texts, tokenizer, gramlens, connectors, max_ngrams )
+
+    coll = Collocation( connectors=connectors, max_ngrams=max_ngrams )
+    for chunk_coll in wetsuite.helpers.util.map_chunks( _collocations_chunk, wetsuite.helpers.util.chunked(texts, chunksize),
+                                                        workers=workers, args=(tokenizer, gramlens, connectors, max_ngrams) ):
+        coll.merge( chunk_coll )
+    return coll
@@ -0,0 +1,267 @@
+"""
+Counting words (or other strings) over more text than you would want to hold in memory at once,
+e.g. for corpus-wide term statistics and word clouds.
+
+helpers.strings.count_normalized() and friends take one list of strings, which is fine for a document,
+but for a corpus you would have to tokenize everything and hold it in memory before counting.
+The counters here are fed piece by piece, can be merged (so that parts can be counted in different processes),
+and produce the same kind of string:count dict in the end:
+  - C{ExactCounter} counts everything. Memory grows with the vocabulary, which is often fine
+  - C{SpaceSavingCounter} keeps only (roughly) the most common C{capacity} strings, so memory is bounded.
+    Counts of the strings it reports may be overestimated, by at most the C{error()} it reports for them.
+    Good for "what are the most common words", which is what word clouds need.
+  - C{CountMinSketch} keeps a fixed-size table of counts, so memory is bounded, and can estimate the count
+    for any string you ask about (again possibly overestimated), but cannot tell you which strings it has seen.
+    Good for "how often does this specific term occur".
+
+For example, for a word cloud of a whole dataset::
+    counter = count_texts( dataset.data.values(), SpaceSavingCounter(capacity=20000), workers=4 )
+    freqs = counter.result( normalize_func=str.lower, stopwords=True, min_word_length=3 )
+    wetsuite.extras.word_cloud.wordcloud_from_freqs( dict(collections.Counter(freqs).most_common(500)) )
+"""
+
+import heapq
+import hashlib
+import collections
+
+import wetsuite.helpers.strings
+import wetsuite.helpers.util
+
+
+class ExactCounter:
+    """ Counts strings exactly. A thin layer over collections.Counter, mostly so that it has the same interface as the others. """
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.total = 0
+
+    def empty_copy(self):
+        " a new, empty counter with the same settings "
+        return self.__class__()
+
+    def add(self, strings):
+        """ Count a sequence of strings (e.g. a tokenized document)
+            @param strings: an iterable of strings
+        """
+        self.add_counts( collections.Counter( strings ) )
+
+    def add_counts(self, counts):
+        """ Add already-counted strings (e.g. counted in another process)
+            @param counts: a string:count mapping, e.g. a collections.Counter
+        """
+        self.total += sum( counts.values() )
+        self._add_counts( counts )
+
+    def _add_counts(self, chunk_counts):
+        self.counts.update( chunk_counts )
+
+    def merge(self, other):
+        """ Adds the counts from another counter of the same type into this one (e.g. one that counted in another process) """
+        if not isinstance(other, self.__class__):
+            raise TypeError("Can only merge a %s, not a %s" % (self.__class__.__name__, other.__class__.__name__))
+        self.total += other.total
+        self._add_counts( other.counts )
+
+    def most_common(self, n:int=None):
+        """ @return: a list of (string, count), most common first, like collections.Counter's """
+        return self.counts.most_common(n)
+
+    def result(self, min_count=1, min_word_length=0, normalize_func=None, stopwords=(), stopwords_i=()):
+        """ The counts as a string:count dict, filtered and normalized like helpers.strings.count_normalized() does
+            (so e.g. C{normalize_func=str.lower} makes it count case-insensitively, as count_case_insensitive does).
+        """
+        return wetsuite.helpers.strings.normalize_counts( self.counts, min_count=min_count, min_word_length=min_word_length,
+                                                         normalize_func=normalize_func, stopwords=stopwords, stopwords_i=stopwords_i )
+
+    def __len__(self):
+        " the amount of distinct strings we are keeping counts for "
+        return len(self.counts)
+
+
+class SpaceSavingCounter(ExactCounter):
+    """ Approximate counting of the most common strings in bounded memory, based on the space-saving algorithm.
+
+        We keep counts for at most 2*capacity strings; when there are more, we keep the capacity largest.
+        A string we start counting after that has evicted counts as large as the largest count we threw away
+        (we cannot know it did not occur that often before), which is its maximum error.
+        So counts are never underestimated, and a string that occurs more than about total/capacity times is never lost.
+        (The original algorithm evicts one item at a time; doing it in batches is much cheaper in python, and only a little less precise)
+    """
+
+    def __init__(self, capacity:int=100000):
+        """
+        @param capacity: roughly how many strings to keep counts for. Memory use is proportional to this.
+        """
+        if capacity < 1:
+            raise ValueError("capacity should be at least 1, not %r" % capacity)
+        super().__init__()
+        self.capacity = capacity
+        self.errors = {}   # string -> overestimation upper bound, only for strings that have one
+        self.floor = 0     # the largest count we have evicted so far
+
+    def empty_copy(self):
+        return self.__class__( capacity=self.capacity )
+
+    def _add_counts(self, chunk_counts):
+        counts, errors = self.counts, self.errors
+        for string, count in chunk_counts.items():
+            if string in counts:
+                counts[string] += count
+            else:
+                counts[string] = count + self.floor
+                if self.floor > 0:
+                    errors[string] = self.floor
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        " keep the capacity largest counts, remember the largest one we removed "
+        keep = heapq.nlargest( self.capacity, self.counts.items(), key=lambda item: item[1] )
+        keep_strings = set( string  for string, _ in keep )
+        for string, count in self.counts.items():
+            if string not in keep_strings:
+                self.floor = max( self.floor, count )
+        self.counts = collections.Counter( dict(keep) )
+        self.errors = dict( (string, error)  for string, error in self.errors.items()  if string in keep_strings )
+
+    def merge(self, other):
+        """ Adds the counts from another SpaceSavingCounter into this one.
+            The result still never underestimates, though the errors add up.
+        """
+        if not isinstance(other, self.__class__):
+            raise TypeError("Can only merge a %s, not a %s" % (self.__class__.__name__, other.__class__.__name__))
+        counts, errors = self.counts, self.errors
+        # Anything one side is not counting may have been evicted there, so may have occurred up to its floor times
+        for string in counts:
+            if string not in other.counts  and  other.floor > 0:
+                counts[string] += other.floor
+                errors[string] = errors.get(string, 0) + other.floor
+        for string, count in other.counts.items():
+            error = other.errors.get(string, 0)
+            if string in counts:
+                counts[string] += count
+            else:
+                counts[string] = count + self.floor
+                error += self.floor
+            if error > 0:
+                errors[string] = errors.get(string, 0) + error
+        self.floor += other.floor
+        self.total += other.total
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def error(self, string:str):
+        """ How much the count for this string may be overestimated (0 means it is exact) """
+        return self.errors.get( string, 0 )  if string in self.counts  else  self.floor
+
+
+class CountMinSketch:
+    """ Estimates the count of any string, in a fixed amount of memory (width*depth 64-bit integers)
+
+        Estimates are never too low, and with probability 1-(1/e)^depth
+        are too high by at most about 2.7*total/width. So e.g. the defaults (width 2**20, depth 4, so 32MB)
+        are within ~2.6 per million counted strings, ~98% of the time.
+
+        Sketches with the same width and depth can be merged (hashing does not depend on the process, unlike python's hash()).
+    """
+
+    def __init__(self, width:int=2**20, depth:int=4):
+        import numpy # only needed here, and slowish to import, so not at module level
+        if width < 1 or depth < 1:
+            raise ValueError("width and depth should be positive, not %r and %r" % (width, depth))
+        self.width = width
+        self.depth = depth
+        self.table = numpy.zeros( (depth, width), dtype=numpy.int64 )
+        self.total = 0
+
+    def empty_copy(self):
+        " a new, empty sketch with the same settings "
+        return self.__class__( width=self.width, depth=self.depth )
+
+    def _columns(self, strings):
+        """ For a list of strings, a depth-by-len(strings) array of the columns they go in, one row per hash function.
+            Derives all hash functions from one 64-bit hash (the Kirsch-Mitzenmacher trick), so we hash each string once.
+        """
+        import numpy
+        hashes = numpy.array(
+            list( int.from_bytes( hashlib.blake2b( string.encode('utf8'), digest_size=8 ).digest(), 'little' )  for string in strings ),
+            dtype=numpy.uint64 )
+        h1 = hashes & numpy.uint64(0xffffffff)
+        h2 = (hashes >> numpy.uint64(32)) | numpy.uint64(1)
+        rows = numpy.arange( self.depth, dtype=numpy.uint64 ).reshape(-1, 1)
+        return ( (h1 + rows * h2) % numpy.uint64(self.width) ).astype( numpy.intp )
+
+    def add(self, strings):
+        """ Count a sequence of strings (e.g. a tokenized document)
+            @param strings: an iterable of strings
+        """
+        self.add_counts( collections.Counter( strings ) )
+
+    def add_counts(self, counts):
+        """ Add already-counted strings (e.g. counted in another process)
+            @param counts: a string:count mapping, e.g. a collections.Counter
+        """
+        import numpy
+        if len(counts) == 0:
+            return
+        columns = self._columns( list(counts.keys()) )
+        amounts = numpy.fromiter( counts.values(), dtype=numpy.int64, count=len(counts) )
+        for row in range( self.depth ):
+            numpy.add.at( self.table[row], columns[row], amounts )
+        self.total += int( amounts.sum() )
+
+    def merge(self, other):
+        """ Adds the counts from another sketch with the same width and depth into this one """
+        if not isinstance(other, CountMinSketch)  or  (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Can only merge a CountMinSketch with the same width and depth")
+        self.table += other.table
+        self.total += other.total
+
+    def estimate(self, string:str):
+        """ The (over)estimated count for a string """
+        return self.estimate_many( [string] )[0]
+
+    def estimate_many(self, strings):
+        """ The (over)estimated counts for a list of strings, as a list of integers """
+        import numpy
+        strings = list(strings)
+        if len(strings) == 0:
+            return []
+        columns = self._columns( strings )
+        return list( int(count)  for count in self.table[ numpy.arange(self.depth).reshape(-1, 1), columns ].min(axis=0) )
+
+
+def _count_texts_chunk(texts, tokenizer):
+    """ worker side of count_texts: counts a list of texts into a plain Counter (module-level so a process pool can pickle it).
+        That is much smaller to send back than the counter itself would be (for a CountMinSketch, the whole table)
+    """
+    counts = collections.Counter()
+    for text in texts:
+        counts.update( tokenizer(text) )
+    return counts
+
+
+def count_texts(texts, counter=None, tokenizer=wetsuite.helpers.strings.simple_tokenize, workers:int=1, chunksize:int=100):
+    """ Tokenizes and counts many texts into one counter, optionally spread over multiple processes,
+        each counting chunks of texts into a plain Counter, which are added to the counter as they come back.
+
+        @param texts: an iterable of strings (e.g. a store's values()). Read as we go, so can be larger than memory.
+        @param counter: an ExactCounter, SpaceSavingCounter or CountMinSketch to add to.
+        If None, we make an ExactCounter.
+        @param tokenizer: a function from a string to a list of strings. Must be picklable (so not a lambda) when workers>1.
+        @param workers: number of worker processes. 1 (the default) means do it in this process. None means the amount of CPUs.
+        @param chunksize: how many texts to hand to a worker at a time.
+        @return: the counter (the same object you handed in, if you did)
+    """
+    if counter is None:
+        counter = ExactCounter()
+
+    if workers == 1:
+        for text in texts:
+            counter.add( tokenizer(text) )
+        return counter
+
+    for counts in wetsuite.helpers.util.map_chunks( _count_texts_chunk, wetsuite.helpers.util.chunked(texts, chunksize),
+                                                    workers=workers, args=(tokenizer,) ):
+        counter.add_counts( counts )
+    return counter
@@ -11,6 +11,8 @@ CONSIDER: making anything range-based be generators.
 
 import datetime
 import re
+import functools
+
 import dateutil.parser
 
 
@@ -63,6 +65,61 @@ class DutchParserInfo(dateutil.parser.parserinfo):
     ]
 
 
+# Parsers made once, rather than on each parse() call (which also meant building the parserinfo's lookup tables each time)
+_dutch_parser = dateutil.parser.parser( DutchParserInfo() )
+_default_parser = dateutil.parser.parser()
+
+
+# Month names for the fast path in _parse_cached: what the Dutch parserinfo knows,
+#   and those plus the English ones that the default parserinfo adds (only the Dutch one accepts things like "1e")
+_DUTCH_MONTH_NUMBERS = dict( (name, number + 1)  for name, number in DutchParserInfo()._months.items() )  # pylint: disable=protected-access
+_MONTH_NUMBERS = dict( (name, number + 1)  for name, number in dateutil.parser.parserinfo()._months.items() )  # pylint: disable=protected-access
+_MONTH_NUMBERS.update( _DUTCH_MONTH_NUMBERS )
+
+_re_fast_iso = re.compile(r"\s*([12][0-9]{3})-([0-9]{1,2})-([0-9]{1,2})\s*")
+_re_fast_day_month_year = re.compile(r"\s*([0-9]{1,2})(e?)\s+([A-Za-z]+)[.]?,?\s+([12][0-9]{3})\s*")
+
+
+@functools.lru_cache(maxsize=65536)
+def _parse_cached(text: str):
+    """ Does the actual work for parse(), remembering the answers for recently seen strings,
+        because in metadata, the same date strings tend to come by a lot.
+
+        Has a fast path for the most common forms (C{2020-01-01} and C{1 januari 2020}),
+        and hands everything else to dateutil (to the same effect, just a lot slower).
+
+        @return: a datetime, or None if we could not parse it.
+    """
+    try:
+        match = _re_fast_iso.fullmatch( text )
+        if match is not None:
+            return datetime.datetime( int(match.group(1)), int(match.group(2)), int(match.group(3)) )
+        match = _re_fast_day_month_year.fullmatch( text )
+        if match is not None:
+            day, suffix, month_name, year = match.groups()
+            month = ( _DUTCH_MONTH_NUMBERS  if suffix  else  _MONTH_NUMBERS ).get( month_name.lower() )
+            if month is not None:
+                return datetime.datetime( int(year), month, int(day) )
+    except ValueError:  # e.g. day out of range for the month - let dateutil decide what to do with it
+        pass
+
+    # use the first that doesn't fail
+    for parser, transform in (
+        (_dutch_parser, lambda x: x),
+        (
+            _dutch_parser,
+            lambda x: x.split("+")[0],
+        ),  # the + is for a specific malformed date I've seen.  TODO: think about fallbacks more
+        (_default_parser, lambda x: x),
+        (_default_parser, lambda x: x.split("+")[0]),
+    ):
+        try:
+            return parser.parse( transform(text) )
+        except dateutil.parser._parser.ParserError:  # pylint: disable=protected-access
+            continue
+    return None
+
+
 def parse(text: str, as_date=False, exception_as_none=True):
     """
     Try to parse a string as a date.
@@ -72,6 +129,10 @@ def parse(text: str, as_date=False, exception_as_none=True):
     ...but we have told it a litte more about Dutch, not just English.
     TODO: add French, there is some early legal text in French.
 
+    Common simple forms (like C{2020-01-01} and C{1 januari 2020}) are handled without dateutil,
+    and we remember the results for recently seen strings, because normalizing dates in metadata
+    means seeing the same strings a lot. Both make this a lot faster, without changing the results.
+
     We try to be a little more robust here,
     and will try to return None instead of raising an exception (but no promises).
 
@@ -80,24 +141,12 @@ def parse(text: str, as_date=False, exception_as_none=True):
     @param exception_as_none:  if invalid, return None rather than raise a ValueError
     @return: that date as a datetime (or date, if you prefer), or None
     """
-    # use the first that doesn't fail
-    for lang, transform in (
-        (DutchParserInfo(), lambda x: x),
-        (
-            DutchParserInfo(),
-            lambda x: x.split("+")[0],
-        ),  # the + is for a specific malformed date I've seen.  TODO: think about fallbacks more
-        (None, lambda x: x),
-        (None, lambda x: x.split("+")[0]),
-    ):
-        try:
-            dt = dateutil.parser.parse(transform(text), parserinfo=lang)
-            if as_date:
-                return dt.date()
-            else:
-                return dt
-        except dateutil.parser._parser.ParserError:  # pylint: disable=protected-access
-            continue
+    dt = _parse_cached(text)
+    if dt is not None:
+        if as_date:
+            return dt.date()
+        else:
+            return dt
     if exception_as_none:
         return None
     else:
@@ -122,7 +171,7 @@ def _find_dates_in_text_with_positions(text):
     '''
     text_with_pos = [] # list of ((startpos,endpos)), text)
     for testre in (_re_isolike_date, _re_dutch_date_1, _re_dutch_date_2):
-        for match in re.finditer(testre, text):
+        for match in testre.finditer(text):
             if match is not None:
                 st, en = match.span()
                 # return them sorted by position, in case you care
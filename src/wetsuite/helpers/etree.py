@@ -9,11 +9,13 @@ Some general helpers.
 CONSIDER:
   - A "turn tree into nested dicts" function - see e.g. https://lxml.de/FAQ.html#how-can-i-map-an-xml-tree-into-a-dict-of-dicts
   - have a fromstring() as a thin wrapper but with strip_namespace in there? (saves a lines but might be a confusing API change)
+    (there is now fromstring_stripped() for that, as a separate function)
 """
 
 import copy
 import warnings
 import re
+import io
 
 import lxml.etree
 import lxml.html
@@ -258,19 +260,27 @@ def strip_namespace(tree, remove_from_attr=True):
     if tree is None:  # avoid the below saying something silly when it's you who were silly
         raise ValueError("Handed None to strip_namespace()")
     tree = _copy(tree)
-    _strip_namespace_inplace(tree, remove_from_attr=remove_from_attr)
+    strip_namespace_inplace(tree, remove_from_attr=remove_from_attr)
     return tree
 
 
-def _strip_namespace_inplace(tree, remove_from_attr=True):
+def strip_namespace_inplace(tree, remove_from_attr=True):
     """Takes a parsed ET structure and does an in-place removal of all namespaces.
     Returns a list of removed namespaces, which you can usually ignore.
-    Not really meant to be used directly, in part because it assumes lxml etrees.
+
+    Unlike L{strip_namespace}, this does not copy the tree first,
+    so is cheaper (in time, and in memory for large documents),
+    but alters the tree you hand in, so only use it on a tree that nothing else cares about
+    - typically one you just parsed yourself (see also L{fromstring_stripped}).
+
+    Assumes lxml etrees.
 
     @param tree:             See L{strip_namespace}
     @param remove_from_attr: See L{strip_namespace}
     @return:                 See L{strip_namespace}
     """
+    if tree is None:
+        raise ValueError("Handed None to strip_namespace_inplace()")
     ret = {}
     for elem in tree.iter():
         if isinstance(elem, _Comment):  # won't have a .tag to have a namespace in,
@@ -302,6 +312,21 @@ def _strip_namespace_inplace(tree, remove_from_attr=True):
     return ret
 
 
+_strip_namespace_inplace = strip_namespace_inplace  # the name it had when it was considered internal
+
+
+def fromstring_stripped(xmlbytes, remove_from_attr=True):
+    """ Parse XML and remove namespaces, without the copy that C{strip_namespace( fromstring(xmlbytes) )} would make.
+
+        @param xmlbytes: the XML document, as a bytes object (or str, as lxml's fromstring allows)
+        @param remove_from_attr: See L{strip_namespace}
+        @return: the root element of the namespace-stripped tree
+    """
+    tree = fromstring(xmlbytes)
+    strip_namespace_inplace(tree, remove_from_attr=remove_from_attr)
+    return tree
+
+
 def indent(tree, strip_whitespace: bool = True):
     """Returns a 'reindented' copy of a tree,
     with text nodes altered to add spaces and newlines, so that if tostring()'d and printed, it would print indented by depth.
@@ -522,6 +547,24 @@ class debug_color:
 
 
 
+# Tag names that we consider to split words, i.e. text right before and after such elements should not be glued together.
+#   Used by all_text_fragments(add_spaces=True). This mixes HTML with the XML that KOOP/BWB/CVDR/OP and rechtspraak.nl use,
+#   and is creative and not necessarily correct, but on average should make fewer weird mistakes than doing nothing.
+#   Anything not mentioned (e.g. b, i, em, sup, nadruk, intref, extref) is considered not to split words.
+word_splitting_tags = frozenset([
+    # HTML
+    'p', 'div', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'dl', 'dt', 'dd',
+    'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th', 'caption', 'blockquote', 'pre',
+    'section', 'article', 'header', 'footer', 'nav', 'aside', 'main', 'figure', 'figcaption',
+    # KOOP (BWB, CVDR, officielepublicaties) and rechtspraak.nl
+    'al', 'alinea', 'lid', 'lidnr', 'artikel', 'kop', 'titel', 'nr', 'label', 'tussenkop', 'lijst', 'li.nr',
+    'row', 'entry', 'tgroup', 'colspec', 'noot', 'para', 'title', 'paragroup', 'parablock',
+])
+
+
+_all_text_xpath = lxml.etree.XPath('descendant::text()', smart_strings=False) # pylint: disable=c-extension-no-member
+
+
 def all_text_fragments(
     under_node,
     strip: str = None,
@@ -529,11 +572,10 @@ def all_text_fragments(
     ignore_tags=(),
     join: str = None,
     stop_at: list = None,
+    add_spaces=False,
 ):
     """Returns all fragments of text contained in a subtree, as a list of strings.
 
-    For the simplest uses, you may just want to use
-
     Note that for simpler uses, this is itertext() with extra steps. You may not need this.
 
     For example,  all_text_fragments( fromstring('<a>foo<b>bar</b></a>') ) == ['foo', 'bar']
@@ -542,17 +584,13 @@ def all_text_fragments(
       - If your source is XML,
       - this is a convenience function that lets you be pragmatic with creative HTML-like nesting,
         and perhaps should not be used for things that are strictly data.
+      - fragments come in document order, and this includes the tail of under_node itself
+        (useful when you are calling this on each child of something), and the tails of comments and processing instructions
+        (but not their contents).
+      - when you use none of ignore_tags, stop_at, and add_spaces, the walking is done by a single XPath query, which is faster.
 
     TODO: more tests, I'm moderately sure strip doesn't do quite what it should.
 
-    TODO: add add_spaces - an acknowledgment that in non-HTML,
-    as well as equally free-form documents like this project often handles,
-    that element should be considered to split a word (e.g. p in HTML) or
-    that element probably doesn't split a word (e.g. em, sup in HTML)
-    The idea would be that you can specify which elements get spaces inserted and which do not.
-    Probably with defaults for us, which are creative and not necessarily correct,
-    but on average makes fewer weird mistakes (would need to figure that out from the various schemas)
-
     @param under_node: an etree node to work under
 
     @param strip: is what to remove at the edges of each .text and .tail
@@ -569,32 +607,63 @@ def all_text_fragments(
     If a tag name is in this sequence, we stop walking the tree entirely.
     (note that it would still include that tag's tail; CONSIDER: changing that)
 
+    @param add_spaces: an acknowledgment that in non-HTML, as well as equally free-form documents like this project often handles,
+    some elements should be considered to split a word (e.g. p in HTML, al in BWB) and some probably don't (e.g. em, sup in HTML).
+    If False (the default), we add nothing.
+    If True, we add a ' ' fragment where elements mentioned in word_splitting_tags start and end
+    (never two in a row, and not at the start or end).
+    You can also hand in your own collection of tag names.
+
     @return: if join==None (the default), a list of text fragments.
     If join is a string, a single string (joined on that string)
     """
+    if add_spaces is True:
+        add_spaces = word_splitting_tags
+
     ret = []
-    for elem in under_node.iter():  # walks the subtree
-        if isinstance(elem, _Comment) or isinstance(elem, _ProcessingInstruction):
-            continue
-        # print("tag %r in ignore_tags (%r): %s"%(elem.tag, ignore_tags, elem.tag in ignore_tags))
-        if elem.text is not None:
-            if (
-                elem.tag not in ignore_tags
-            ):  # only ignore direct .text contents of ignored tags; tail is considered outside
-                etss = elem.text.strip(strip)
-                if ignore_empty and len(etss) == 0:
-                    pass
-                else:
-                    ret.append(etss)
-        if elem.tail is not None:
-            etss = elem.tail.strip(strip)
-            if ignore_empty and len(etss) == 0:
-                pass
+    if not isinstance(under_node.tag, str):  # comment or PI
+        pass
+
+    elif not ignore_tags  and  stop_at is None  and  not add_spaces:  # fast path: let lxml do the walking
+        if len(under_node) == 0:  # common enough (e.g. most alineas) to avoid even the XPath call
+            fragments = [under_node.text]
+        else:
+            fragments = _all_text_xpath(under_node)
+        fragments.append(under_node.tail)
+        for fragment in fragments:
+            if fragment is not None:
+                fragment = fragment.strip(strip)
+                if len(fragment) > 0  or  not ignore_empty:
+                    ret.append(fragment)
+
+    else:
+        space = False  # whether we owe a space before the next fragment
+        stopping = False
+        walker = lxml.etree.iterwalk(under_node, events=('start', 'end', 'comment', 'pi'))  # pylint: disable=c-extension-no-member
+        for event, elem in walker:
+            if event == 'start':
+                text = elem.text
+                if elem.tag in ignore_tags:  # only ignore direct .text contents of ignored tags; tail is considered outside
+                    text = None
+                if stop_at is not None  and  elem.tag in stop_at:
+                    stopping = True
+                    walker.skip_subtree()  # still gives us the end event, for the tail
             else:
-                ret.append(etss)
+                text = elem.tail
+
+            if add_spaces  and  event in ('start', 'end')  and  elem.tag in add_spaces:
+                space = True
 
-        if stop_at is not None and elem.tag in stop_at:
-            break
+            if text is not None:
+                fragment = text.strip(strip)
+                if len(fragment) > 0  or  not ignore_empty:
+                    if space and len(ret) > 0:
+                        ret.append(' ')
+                    space = False
+                    ret.append(fragment)
+
+            if stopping  and  event == 'end':
+                break
 
     if join is not None:
         ret = join.join(ret)
@@ -1268,8 +1337,178 @@ _html_text_knowledge = { #  usecontents prepend append removesubtree
 
 
 
+_html_text_remove = frozenset( tagname  for tagname, (_, _, _, remove) in _html_text_knowledge.items()  if remove )
+_html_text_squeeze_re = re.compile(r'[\s]+')
+_html_text_newline_spaces_re = re.compile(r'\n[\ ]+')
+
+
+def _localname(tag):
+    " tag name without namespace (leaves non-string tags, like that of comments, alone) "
+    if isinstance(tag, str)  and  tag[:1] == '{':
+        return tag[tag.index('}', 1)+1:]
+    return tag
+
+
+class _HtmlTextCollector:
+    """ The single pass behind html_text(): is fed start and end events (from iterwalk over a tree, or iterparse over bytes)
+        and collects text fragments, without altering the tree.
+
+        The earlier implementation first removed subtrees (script, style, etc.) from a copy of the tree, then walked it.
+        Removing an element moves its tail onto the previous sibling's tail (or the parent's text, if it is the first child),
+        so to give the same output without removing anything, we keep the most recent text or tail 'slot' open
+        until the next element we do not skip, and append to it the tails of skipped elements that would have been moved there.
+        This also means we only read .text and .tail once the parser is certainly past them, which is what makes iterparse work.
+    """
+    def __init__(self, free_memory=False):
+        self.collect = []
+        self.root = None
+        self.slot = None           # [element, 'text' or 'tail', tagname, [skipped elements whose tails to append]]
+        self.skip_depth = 0        # >0 while inside a skipped subtree
+        self.free_memory = free_memory
+        self.bodynodename = None
+        self.body = None           # when streaming, the first child of root called bodynodename, if any
+        self.body_range = [None, None]
+
+    def _add_text(self, tagtext, tagname):
+        if tagname in _html_text_knowledge:
+            if tagtext is not None:
+                if _html_text_knowledge[tagname][0]:
+                    self.collect.append( _html_text_squeeze_re.sub(' ', tagtext) ) # squeeze whitespace (and remove newlines)
+        else:
+            warnings.warn(f'TODO: handle {repr(tagname)} in html_text()')
+
+    def _finish_slot(self):
+        if self.slot is None:
+            return
+        elem, field, tagname, skipped = self.slot
+        self.slot = None
+        if field == 'text':
+            text = elem.text
+        else:
+            text = elem.tail
+        for skipped_elem in skipped:
+            if skipped_elem.tail:
+                text = (text or '') + skipped_elem.tail
+        self._add_text(text, tagname)
+
+        if elem is self.body and field == 'tail':
+            self.body_range[1] = len(self.collect)
+
+        if self.free_memory and field == 'tail':   # we are done with elem and everything before it
+            for skipped_elem in skipped:
+                skipped_elem.clear()
+            if elem is not self.root:
+                elem.clear()
+                parent = elem.getparent()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+    def start(self, elem):
+        "handle a start event.  Returns True if you can skip the subtree under this (we will ignore it anyway)"
+        if self.root is None:
+            self.root = elem
+        if self.skip_depth > 0:
+            self.skip_depth += 1
+            return True
+        tagname = _localname(elem.tag)
+        if tagname in _html_text_remove  and  elem is not self.root:
+            self.skip_depth = 1
+            # where would removing it have put its tail?  Onto the previous (not-removed) sibling's tail, or if there is none, the parent's text,
+            #   both of which are the currently open slot - unless that previous sibling was a comment or PI, whose tail we ignore anyway
+            prev = elem.getprevious()
+            while prev is not None  and  _localname(prev.tag) in _html_text_remove:
+                prev = prev.getprevious()
+            if prev is None  or  isinstance(prev.tag, str):
+                self.slot[3].append( elem )
+            return True
+
+        self._finish_slot()
+        if self.bodynodename is not None  and  self.body is None  and  tagname == self.bodynodename  and  elem.getparent() is self.root:
+            self.body = elem
+            self.body_range[0] = len(self.collect)
+        if tagname in _html_text_knowledge:
+            add_before = _html_text_knowledge[tagname][1]
+            if add_before is not None:
+                self.collect.append( add_before )
+        self.slot = [elem, 'text', tagname, []]
+        return False
+
+    def end(self, elem):
+        "handle an end event"
+        if self.skip_depth > 0:
+            self.skip_depth -= 1
+            return
+        self._finish_slot()
+        tagname = _localname(elem.tag)
+        if tagname in _html_text_knowledge:
+            add_after = _html_text_knowledge[tagname][2]
+            if add_after is not None:
+                self.collect.append( add_after )
+        self.slot = [elem, 'tail', tagname, []]
+
+    def walk(self, under_node, following_siblings=False):
+        " walk an existing tree, skipping subtrees we ignore "
+        self.root = under_node
+        walker = lxml.etree.iterwalk(under_node, events=('start', 'end'))  # pylint: disable=c-extension-no-member
+        for event, elem in walker:
+            if event == 'start':
+                if self.start(elem):
+                    walker.skip_subtree()
+            else:
+                self.end(elem)
+        if following_siblings:  # the tail of the node we walked would also have been given the tails of removed siblings right after it
+            nxt = under_node.getnext()
+            while nxt is not None  and  _localname(nxt.tag) in _html_text_remove:
+                self.slot[3].append( nxt )
+                nxt = nxt.getnext()
+        self._finish_slot()
+        return self.collect
+
+    def parse(self, htmlbytes, bodynodename='body'):
+        " parse HTML bytes incrementally, looking only at what is under bodynodename if there is such a node under the root "
+        self.bodynodename = bodynodename
+        for event, elem in lxml.etree.iterparse( io.BytesIO(htmlbytes), events=('start', 'end'), html=True, recover=True, encoding='utf8' ):  # pylint: disable=c-extension-no-member
+            if event == 'start':
+                self.start(elem)
+            else:
+                self.end(elem)
+        self._finish_slot()
+        if self.body is not None:
+            return self.collect[ self.body_range[0]:self.body_range[1] ]
+        return self.collect
+
+
+def _html_text_combine(collect, join):
+    " the whitespace-reducing last step of html_text "
+    # There are several possible reasons for a _lot_ of whitepace, such as
+    # the indentation in the document, as well as what we just added
+    ret = []
+    combine = ''
+    for string in collect:
+        if len( string.strip() ) > 0: # not only whitespace: add (collected whitespace) and this text
+            if len(combine) > 0:
+                cnl = combine.count('\n')
+                if cnl >= 2:
+                    ret.append('\n\n')
+                if cnl == 1:
+                    ret.append('\n')
+                else:
+                    ret.append(' ')
+                combine = ''
+            ret.append(string)
+        else:
+            combine += string
+
+    if join:
+        ret = ''.join( ret )
+        ret = _html_text_newline_spaces_re.sub('\n', ret.strip()) # TODO: explain the need for this better
+        return ret.strip()
+    else:
+        return ret
+
+
 # CONSIDER: moving this to its own module, this has little to do with etree anymore
-def html_text(etree, join=True, bodynodename='body'):
+def html_text(etree, join=True, bodynodename='body', streaming=False):
     '''
     Take an etree (will also take a bytestring) 
     presumed to contain elements with HTML names,
@@ -1299,12 +1538,21 @@ def html_text(etree, join=True, bodynodename='body'):
 
     @param join: If True, returns a single string (with a little more polishing, of spaces after newlines)
     If False, returns the fragments it collected and added.   Due to the insertion and handing of whitespace, this bears only limited relation to the parts.
+
+    @param streaming: only matters when you hand in bytes or str: if True, we parse incrementally (lxml's iterparse)
+    and free the parts of the tree we are done with, instead of building the whole tree first. Gives the same text, with lower peak memory.
+
+    This does not alter the tree you give it.
     '''
     if etree is None:
         raise ValueError( "You handed None into html_text()" )
 
     # also accept unparsed HTML / XML
     if isinstance( etree, (str, bytes) ):
+        if streaming:
+            if isinstance(etree, str):
+                etree = etree.encode('utf8')
+            return _html_text_combine( _HtmlTextCollector(free_memory=True).parse(etree, bodynodename=bodynodename), join )
         etree = parse_html(etree)
 
     # also accept bs4 objects. It's a stretch for something in an etree module, yes,
@@ -1317,105 +1565,15 @@ def html_text(etree, join=True, bodynodename='body'):
         warnings.warning('no bs4')
         pass
 
-    etree = strip_namespace( etree )
-
-    ## Go through the tree to remove what _html_text_knowledge requests to remove.
-    #   yes, it would be more efficient to do skip it in the main treewalk, but that would require some rewrite
-    # Note: el.drop_tree() is more correct than a plain el.getparent().remove(el)  due to its handing of tail (joined to the previous element, or parent).
-    #   but drop_tree exists only in [lxml.html](https://lxml.de/lxmlhtml.html), not bare lxml, so to ensure this also works on bare lxml objects
-    #   that our parse_html return, the toremove part is roughly the contents of drop_tree() implementation
-    toremove = []
-    for element in etree.iter(): 
-        if element.tag in _html_text_knowledge  and  _html_text_knowledge[element.tag][3]: #whether that tag is marked 'remove subtree'
-            toremove.append( element )
-    
-    for el in toremove:
-        parent = el.getparent()
-        assert parent is not None
-        if el.tail:    # if the element we want to remove has .tail text
-            previous = el.getprevious()
-            if previous is None:                            # - if there isn't a previous sibling, append it to the parent's .text
-                parent.text = (parent.text or '') + el.tail
-            else:                                           # - if there is a previous sibling, append it to ''its'' tail
-                previous.tail = (previous.tail or '') + el.tail
-        # and only then actually remove the element
-        parent.remove(el)
-
-    ## Now augment and collect the fragments we want
-    collect = []
-    def add_text(tagtext, tagname):
-        if tagname in _html_text_knowledge:
-            if tagtext is not None:
-                tagtext = re.sub(r'[\s]+', ' ', tagtext) # squeeze whitespace (and remove newlines)
-                add_text, _, _, _ = _html_text_knowledge[tagname]
-                if add_text:
-                    #print("adding %r"%(tagtext))
-                    collect.append( tagtext )
-        else:
-            warnings.warn(f'TODO: handle {repr(tagname)} in html_text()')
-
-    def add_ws_before(tag):
-        if tag.tag in _html_text_knowledge:
-            _, add_before, _, _ = _html_text_knowledge[tag.tag]
-            if add_before is not None:
-                collect.append( add_before )
-
-    def add_ws_after(tag):
-        if tag.tag in _html_text_knowledge:
-            _, _, add_after, _ = _html_text_knowledge[tag.tag]
-            if add_after is not None:
-                #print("adding %r after %r"%(add_after, tag.tag))
-                collect.append( add_after )
+    if not isinstance(etree, lxml.etree._Element): #  pylint: disable=protected-access,c-extension-no-member
+        etree = _copy(etree)  # which converts (and warns about) non-lxml etrees
 
     walkfrom = etree # if you hand in None, we do everything
     if bodynodename is not None:
-        bf = etree.find( bodynodename )
-        if bf is not None:
-            walkfrom = bf
-
-    for event, el in lxml.etree.iterwalk(walkfrom, events=('start', 'end')):  # pylint: disable=c-extension-no-member
-        # TODO: check that this block isn't wrong
-        if event == 'start':
-            add_ws_before(el)
-            add_text( el.text, el.tag)
-        elif event == 'end':
-            add_ws_after(el)
-            add_text( el.tail, el.tag)
-
-    ## Reduce whitespace from what we just collected
-    # There are several possible reasons for a _lot_ of whitepace, such as
-    # the indentation in the document, as well as what we just added
-    def is_only_whitespace(s):
-        if len(re.sub(r'[\r\n\t\s]','',s))==0:
-            return True
-        return False
+        for child in etree:  # the equivalent of etree.find(bodynodename), but also when there are namespaces
+            if _localname(child.tag) == bodynodename:
+                walkfrom = child
+                break
 
-    ret = []
-    #prev_iow = False
-    combine = ''
-    for string in collect:
-        iow = is_only_whitespace( string )
-        if not iow: # add (collected whitespace) and this text
-            if len(combine) > 0:
-                #ret.append( combine )
-                cnl = combine.count('\n')
-                if cnl >= 2:
-                    ret.append('\n\n')
-                if cnl == 1:
-                    ret.append('\n')
-                else:
-                    ret.append(' ')
-                combine = ''
-            ret.append(string)
-        else:
-            #print( "IOW, adding %r"%string)
-            combine += string
-        #if iow and prev_iow:
-        #prev_iow=iow
-
-    if join:
-        ret = ''.join( ret )
-        ret = re.sub(r'\n[\ ]+', '\n', ret.strip()) # TODO: explain the need for this better
-        return ret.strip()
-    else:
-        return ret
+    collect = _HtmlTextCollector().walk( walkfrom, following_siblings=(walkfrom is not etree) )
+    return _html_text_combine( collect, join )
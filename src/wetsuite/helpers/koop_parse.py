@@ -6,6 +6,7 @@ For more general things, see
   - patterns.py
 """
 
+import io
 import re
 import sys
 import urllib.parse
@@ -13,12 +14,14 @@ import warnings
 import collections
 from typing import Union
 
+import lxml.etree
+
 import wetsuite.datacollect.koop_sru
 import wetsuite.helpers.meta
 
 import wetsuite.helpers.etree
 
-from wetsuite.helpers.etree import _Comment, _ProcessingInstruction, tostring
+from wetsuite.helpers.etree import tostring
 
 
 def cvdr_meta(tree, flatten=False):
@@ -67,10 +70,11 @@ def cvdr_meta(tree, flatten=False):
     """
     # allow people to be lazier - hand in the XML bytes without parsing it into etree
     if isinstance(tree, bytes):
-        tree = wetsuite.helpers.etree.fromstring(tree)
+        tree = wetsuite.helpers.etree.fromstring_stripped(tree)  # our own, so no need to copy
+    else:
+        tree = wetsuite.helpers.etree.strip_namespace(tree)
 
     ret = {}
-    tree = wetsuite.helpers.etree.strip_namespace(tree)
     # print( wetsuite.helpers.etree.tostring(tree).decode('u8') )
 
     # we want tree to be the node under which ./meta lives
@@ -930,8 +934,7 @@ def parse_op_metafile(
       - if as_dict=True, a dict like {key: [(schema, value), ...]}
     """
     if isinstance(input, bytes):
-        root = wetsuite.helpers.etree.fromstring(input)
-        root = wetsuite.helpers.etree.strip_namespace(root)
+        root = wetsuite.helpers.etree.fromstring_stripped(input)
     else:  # assume it's an alrady-parsed etree
         root = input
     ret = []
@@ -969,8 +972,7 @@ def parse_op_searchmeta(input, flatten=False):
     """
     # allow people to be lazier - hand in the XML bytes without parsing it into etree
     if isinstance(input, bytes):
-        root = wetsuite.helpers.etree.fromstring(input)
-        root = wetsuite.helpers.etree.strip_namespace(root)
+        root = wetsuite.helpers.etree.fromstring_stripped(input)
     else:  # assume it's an alrady-parsed etree
         root = input
 
@@ -1065,9 +1067,77 @@ def parse_op_searchmeta(input, flatten=False):
 
 
 # TODO: rename
+# this is based on observations of CVDR and BWB
+_alinea_structure_elements = {
+    "boek": {},
+    "hoofdstuk": {
+        "kop/label": "hoofdstuklabel",
+        "kop/nr": "hoofdstuknr",
+        "kop/titel": "hoofdstuktitel",
+    },
+    "afdeling": {
+        "kop/label": "afdelinglabel",
+        "kop/nr": "afdelingnr",
+        "kop/titel": "afdelingtitel",
+    },
+    "paragraaf": {
+        "kop/label": "paragraaflabel",
+        "kop/nr": "paragraafnr",
+        "kop/titel": "paragraaftitel",
+    },
+    "sub-paragraaf": {
+        "kop/label": "subparagraaflabel",
+        "kop/nr": "subparagraafnr",
+        "kop/titel": "subparagraaftitel",
+    },
+    "artikel": {
+        "kop/label": "artikellabel",
+        "kop/nr": "artikelnr",
+        "kop/titel": "artikeltitel",
+    },
+    "lid": {"lidnr": "lidnr"},
+    "deel": {},  # have
+    "divisie": {
+        "kop/label": "divisielabel",
+        "kop/nr": "divisienr",
+        "kop/titel": "divisietitel",
+        "@bwb-ng-variabel-deel": "divisie_vd",
+    },
+    "circulaire.divisie": {"@bwb-ng-variabel-deel": "circulairedivisie_vd"},
+    "definitielijst": {},
+    "definitie-item": {"term": "term", "li.nr": "li.nr"},
+    "li": {"@nr": "li-nr", "li.nr": "li.nr", "@bwb-ng-variabel-deel": "li_vd"},
+    # some things to have in the stack-like thing, but which don't have details
+    "aanhef": {},  #'afkondiging' 'preambule'
+    "note-toelichting": {},
+    "bijlage": {},
+    "lijst": {},
+    # table, plaatje?
+    # rechtgeving.nl
+    "uitspraak": {"@id": "id"},
+    "section": {"@id": "id", "title/nr": "nr", "title": "title"},
+    "listitem": {},
+    "parablock": {"nr": "nr"},
+    "uitspraak.info": {},
+    "inhoudsindicatie": {"@id": "id"},
+}
+
+def _fetch_alinea_part(pathelem):
+    "the details of a structure element, as mentioned in _alinea_structure_elements"
+    part_dict = {}
+    for what_to_fetch, what_to_call_it in _alinea_structure_elements[pathelem.tag].items():
+        if what_to_fetch[0] == "@":  # TODO: less magical, maybe just call keys 'fetch_attr' and 'fetch_text'?
+            part_dict[what_to_call_it] = pathelem.get(what_to_fetch[1:])
+        else:
+            pathelem_rel = pathelem.find(what_to_fetch)
+            if pathelem_rel is not None:
+                part_dict[what_to_call_it] = pathelem_rel.text
+    return part_dict
+
+
 def alineas_with_selective_path(
-    tree, start_at_path=None, alinea_elemnames=("al",)
-):  # , ignore=['meta-data'], add_raw=True
+    tree, start_at_path=None, alinea_elemnames=("al",), add_raw=True, add_path=True, strip_namespace=True
+):  # , ignore=['meta-data']
     """Given document-style XML data such as that of CVDR XML documents,
     tries to capture most of the interesting structure in easier-to-digest python data form,
     and lessen the nested nature without quite throwing it away.
@@ -1083,7 +1153,13 @@ def alineas_with_selective_path(
     @param start_at_path:   if you gave it the root of an etree, you can do a subset by handing in xpath here
     (alternatively, you could navigate yourself and hand the interesting section in directly)
     @param alinea_elemnames: will be ('al',) for the KOOP sources. Was made into a parameter only to make this perhaps-applicable elsewhere, you probably don't want to touch this.
-    @return: Returns a list of dicts, one for each <al> (or whatever you handed into alinea_elemnames)
+    @param add_raw:         whether to add 'raw' (the element serialized as XML) and 'raw_etree' (the element itself).
+    If you only care about the text, setting this to False saves serializing every alinea.
+    @param add_path:        whether to add 'path'. If False, that key is not present.
+    @param strip_namespace: whether to work on a namespace-stripped copy of the tree (which is what makes the tag names above match).
+    If your tree has no namespaces already (e.g. from wetsuite.helpers.etree.fromstring_stripped),
+    set this to False to avoid copying the whole tree on each call. We do not alter the tree, but 'raw_etree' will then point into it.
+    @return: a generator that yields a dict for each <al> (or whatever you handed into alinea_elemnames)
 
     While on some flat examples, e.g. officiele-publicaties XMLs, each output might not hold much structure,
     some of the better-structured cases, e.g. BWB XMLs, each such output dict might look something like: ::
@@ -1122,66 +1198,9 @@ def alineas_with_selective_path(
         "The behaviour of alineas_with_selective_path() is not fully decided, and may still change"
     )
 
-    # this is based on observations of CVDR and BWB
-    structure_elements = {
-        "boek": {},
-        "hoofdstuk": {
-            "kop/label": "hoofdstuklabel",
-            "kop/nr": "hoofdstuknr",
-            "kop/titel": "hoofdstuktitel",
-        },
-        "afdeling": {
-            "kop/label": "afdelinglabel",
-            "kop/nr": "afdelingnr",
-            "kop/titel": "afdelingtitel",
-        },
-        "paragraaf": {
-            "kop/label": "paragraaflabel",
-            "kop/nr": "paragraafnr",
-            "kop/titel": "paragraaftitel",
-        },
-        "sub-paragraaf": {
-            "kop/label": "subparagraaflabel",
-            "kop/nr": "subparagraafnr",
-            "kop/titel": "subparagraaftitel",
-        },
-        "artikel": {
-            "kop/label": "artikellabel",
-            "kop/nr": "artikelnr",
-            "kop/titel": "artikeltitel",
-        },
-        "lid": {"lidnr": "lidnr"},
-        "deel": {},  # have
-        "divisie": {
-            "kop/label": "divisielabel",
-            "kop/nr": "divisienr",
-            "kop/titel": "divisietitel",
-            "@bwb-ng-variabel-deel": "divisie_vd",
-        },
-        "circulaire.divisie": {"@bwb-ng-variabel-deel": "circulairedivisie_vd"},
-        "definitielijst": {},
-        "definitie-item": {"term": "term", "li.nr": "li.nr"},
-        "li": {"@nr": "li-nr", "li.nr": "li.nr", "@bwb-ng-variabel-deel": "li_vd"},
-        # some things to have in the stack-like thing, but which don't have details
-        "aanhef": {},  #'afkondiging' 'preambule'
-        "note-toelichting": {},
-        "bijlage": {},
-        "lijst": {},
-        # table, plaatje?
-        # rechtgeving.nl
-        "uitspraak": {"@id": "id"},
-        "section": {"@id": "id", "title/nr": "nr", "title": "title"},
-        "listitem": {},
-        "parablock": {"nr": "nr"},
-        "uitspraak.info": {},
-        "inhoudsindicatie": {"@id": "id"},
-    }
-
-    ret = []
-
-    tree = wetsuite.helpers.etree.strip_namespace(tree)
+    if strip_namespace:
+        tree = wetsuite.helpers.etree.strip_namespace(tree)
 
-    # adapted from node_walk
     if start_at_path is not None:
         start = tree.xpath(start_at_path)[
             0
@@ -1189,62 +1208,197 @@ def alineas_with_selective_path(
     else:
         start = tree
 
-    path_to_element = []
-    element_stack = [start]
-    while element_stack:
-        element = element_stack[-1]
-        if path_to_element and element is path_to_element[-1]:
-            path_to_element.pop()
-            element_stack.pop()
-            # print( path_to_element )
-
-            if isinstance(element, _Comment) or isinstance(
-                element, _ProcessingInstruction
-            ):
-                pass
+    # We keep a stack with an entry for each element we are in, each holding
+    #   the xpath-style path to that element, the parts and merged dict up to and including that element,
+    #   and (created when needed) how often each tag name appears among its children, and how many of those we have seen yet.
+    # That way each structure element is looked at once, and paths are built incrementally
+    #   (rather than getpath()ing from the root for every alinea),
+    # The path logic imitates libxml2's: an [index] only when there are same-named siblings.
+    stack = []
+    for event, element in lxml.etree.iterwalk(start, events=("start", "end")):  # pylint: disable=c-extension-no-member
+        if event == "start":
+            if stack:
+                parent_path, parent_parts, parent_merged, parent_counts = stack[-1]
             else:
-                if element.tag in alinea_elemnames:
-                    xpath_path = wetsuite.helpers.etree.path_between(tree, element)
-                    emit = {"path": xpath_path, "parts": [], "merged": {}}
-                    for pathelem in path_to_element:
-                        if pathelem.tag in structure_elements:
-                            part_dict = {}
-                            for what_to_fetch, what_to_call_it in structure_elements[
-                                pathelem.tag
-                            ].items():
-                                if (
-                                    what_to_fetch[0] == "@"
-                                ):  # TODO: less magical, maybe just call keys 'fetch_attr' and 'fetch_text'?
-                                    part_dict[what_to_call_it] = pathelem.get(
-                                        what_to_fetch[1:]
-                                    )
-                                else:
-                                    pathelem_rel = pathelem.find(what_to_fetch)
-                                    if pathelem_rel is None:
-                                        pass
-                                        # print("Did not find %r under %r"%(what_to_fetch, xpath_path))
-                                    else:
-                                        part_dict[what_to_call_it] = pathelem_rel.text
-                            emit["merged"].update(
-                                part_dict
-                            )  # duplicated, easier to access, and clobbered whenever you have an element in the structure twice
-                            part_dict["what"] = pathelem.tag
-                            emit["parts"].append(part_dict)
+                parent_path, parent_parts, parent_merged, parent_counts = None, [], {}, None
+
+            path = None
+            if add_path:
+                if parent_counts is None:
+                    path = wetsuite.helpers.etree.path_between(tree, element)
+                else:
+                    total, seen = parent_counts
+                    seen[element.tag] += 1
+                    if total[element.tag] > 1:
+                        path = "%s/%s[%d]" % (parent_path, element.tag, seen[element.tag])
+                    else:
+                        path = "%s/%s" % (parent_path, element.tag)
+
+            parts, merged = parent_parts, parent_merged
+            if element.tag in _alinea_structure_elements:
+                part_dict = _fetch_alinea_part(element)
+                merged = dict(parent_merged)
+                merged.update(part_dict)  # clobbered whenever you have an element in the structure twice
+                part_dict["what"] = element.tag
+                parts = parent_parts + [part_dict]
+
+            counts = None
+            if add_path and len(element) > 0:
+                counts = (
+                    collections.Counter(child.tag for child in element),
+                    collections.Counter(),
+                )
+            stack.append((path, parts, merged, counts))
 
+        else:
+            path, _, _, _ = stack.pop()
+            if element.tag in alinea_elemnames:
+                if stack:
+                    _, parts, merged, _ = stack[-1]
+                else:
+                    parts, merged = [], {}
+                emit = {}
+                if add_path:
+                    emit["path"] = path
+                emit["parts"] = [dict(part_dict) for part_dict in parts]
+                emit["merged"] = dict(merged)  # duplicated, easier to access
+                if add_raw:
                     emit["raw"] = wetsuite.helpers.etree.tostring(element)
                     emit["raw_etree"] = element
-                    emit["text-flat"] = wetsuite.helpers.etree.all_text_fragments(
-                        element, join=" "
-                    )
-                    # yield emit
-                    ret.append(emit)
+                emit["text-flat"] = wetsuite.helpers.etree.all_text_fragments(
+                    element, join=" "
+                )
+                yield emit
 
+
+def alineas_with_selective_path_streaming(
+    source, alinea_elemnames=("al",), add_raw=True, add_path=True
+):
+    """A variant of alineas_with_selective_path() for large documents:
+    instead of a parsed tree, you give it the document (bytes, a filename, or a file object),
+    which we parse incrementally, forgetting the parts we are done with as we go.
+    Peak memory is then roughly that of the largest alinea plus the structure around it,
+    rather than (at least) the whole tree, plus its namespace-stripped copy.
+
+    Yields the same sort of dicts, with the same 'parts', 'merged', and 'text-flat' values, but note that:
+      - the details of structure elements (e.g. 'kop/nr') are only picked up if they come before the alinea in the document,
+        which is true for the KOOP documents we have seen.
+      - 'path' always has an index on each step (e.g. /toestand/wetgeving[1]/...), because when we emit something,
+        we do not know yet whether there are more same-named siblings to come.  It selects the same element, but is not the same string.
+      - 'raw' and 'raw_etree' are based on a namespace-stripped copy of the alinea, as the tree they came from is being taken apart.
+      - there is no start_at_path; all of the document is considered.
+
+    @param source: the XML document, as bytes, a filename, or a file object
+    @param alinea_elemnames: see alineas_with_selective_path()
+    @param add_raw: see alineas_with_selective_path()
+    @param add_path: see alineas_with_selective_path()
+    @return: a generator that yields a dict for each alinea
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    def localname(tag):
+        if tag[:1] == "{":
+            return tag[tag.index("}") + 1 :]
+        return tag
+
+    # for each element we are in: [namespace-stripped tag, path, Counter of child tags seen, part values (None if not a structure element), whether we hold on to its contents]
+    stack = []
+    holding = 0  # how many alineas we are in (we need their contents when they end, so cannot free anything yet)
+
+    def wanted_from(tag):
+        " for an element that is on top of the stack, which structure element fetches want it "
+        if len(stack) > 1  and  stack[-2][3] is not None:  # parent is a structure element
+            for what_to_fetch, what_to_call_it in _alinea_structure_elements[stack[-2][0]].items():
+                if what_to_fetch == tag:
+                    yield what_to_fetch, what_to_call_it, stack[-2][3]
+        if len(stack) > 2  and  stack[-3][3] is not None:  # grandparent is a structure element
+            for what_to_fetch, what_to_call_it in _alinea_structure_elements[stack[-3][0]].items():
+                if what_to_fetch == "%s/%s" % (stack[-2][0], tag):
+                    yield what_to_fetch, what_to_call_it, stack[-3][3]
+
+    def finish(element):
+        " handles an element that ended, once we are past its tail "
+        nonlocal holding
+        tag, path, _, _, holds = stack[-1]
+
+        # fill in what a structure element wanted from this child (e.g. 'lidnr') or grandchild (e.g. 'kop/nr').
+        #   We do this as soon as that element ends, so that e.g. a <titel> in a <kop> also gets to see the <nr> before it
+        for _, what_to_call_it, values in wanted_from(tag):
+            if what_to_call_it not in values:
+                values[what_to_call_it] = element.text
+        stack.pop()
+
+        if tag in alinea_elemnames:
+            emit = {}
+            if add_path:
+                emit["path"] = path
+            emit["parts"] = []
+            emit["merged"] = {}
+            for ancestor_tag, _, _, values, _ in stack:
+                if values is not None:
+                    part_dict = {}
+                    for what_to_call_it in _alinea_structure_elements[ancestor_tag].values():
+                        if what_to_call_it in values:
+                            part_dict[what_to_call_it] = values[what_to_call_it]
+                    emit["merged"].update(part_dict)
+                    part_dict["what"] = ancestor_tag
+                    emit["parts"].append(part_dict)
+            if add_raw:
+                stripped = wetsuite.helpers.etree.strip_namespace(element)
+                emit["raw"] = wetsuite.helpers.etree.tostring(stripped)
+                emit["raw_etree"] = stripped
+            emit["text-flat"] = wetsuite.helpers.etree.all_text_fragments(
+                element, join=" "
+            )
+            yield emit
+
+        if holds:
+            holding -= 1
+        if holding == 0:  # nothing will look at this element, or what came before it, again
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    ended = None  # its tail (which text-flat includes) is only complete at the next event
+    for event, element in lxml.etree.iterparse(source, events=("start", "end")):  # pylint: disable=c-extension-no-member
+        if ended is not None:
+            yield from finish(ended)
+            ended = None
+
+        if event == "start":
+            tag = localname(element.tag)
+            path = None
+            if add_path:
+                if len(stack) > 0:
+                    parent_path, siblings_seen = stack[-1][1], stack[-1][2]
+                    siblings_seen[tag] += 1
+                    path = "%s/%s[%d]" % (parent_path, tag, siblings_seen[tag])
+                else:
+                    path = "/" + tag
+            values = None
+            if tag in _alinea_structure_elements:
+                values = {}
+                for what_to_fetch, what_to_call_it in _alinea_structure_elements[tag].items():
+                    if what_to_fetch[0] == "@":  # attributes are there at start
+                        attr_value = element.get(what_to_fetch[1:])
+                        if attr_value is None:  # maybe it has a namespace (which the tree variant would have stripped)
+                            for attr_name, attr_val in element.attrib.items():
+                                if localname(attr_name) == what_to_fetch[1:]:
+                                    attr_value = attr_val
+                                    break
+                        values[what_to_call_it] = attr_value
+            holds = tag in alinea_elemnames
+            if holds:
+                holding += 1
+            stack.append([tag, path, collections.Counter(), values, holds])
         else:
-            path_to_element.append(element)
-            for child in reversed(element):
-                element_stack.append(child)
-            # print( element_stack )
-    return ret
+            ended = element
+
+    if ended is not None:
+        yield from finish(ended)
 
 
 def merge_alinea_data(
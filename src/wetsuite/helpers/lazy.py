@@ -59,10 +59,9 @@ def etree(xmlbytes:bytes, strip_namespace=True):
         @param xmlbytes: XML document, as bytes object
         @return: etree root node
     """
-    tree = wetsuite.helpers.etree.fromstring(xmlbytes)
     if strip_namespace:
-        tree = wetsuite.helpers.etree.strip_namespace(tree)
-    return tree
+        return wetsuite.helpers.etree.fromstring_stripped(xmlbytes)
+    return wetsuite.helpers.etree.fromstring(xmlbytes)
 
 
 
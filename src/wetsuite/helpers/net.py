@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 " network related helper functions, such as fetching from URLs "
 import sys
+import time
+import threading
+import concurrent.futures
 
 import requests
 
@@ -90,3 +93,100 @@ def download(
 
     if tofile_path is None:
         return b"".join(ret)
+
+
+class RateLimiter:
+    """Caps how often something may happen, shared across threads.
+
+    Meant for 'be nice to the server' politeness when several threads download in parallel:
+    every call to wait() reserves the next free time slot, and sleeps until it arrives,
+    so that all users of the same RateLimiter together do at most per_sec things per second.
+
+    For example::
+        limiter = RateLimiter(2)
+        for url in urls:
+            limiter.wait()
+            download(url)
+
+    Note that this caps the start of requests, not the amount that are in flight,
+    so it combines well with a (bounded) amount of workers.
+    """
+
+    def __init__(self, per_sec: float):
+        """
+        @param per_sec: the amount of wait()s allowed to return per second, e.g. 2, or 0.5 for one every two seconds.
+        None or 0 means no limit.
+        """
+        if per_sec:
+            self.interval = 1.0 / per_sec
+        else:
+            self.interval = 0.0
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def wait(self):
+        "Sleeps until we are allowed to do the next thing."
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            our_time = max(now, self._next_time)
+            self._next_time = our_time + self.interval
+        if our_time > now:
+            time.sleep(our_time - now)
+
+
+def download_many(urls, workers: int = 4, rate_limiter: RateLimiter = None, timeout=10, retries: int = 2):
+    """Downloads a series of URLs using a pool of threads, yielding results as they come in.
+
+    The point is hiding latency (most of the time of a fetch is waiting for the other end),
+    not doing more requests per second: hand in a RateLimiter to keep the latter in check.
+
+    This only does the network part, and yields to the calling thread,
+    so that you can do storing there - LocalKV stores should not be shared between threads.
+
+    @param urls: an iterable of URL strings. Is consumed lazily, so may be a generator.
+    @param workers: the amount of downloads that may be in flight at the same time.
+    @param rate_limiter: a RateLimiter, waited on before each request (including retries). None means no limiting.
+    @param timeout: timeout of each fetch, passed to download()
+    @param retries: how many times to try again after a timeout or connection error (not after e.g. a 404)
+    @return: a generator of (url, data, exception) tuples, in order of completion rather than input order.
+    data is bytes and exception is None if things went well;
+    data is None and exception is the exception if they did not (e.g. the ValueError that download() raises on a 404).
+    """
+
+    def fetch_one(url):
+        tries_left = max(0, retries) + 1
+        while True:
+            tries_left -= 1
+            if rate_limiter is not None:
+                rate_limiter.wait()
+            try:
+                return download(url, timeout=timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                if tries_left <= 0:
+                    raise
+
+    url_iter = iter(urls)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        in_flight = {}
+        # keep a bounded amount submitted, so that a long generator of URLs isn't materialized
+        for url in url_iter:
+            in_flight[pool.submit(fetch_one, url)] = url
+            if len(in_flight) >= 2 * workers:
+                break
+        while len(in_flight) > 0:
+            done, _ = concurrent.futures.wait(
+                in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                url = in_flight.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    yield url, future.result(), None
+                else:
+                    yield url, None, exc
+                # refill
+                for next_url in url_iter:
+                    in_flight[pool.submit(fetch_one, next_url)] = next_url
+                    break
@@ -18,12 +18,16 @@ Right now the implementation is mostly regexes -- which aren't great for some of
 (But so aren't formal grammars, because real-world variation will be missed)
 
 
-Note that if refined further, this should probably be restructured in a way
-where each matcher can register itself, 
-so that there _isn't_ one central controller function to entangle everything
+Most of the matchers register themselves (see C{register_reference_finder}),
+so that there _isn't_ one central controller function to entangle everything.
+The more textual "artikel" matcher is still a function of its own.
 """
 
+import os
 import re
+import pickle
+import tempfile
+import warnings
 import collections
 import textwrap
 #from typing import List
@@ -32,6 +36,7 @@ import wetsuite.datasets
 import wetsuite.helpers.strings
 import wetsuite.helpers.meta
 import wetsuite.helpers.koop_parse
+import wetsuite.helpers.util
 
 
 def _wetnamen():
@@ -61,13 +66,170 @@ def _wetnamen():
     ret['Awb'] = 'BWBR0005537'
     return ret
 
-_escaped_names = list( re.escape(wetnaam)   for wetnaam in sorted(_wetnamen(), key=lambda x:len(x), reverse=True) )   # pylint: disable=unnecessary-lambda
-_mw = r'[\s,;.]*(?:van\s+het\s+|van\s+de[.]?\s+|van\s+|de\s+)?(%s)'%( '|'.join(_escaped_names) )
-_mw_re = re.compile( _mw, flags=re.I )
-#def _match_wetnamen(text):
-#    return _mw_re.match(text)
-#        if m is not None:
-#            overallmatch_en += m.endpos
+# We match known law names with a character trie, built on first use (see _wetnamen_trie),
+#   rather than a regex alternation of all names, which was slow to compile at import time,
+#   needed the network (to fetch the dataset) before anything in this module could be used,
+#   and did a lot of backtracking when used.
+_wetnamen_trie_cache = None
+
+_WETNAMEN_TRIE_VERSION = 1 # increase when the trie's structure, or how names are cleaned, changes - invalidates the on-disk cache
+
+
+def _build_trie(names):
+    """ Builds a character trie from a sequence of strings, for case-insensitive longest-match lookups (see _trie_longest_match).
+        Nested dicts keyed by lowercased character; the key None marks that a name ends there.
+    """
+    trie = {}
+    for name in names:
+        node = trie
+        for char in name:
+            node = node.setdefault( char.lower(), {} )
+        node[None] = True
+    return trie
+
+
+def _trie_longest_match(trie, text:str, pos:int=0):
+    """ Returns the end offset of the longest string from the trie that text has at pos (case-insensitively), or None if there is none. """
+    node = trie
+    longest = None
+    for i in range(pos, len(text)):
+        node = node.get( text[i].lower() )
+        if node is None:
+            break
+        if None in node:
+            longest = i + 1
+    return longest
+
+
+def _wetnamen_trie(refresh:bool=False):
+    """ The trie of law names (from _wetnamen()), loaded on first use.
+
+        Building it needs the wetnamen dataset, so we cache the built trie in the wetsuite directory,
+        which after the first time means no network access and very little work.
+        Use refresh=True to rebuild it from a freshly loaded dataset.
+
+        If we cannot load it at all (e.g. when offline the first time), we warn, and use an empty trie (matching nothing)
+        for the rest of this process.
+    """
+    global _wetnamen_trie_cache
+    if _wetnamen_trie_cache is not None and not refresh:
+        return _wetnamen_trie_cache
+
+    cache_path = None
+    try:
+        cache_path = os.path.join( wetsuite.helpers.util.wetsuite_dir()['wetsuite_dir'], 'wetnamen_trie.pickle' )
+        if not refresh and os.path.exists( cache_path ):
+            with open( cache_path, 'rb' ) as f:
+                version, trie = pickle.load( f )
+            if version == _WETNAMEN_TRIE_VERSION:
+                _wetnamen_trie_cache = trie
+                return _wetnamen_trie_cache
+    except (OSError, pickle.UnpicklingError, ValueError, EOFError) as e:
+        warnings.warn( 'Could not use cached law name trie (%s), will rebuild it'%e )
+
+    try:
+        trie = _build_trie( _wetnamen() )
+    except Exception as e: # mostly network trouble, but we do not want to break reference finding, pylint: disable=broad-exception-caught
+        warnings.warn( 'Could not load law names (%s), so will not be matching them'%e )
+        _wetnamen_trie_cache = {}
+        return _wetnamen_trie_cache
+
+    if cache_path is not None:
+        # write-and-rename, so that other processes never see half a file.
+        # The temporary file has a unique name, because e.g. parallel workers may all be doing this at the same time.
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp( dir=os.path.dirname(cache_path), prefix='wetnamen_trie.', suffix='.tmp' )
+            with os.fdopen( fd, 'wb' ) as f:
+                pickle.dump( (_WETNAMEN_TRIE_VERSION, trie), f, protocol=pickle.HIGHEST_PROTOCOL )
+            os.replace( tmp_path, cache_path )
+        except OSError as e:
+            warnings.warn( 'Could not cache law name trie: %s'%e )
+            if tmp_path is not None and os.path.exists( tmp_path ):
+                os.remove( tmp_path )
+
+    _wetnamen_trie_cache = trie
+    return _wetnamen_trie_cache
+
+
+_RE_WETNAAM_SEPARATORS = re.compile( r'[\s,;.]*' )
+_RE_WETNAAM_PREFIXES = tuple( re.compile(prefix, flags=re.I)  for prefix in (r'van\s+het\s+', r'van\s+de[.]?\s+', r'van\s+', r'de\s+') )
+
+def _match_wetnaam(text:str):
+    """ Looks for a known law name at the start of text, allowing for some separators, and "van de" style words, before it.
+
+        @return: None if there is no such name,
+        or (start, end) offsets of the name within text (end being where the whole match ends)
+    """
+    trie = _wetnamen_trie()
+    at = _RE_WETNAAM_SEPARATORS.match( text ).end()
+    for prefix_re in _RE_WETNAAM_PREFIXES:
+        prefix_match = prefix_re.match( text, at )
+        if prefix_match is not None:
+            end = _trie_longest_match( trie, text, prefix_match.end() )
+            if end is not None:
+                return prefix_match.end(), end
+    end = _trie_longest_match( trie, text, at )
+    if end is not None:
+        return at, end
+    return None
+
+
+# Things we look for around each "artikel" anchor in find_artikel_references(), and whether they came before or after it.
+#   name -> ( match before and/or after,  include or exclude in match,    regexp to match)
+# The before/after, include/exclude are not used yet,
+#   but are meant to set hard borders when seen before/after the anchor match.
+# These are compiled once, here, rather than for every anchor we find.
+_artikel_find_things = {
+    "grond":       ["B", "E", r"\bgrond(?:_van)?\b"],
+    "bedoeld":     ["B", "E", r"\bbedoeld_in\b"],
+    #'komma':          [  '.',  re.compile(r',')                                         ],
+    "hoofdstuk":   ["A", "I", r"\bhoofdstuk#\b"],
+    "paragraaf":   ["A", "I", r"\bparagraaf#\b"],
+    "aanwijzing":  ["A", "I", r"\b(?:aanwijzing|aanwijzingen)#\b"],
+    "lid":         ["A", "I", r"\b(?:lid_(#)|(L)_(?:lid|leden))"],
+    "volzin":      ["A", "I", r"\b(?:volzin_(#)|(L)_(?:volzin|volzinnen))"],
+    "aanhefonder": ["A", "I", r"((?:\baanhef_en_)?(onder|onderdeel|onderdelen)_[a-z0-9\u00ba]{1,2}(?:_tot_en_met_[a-z0-9\u00ba]{1,2}|_tot_[a-z0-9\u00ba]{1,2}|_en_[a-z0-9\u00ba]{1,2})?)"],
+    "sub":         ["A", "I", r"\bsub_[a-z0-9\u00ba]+\b"],
+    #'vandh':       ['A', 'I',  r'\bvan_(?:het|de)\b'                                    ],  # this also includes some natural wording further away; CONSIDER being able to ask for only closeby matches
+    ##'dezewet':       [  'I',  r'\bde(?:ze)? wet\b'                                    ],
+    #'hierna':          [ 'A', 'E',  r'\b[(]?hierna[:\s]'                               ],
+    #'artikel':          [ 'A', 'E',  r'\bartikel'                                      ],
+}
+# https://wetten.overheid.nl/jci1.3:c:BWBR0005730&hoofdstuk=3&paragraaf=3.3&aanwijzing=3.29
+
+def _compile_artikel_find_things():
+    " turns the regexp strings in _artikel_find_things into compiled patterns, in-place "
+    # numbers in words form
+    re_some_ordinals = "(?:%s)" % (
+        "|".join(wetsuite.helpers.strings.ordinal_nl(i)  for i in range(100))
+    )
+
+    for k, (_, _, res) in _artikel_find_things.items():
+        # make all the above multiline matchers,
+        #   and treat specific characters as signifiers we should be replacing
+        # the 'replace this character' is cheating somewhat because and can lead to incorrect nesting,
+        #   so take care, but it seems worth it for some more readability
+        res = res.replace("_", r"[\s\n]+")
+        res = res.replace("#", r"([0-9.:]+[a-z]*)")
+
+        if "L" in res:
+            # TODO: recall what this... is... doing.
+            rrr = r"(?:O(?:,?_O)*(?:,?_en_O)?)".replace("_", r"[\s\n]+").replace(
+                "O", re_some_ordinals
+            )
+            res = res.replace("L", rrr)
+            # print('AFT',res)
+
+        _artikel_find_things[k][2] = re.compile(res, flags=re.I | re.M)
+
+_compile_artikel_find_things()
+
+# the anchors that find_artikel_references() starts from
+_RE_ARTIKEL = re.compile( r"\b(?:[Aa]rt(?:ikel[.]?|[.]|\b)\s*([0-9.:]+[a-z]*(?:, [0-9.:]+[a-z]*)?))" )
+
+# for splitting lists of ordinals like "eerste, tweede en derde"
+_RE_ORDINAL_LIST_SPLIT = re.compile( r"[\s\n]*(?:,| en\b)", flags=re.M )
 
 
 def find_artikel_references(
@@ -121,9 +283,7 @@ def find_artikel_references(
 
     # find all places that say "artikel"
     artikel_matches = [] # variable in part because each of these likely cuts off the previous
-    for artikel_matchobject in re.finditer(
-        r"\b(?:[Aa]rt(?:ikel[.]?|[.]|\b)\s*([0-9.:]+[a-z]*(?:, [0-9.:]+[a-z]*)?))", string
-    ):
+    for artikel_matchobject in _RE_ARTIKEL.finditer( string ):
         artikel_matches.append(artikel_matchobject)
 
     # for each 'artikel', see if there's something interesting after it
@@ -148,54 +308,6 @@ def find_artikel_references(
             nextmatch = artikel_matches[ matchnum + 1 ]
             wider_end = min( wider_end, nextmatch.start())
 
-        # Look for some specific strings around the matched 'artikel',
-        #   (and record whether they came before or after)
-        find_things = {
-            # name -> ( match before and/or after,  include or exclude in match,    regexp to match)
-            # the before/after, inclide/exclude are not used yet, 
-            #   but are meant to set hard borders when seen before/after the anchor match
-            "grond":       ["B", "E", r"\bgrond(?:_van)?\b"],
-            "bedoeld":     ["B", "E", r"\bbedoeld_in\b"],
-            #'komma':          [  '.',  re.compile(r',')                                         ],
-            "hoofdstuk":   ["A", "I", r"\bhoofdstuk#\b"],
-            "paragraaf":   ["A", "I", r"\bparagraaf#\b"],
-            "aanwijzing":  ["A", "I", r"\b(?:aanwijzing|aanwijzingen)#\b"],
-            "lid":         ["A", "I", r"\b(?:lid_(#)|(L)_(?:lid|leden))"],
-            "volzin":      ["A", "I", r"\b(?:volzin_(#)|(L)_(?:volzin|volzinnen))"],
-            "aanhefonder": ["A", "I", r"((?:\baanhef_en_)?(onder|onderdeel|onderdelen)_[a-z0-9\u00ba]{1,2}(?:_tot_en_met_[a-z0-9\u00ba]{1,2}|_tot_[a-z0-9\u00ba]{1,2}|_en_[a-z0-9\u00ba]{1,2})?)"],  
-            "sub":         ["A", "I", r"\bsub_[a-z0-9\u00ba]+\b"],
-            #'vandh':       ['A', 'I',  r'\bvan_(?:het|de)\b'                                    ],  # this also includes some natural wording further away; CONSIDER being able to ask for only closeby matches
-            ##'dezewet':       [  'I',  r'\bde(?:ze)? wet\b'                                    ],
-            #'hierna':          [ 'A', 'E',  r'\b[(]?hierna[:\s]'                               ],
-            #'artikel':          [ 'A', 'E',  r'\bartikel'                                      ],
-        }
-        # https://wetten.overheid.nl/jci1.3:c:BWBR0005730&hoofdstuk=3&paragraaf=3.3&aanwijzing=3.29
-
-        # numbers in words form
-        re_some_ordinals = "(?:%s)" % (
-            "|".join(wetsuite.helpers.strings.ordinal_nl(i)  for i in range(100))
-        )
-
-        for k, (_, _, res) in find_things.items():
-            # make all the above multiline matchers,
-            #   and treat specific characters as signifiers we should be replacing
-            # the 'replace this character' is cheating somewhat because and can lead to incorrect nesting,
-            #   so take care, but it seems worth it for some more readability
-            res = res.replace("_", r"[\s\n]+")
-            res = res.replace("#", r"([0-9.:]+[a-z]*)")
-
-            if "L" in res:
-                # TODO: recall what this... is... doing.
-                rrr = r"(?:O(?:,?_O)*(?:,?_en_O)?)".replace("_", r"[\s\n]+").replace(
-                    "O", re_some_ordinals
-                )
-                res = res.replace("L", rrr)
-                # print('AFT',res)
-
-            compiled = re.compile(res, flags=re.I | re.M)
-            find_things[k][2] = compiled
-
-
         ## the main "keep adding things" loop
         range_was_widened = True
         while range_was_widened:
@@ -223,7 +335,7 @@ def find_artikel_references(
                 (wider_start,      overallmatch_st,  "before"),
                 (overallmatch_en,  wider_end,        "after"),
             ):
-                for find_name, ( before_andor_after, incl_excl, find_re ) in find_things.items():
+                for find_name, ( before_andor_after, incl_excl, find_re ) in _artikel_find_things.items():
                     # print('looking for %s %s current match (so around %s..%s)'%(find_re, where, rng_st, rng_en))
                     if "A" not in before_andor_after and where == "after":
                         continue # not what we're currently doing
@@ -231,7 +343,7 @@ def find_artikel_references(
                         continue # not what we're currently doing
 
                     # TODO: ideally, we use the closest match; right now we assume there will be only one in range (TODO: fix that)
-                    for now_mo in re.compile(find_re).finditer(
+                    for now_mo in find_re.finditer(
                         string, pos=rng_st, endpos=rng_en
                     ):  # TODO: check whether inclusive or exclusive
                         # now_size = now_mo.end() - now_mo.start()
@@ -306,7 +418,7 @@ def find_artikel_references(
                 lidtext = details[key]
                 words = list(
                     s.strip()
-                    for s in re.split(r"[\s\n]*(?:,| en\b)", lidtext, flags=re.M)
+                    for s in _RE_ORDINAL_LIST_SPLIT.split(lidtext)
                     if len(s.strip()) > 0
                 )
                 for part in words:
@@ -329,11 +441,11 @@ def find_artikel_references(
             text_after = string[overallmatch_en : overallmatch_en+700]#.lstrip(',;. ')
             #print ('\n\nlooking for nameref in %r'%text_after)
 
-            m = _mw_re.match( text_after )
-            if m is not None:
-                #print('MATCHED matched %r, specifically %r'%(m.groups(0), m.group(1)))
-                overallmatch_en += m.end() #len( m.group(0) )
-                nameref = m.group(1)#.strip(',.; ')
+            name_match = _match_wetnaam( text_after )
+            if name_match is not None:
+                name_start, name_end = name_match
+                overallmatch_en += name_end
+                nameref = text_after[name_start:name_end]
                 details['nameref'] = nameref
 
                 # which BWBs that is. This is currently as fragile as the data backing that is.
@@ -357,6 +469,169 @@ def find_artikel_references(
     return ret
 
 
+### The reference finders that find_references() uses ##############################################
+# Each reference type registers
+#   - a compiled pattern
+#   - a function that takes the match object and returns a details dict (or None for no details, or raises ValueError to mark it invalid)
+#   - optionally, anchors: literal strings that every match must start with.
+#     find_references() looks for those first (plain substring search, which is much cheaper than a regex scan),
+#     and only runs the pattern at those places - and not at all when none are present.
+#     Only give anchors when it is true that every match starts with one of them, or you will miss matches.
+#     None means 'scan the whole string' (e.g. for CELEX, which has no constant part)
+_reference_finders = collections.OrderedDict() # name -> (type, anchors, compiled_pattern, details_function)
+
+
+def register_reference_finder(name:str, reftype:str, pattern, details=None, anchors=None):
+    ''' Adds (or replaces) a kind of reference that find_references() can look for.
+
+    @param name: the name find_references() knows it by (and that you can enable/disable it by)
+    @param reftype: what to put in the result's 'type'
+    @param pattern: a compiled regex (or a regex string, which we compile with re.M)
+    @param details: None, or a function that takes the match object and returns a details dict,
+    returns None for 'no details', or raises ValueError, which marks the match as 'invalid'
+    @param anchors: None, or a sequence of strings that every match starts with.
+    Lets us skip regex work on text that cannot match - but if that isn't actually true, you will miss matches.
+    '''
+    if isinstance(pattern, str):
+        pattern = re.compile(pattern, flags=re.M)
+    if anchors is not None:
+        anchors = tuple(anchors)
+    _reference_finders[name] = (reftype, anchors, pattern, details)
+
+
+def _anchor_positions(string:str, anchors):
+    " sorted list of all offsets at which any of the given literal strings appear "
+    positions = set()
+    for anchor in anchors:
+        pos = string.find(anchor)
+        while pos != -1:
+            positions.add(pos)
+            pos = string.find(anchor, pos + 1)
+    return sorted(positions)
+
+
+def _run_reference_finder(string:str, name:str):
+    " yields match dicts for a registered reference finder "
+    reftype, anchors, pattern, details = _reference_finders[name]
+
+    if anchors is None:
+        rematches = pattern.finditer(string)
+    else:
+        # Since every match starts at an anchor, trying to match at each anchor (that is not inside a previous match)
+        #   gives the same matches as finditer would, without having the regex engine walk over everything else
+        def anchored_matches():
+            last_end = 0
+            for pos in _anchor_positions(string, anchors):
+                if pos < last_end:
+                    continue
+                rematch = pattern.match(string, pos)
+                if rematch is not None:
+                    last_end = rematch.end()
+                    yield rematch
+        rematches = anchored_matches()
+
+    for rematch in rematches:
+        match = {}
+        match["type"]  = reftype
+        match["start"] = rematch.start()
+        match["end"]   = rematch.end()
+        match["text"]  = rematch.group(0)
+        if details is not None:
+            try:
+                match_details = details(rematch)
+                if match_details is not None:
+                    match["details"] = match_details
+            except ValueError:
+                match["invalid"] = True
+        yield match
+
+
+### More on the identifier side
+
+register_reference_finder( 'bwb', 'bwb', r'(BWB[RV][0-9]+)', anchors=('BWB',) )
+
+
+def _cvdr_details(rematch):
+    try:
+        workid, expressionid = wetsuite.helpers.koop_parse.cvdr_parse_identifier(rematch.group(0))
+        return {'workid':workid, 'expressionid':expressionid}
+    except Exception: # for now, pylint: disable=broad-exception-caught
+        return None
+
+register_reference_finder( 'cvdr', 'cvdr', re.compile("(CVDR)([0-9]+)([/_][0-9]+)?"), _cvdr_details, anchors=('CVDR',) )
+
+# CONSIDER: we could add a "is it _not_ part of an ECLI" check
+register_reference_finder( 'ljn', 'ljn', r"\b[A-Z][A-Z][0-9][0-9][0-9][0-9](,[\n\s]+[0-9]+)?\b" )
+
+# parse_ecli's ValueError should not happen as of this writing,
+#   as all the things it checks for are also the thing _RE_ECLIFIND matches on, but it's a good check to have, should either change.
+register_reference_finder( 'ecli', 'ecli', wetsuite.helpers.meta._RE_ECLIFIND, # pylint: disable=protected-access
+                           lambda rematch: wetsuite.helpers.meta.parse_ecli(rematch.group(0)), anchors=('ECLI:',) )
+
+register_reference_finder( 'celex', 'celex', wetsuite.helpers.meta._RE_CELEX, # pylint: disable=protected-access
+                           lambda rematch: wetsuite.helpers.meta.parse_celex(rematch.group(0)) )
+
+
+def _bekendmaking_details(rematch):
+    try:
+        return wetsuite.helpers.meta.parse_bekendmaking_id(rematch.group(0))
+    except Exception as e: # for now, pylint: disable=broad-exception-caught
+        raise ValueError(str(e)) from e
+
+register_reference_finder( 'bekendmaking_ids', 'bekend', wetsuite.helpers.meta._re_bekendid, _bekendmaking_details ) # pylint: disable=protected-access
+
+
+# https://www.kcbr.nl/beleid-en-regelgeving-ontwikkelen/aanwijzingen-voor-de-regelgeving/hoofdstuk-3-aspecten-van-vormgeving/ss-33-aanhaling-en-verwijzing/aanwijzing-345-vermelding-vindplaatsen-staatsblad-ed
+def _vindplaats_details(rematch):
+    groups = rematch.groups()
+    return {'what':groups[1], 'jaar':groups[2], 'nummer':groups[3]}
+
+register_reference_finder( 'vindplaatsen', 'vindplaats',
+                           r"\b((Trb|Stb|Stcrt)[.]?[\n\s]+([0-9\u2026.]+)(?:,[\n\s]+([0-9\u2026.]+))?)",
+                           _vindplaats_details, anchors=('Trb', 'Stb', 'Stcrt') )
+
+
+### Less structured
+
+# I'm not sure about the standard here, and the things I've found seem frequently violated
+# vergaderjaar is required
+# the rest is technically made optional here, though in practice some of them must be there
+# allow abbreviations/misspellings?
+# The two replaces imply:
+# - ' ' actually means one or more newline-or-space
+# - '@' actually means zero or more newline-or-space
+# CONSIDER: details; we have to consider all the optional parts, so this would probably change
+register_reference_finder( 'kamerstukken', 'kamerstukken',
+    r"(Kamerstukken|Aanhangsel Handelingen|Handelingen)( I\b| II\b| 1\b| 2\b)?@(,?@(?:vergaderjaar )?[0-9]+[/-][0-9]+)((?:@,@[0-9]+(?: [XVI]+)?|@, item [0-9]+|@, (?:nr|p|blz)[.]@[0-9-]+|@, [A-Z]+)*)".replace(
+        " ", r"[\n\s]+" ).replace( "@", r"[\n\s]*" ),
+    anchors=('Kamerstukken', 'Aanhangsel', 'Handelingen') )
+
+# Turns out there is a lot more variation than want I initially found
+# TODO: figure out what variations there are  (to the degree there is standardization at all)
+# OJ C, C/2024/5510, 11.9.2024
+# OJ L 69, 13.3.2013, p. 1
+# OJ L 168, 30.6.2009, p. 41–47
+# TODO: add parsed details
+register_reference_finder( 'euoj', 'euoj',
+    r"(OJ|Official Journal)[\s]?(C|CA|CI|CE|L|LI|LA|LM|A|P) [0-9]+([\s]?[A-Z]|/[0-9])*(,? p. [0-9\u2013-]+(\s*[\u2013-]\s*[0-9-]+)*|, [0-9]{1,2}[./][0-9]{1,2}[./][0-9][0-9]{2,4})+".replace(
+        " ", r"[\s\n]+" ),
+    anchors=('OJ', 'Official Journal') )
+
+# TODO: figure out real variation, parse details
+register_reference_finder( 'eudir', 'eudir',
+    r"(?:Council )?(Directive) [0-9]{2,4}/[0-9]+(/EC|/EEC|/EU)?".replace(" ", r"[\s\n]+"),
+    anchors=('Council', 'Directive') )
+
+# TODO: find more real examples, this regex is guessing
+def _eureg_details(rematch):
+    groups = rematch.groups()
+    return {'what':groups[1], 'number':groups[2]}
+
+register_reference_finder( 'eureg', 'eureg',
+    r"(?:Council )?(Regulation) [(]?(EC|EEC|EU)[)] (No.? [0-9/]+)".replace(" ", r"[\s\n]+"),
+    _eureg_details, anchors=('Council', 'Regulation') )
+
+
 def find_references(string:str,
                     bwb:bool=True,
                     cvdr:bool=True,
@@ -370,7 +645,8 @@ def find_references(string:str,
                     euoj:bool=True,
                     eudir:bool=True,
                     eureg:bool=True,
-                    debug:bool=False):
+                    debug:bool=False,
+                    others:dict=None):
     ''' Looks for various different kinds of references in the given text, sorts the results. 
 
     Note that there is a gliding scale between 'is this and identifier and will we probably find most of them'
@@ -404,6 +680,8 @@ def find_references(string:str,
         Directive 93/42/EEC of 14 June 1993
     @param eureg: whether to look for EU regulation references, the ones that look like:: 
         Council Regulation (EEC) No 2658/87
+    @param others: a dict from name to bool, to enable or disable finders by name, 
+    which is mostly useful for ones you added via register_reference_finder()
 
     @return:
     A list of dicts (sorted by the value of `start`), each with at least the keys
@@ -413,216 +691,129 @@ def find_references(string:str,
     and probably
       - C{"details"}, with contents that are mostly specific to the type of reference
     '''
+    enabled = {
+        'bwb':bwb, 'cvdr':cvdr, 'ljn':ljn, 'ecli':ecli, 'celex':celex, 'bekendmaking_ids':bekendmaking_ids, 'vindplaatsen':vindplaatsen,
+        'kamerstukken':kamerstukken, 'euoj':euoj, 'eudir':eudir, 'eureg':eureg,
+    }
+    if others is not None:
+        enabled.update( others )
+
     ret = []
+    for name in _reference_finders:
+        if enabled.get(name, False):
+            ret.extend( _run_reference_finder(string, name) )
+
+    ### Less structured yet #############################################
+    if artikel:
+        ret.extend( find_artikel_references(string, debug=debug) )
+
+    ret.sort(key=lambda d:d['start'])
+    return ret
+
+
+def _find_references_init():
+    " process pool initializer: does the one-time work (loading the law name trie) once per worker, not once per document "
+    _wetnamen_trie()
 
-    # There is a good argument to make this funcion call a more pluggable set of functions, rather than be one tangle of a function.
+
+def _find_references_chunk(chunk, text_function, find_kwargs):
+    """ Worker side of find_references_many: takes a list of (key, document),
+        returns a list of (key, list_of_matches_or_None, error_string_or_None)
+        (module-level so that a process pool can pickle it)
+    """
     ret = []
+    for key, document in chunk:
+        try:
+            if text_function is not None:
+                document = text_function(document)
+            elif isinstance(document, bytes):
+                document = document.decode('utf8')
+            ret.append( (key, find_references(document, **find_kwargs), None) )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            ret.append( (key, None, "%s: %s" % (e.__class__.__name__, e)) )
+    return ret
 
-    ### More on the identifier side #######################################################
-    if bwb:
-        _RE_BWBFIND = re.compile( r'(BWB[RV][0-9]+)', flags=re.M )
-
-        for rematch in _RE_BWBFIND.finditer( string ): # pylint: disable=protected-access
-            match = {}
-            match["type"] = "bwb"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            ret.append(match)
-
-    if cvdr:
-        _RE_CVDRFIND = re.compile("(CVDR)([0-9]+)([/_][0-9]+)?")
-        for rematch in _RE_CVDRFIND.finditer( string ):
-            match = {}
-            match["type"] = "cvdr"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            try:
-                workid, expressionid = wetsuite.helpers.koop_parse.cvdr_parse_identifier(rematch.group(0))
-                match["details"] = {'workid':workid, 'expressionid':expressionid}
-            except Exception: # for now, pylint: disable=broad-exception-caught
-                pass
 
-            ret.append(match)
+def find_references_many(documents, dest_store=None, workers:int=None, chunksize:int=20,
+                         text_function=None, verbose:bool=False, **find_kwargs):
+    ''' Runs find_references() over many documents, spread over multiple processes.
 
-    if ljn:
-        for rematch in re.finditer(
-            r"\b[A-Z][A-Z][0-9][0-9][0-9][0-9](,[\n\s]+[0-9]+)?\b", string, flags=re.M
-        ):
-            # CONSIDER: we could add a "is it _not_ part of an ECLI" check
-            match = {}
-            match["type"] = "ljn"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            ret.append(match)
-
-    if ecli:
-        for rematch in wetsuite.helpers.meta._RE_ECLIFIND.finditer( # pylint: disable=protected-access
-            string
-        ):
-            match = {}
-            match["type"] = "ecli"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            try:
-                match["details"] = wetsuite.helpers.meta.parse_ecli(match["text"])
-            except ValueError:
-                # as of this writing this should not happen,
-                #   as all the things it checks for are also the thing _RE_ECLIFIND matches on,
-                #   but it's a good check to have, should either change.
-                match["invalid"] = True
-            ret.append(match)
+    For example::
+        src  = wetsuite.helpers.localdata.LocalKV('rechtspraak_text.db', str, str, read_only=True)
+        dest = wetsuite.helpers.localdata.MsgpackKV('rechtspraak_refs.db')
+        print( find_references_many(src, dest, verbose=True) )
+    or, without storing::
+        for key, matches in find_references_many( (fn, open(fn).read())  for fn in filenames ):
+            ...
 
-    if celex:
-        for rematch in wetsuite.helpers.meta._RE_CELEX.finditer( # pylint: disable=protected-access
-            string
-        ):
-            match = {}
-            match["type"] = "celex"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            try:
-                match["details"] = wetsuite.helpers.meta.parse_celex(rematch.group(0))
-            except ValueError:
-                match["invalid"] = True
-            ret.append(match)
+    The patterns are compiled when the module is imported, so each worker does that (and loads the law names) once, not per document.
 
-    if bekendmaking_ids:
-        for rematch in wetsuite.helpers.meta._re_bekendid.finditer( # pylint: disable=protected-access
-            string
-        ):
-            match = {}
-            match["type"] = "bekend"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            try:
-                match["details"] = wetsuite.helpers.meta.parse_bekendmaking_id(rematch.group(0))
-            except Exception: # for now, pylint: disable=broad-exception-caught
-                match["invalid"] = True
-            ret.append(match)
+    @param documents: either a store (anything with keys() and get(), e.g. a LocalKV), or an iterable of (key, document) tuples.
+    Documents are str, or bytes (decoded as UTF8), or whatever text_function takes.
 
+    @param dest_store: if None, we return a generator that yields (key, list_of_matches) tuples, in the order they finish (not the order you gave them).
+    If a store (e.g. a MsgpackKV), we put the matches there under the same key, and return a dict with statistics.
+    Keys that are already in dest_store are skipped, so when interrupted, just call it again and it continues where it left off.
+    Only this (main) process writes to it, so there is no concern about concurrent sqlite access.
 
-    if vindplaatsen:
-        # https://www.kcbr.nl/beleid-en-regelgeving-ontwikkelen/aanwijzingen-voor-de-regelgeving/hoofdstuk-3-aspecten-van-vormgeving/ss-33-aanhaling-en-verwijzing/aanwijzing-345-vermelding-vindplaatsen-staatsblad-ed
-        for rematch in re.finditer(
-            r"\b((Trb|Stb|Stcrt)[.]?[\n\s]+([0-9\u2026.]+)(?:,[\n\s]+([0-9\u2026.]+))?)",
-            string,
-            flags=re.M,
-        ):
-            match = {}
-            match["type"] = "vindplaats"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            try:
-                match["details"] = {}
-                match["details"]['what']   = rematch.groups()[1]
-                match["details"]['jaar']   = rematch.groups()[2]
-                match["details"]['nummer'] = rematch.groups()[3]
-            except Exception: # for now, pylint: disable=broad-exception-caught
-                pass
-            ret.append(match)
-
-    ### Less structured #################################################
-    if kamerstukken:
-        # I'm not sure about the standard here, and the things I've found seem frequently violated
-        # vergaderjaar is required
-        # the rest is technically made optional here, though in practice some of them must be there
-        # allow abbreviations/misspellings?
-        #                                                                         _____________________________________  ________________________________________________________________________
-        kre = r"(Kamerstukken|Aanhangsel Handelingen|Handelingen)( I\b| II\b| 1\b| 2\b)?@(,?@(?:vergaderjaar )?[0-9]+[/-][0-9]+)((?:@,@[0-9]+(?: [XVI]+)?|@, item [0-9]+|@, (?:nr|p|blz)[.]@[0-9-]+|@, [A-Z]+)*)"
-        # these two replaces imply:
-        # - ' ' actually means one or more newline-or-space
-        # - '@' actually means zero or more newline-or-space
-        kre = kre.replace( " ", r"[\n\s]+" ).replace( "@", r"[\n\s]*" )
-        #print(kre)
-        for rematch in re.finditer(kre, string, flags=re.M):
-            match = {}
-            match["type" ] = "kamerstukken"
-            match["start"] = rematch.start()
-            match["end"]   = rematch.end()
-            match["text"]  = rematch.group(0)
-            # try:
-            #     # CONSIDER: we have to consider all the optional parts, so this would probably change
-            #     groups = rematch.groups()
-            #     match["details"] = {}
-            #     #match["details"]['groups']  = groups
-            #     match["details"]['what']    = groups[0]
-            #     match["details"]['whatnum'] = groups[1]
-            #     match["details"]['jaar']    = groups[2]
-            #     match["details"]['rest']    = groups[3]
-            # except Exception as e:
-            #     pass
-            ret.append(match)
-
-    if euoj:
-        # Turns out there is a lot more variation than want I initially found
-        # TODO: figure out what variations there are  (to the degree there is standardization at all)
-        # OJ C, C/2024/5510, 11.9.2024
-        # OJ L 69, 13.3.2013, p. 1
-        # OJ L 168, 30.6.2009, p. 41–47
-        _RE_EUOJ = re.compile(
-            r"(OJ|Official Journal)[\s]?(C|CA|CI|CE|L|LI|LA|LM|A|P) [0-9]+([\s]?[A-Z]|/[0-9])*(,? p. [0-9\u2013-]+(\s*[\u2013-]\s*[0-9-]+)*|, [0-9]{1,2}[./][0-9]{1,2}[./][0-9][0-9]{2,4})+".replace(
-                " ", r"[\s\n]+"
-            ),
-            flags=re.M,
-        )
-        for rematch in _RE_EUOJ.finditer(string):
-            match = {}
-            match["type"] = "euoj"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            # TODO: add parsed details
-            ret.append(match)
-
-    if eudir:
-        # TODO: figure out real variation
-        _RE_EUDIR = re.compile(
-            r"(?:Council )?(Directive) [0-9]{2,4}/[0-9]+(/EC|/EEC|/EU)?".replace(" ", r"[\s\n]+"),
-            flags=re.M,
-        )
+    @param workers: number of worker processes. None means the amount of CPUs.
+    1 means do it in this process, which is slower but easier to debug.
 
-        for rematch in _RE_EUDIR.finditer(string):
-            match = {}
-            match["type"] = "eudir"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            # TODO: parse details
-            ret.append(match)
-
-    if eureg:
-        # TODO: find more real examples, this regex is guessing
-        _RE_EUREG = re.compile(
-            r"(?:Council )?(Regulation) [(]?(EC|EEC|EU)[)] (No.? [0-9/]+)".replace(" ", r"[\s\n]+"),
-            flags=re.M,
-        )
-        for rematch in _RE_EUREG.finditer(string):
-            match = {}
-            match["type"] = "eureg"
-            match["start"] = rematch.start()
-            match["end"] = rematch.end()
-            match["text"] = rematch.group(0)
-            try:
-                match["details"] = {}
-                match["details"]['what'] = rematch.groups()[1]
-                match["details"]['number'] = rematch.groups()[2]
-            except Exception: # for now, pylint: disable=broad-exception-caught
-                pass
-            ret.append(match)
+    @param chunksize: how many documents to hand to a worker at a time.
 
-    ### Less structured yet #############################################
-    if artikel:
-        ret.extend( find_artikel_references(string, debug=debug) )
+    @param text_function: if not None, a function that turns each document into text (e.g. wetsuite.helpers.lazy.html_text),
+    run in the workers. It must be picklable, so a module-level function, not a lambda.
 
-    ret.sort(key=lambda d:d['start'])
-    return ret
+    @param verbose: whether to print progress and throughput (documents per second) every now and then.
+
+    @param find_kwargs: handed to find_references(), e.g. artikel=False
+
+    @return: a generator (if dest_store is None), or a dict with counts of 'done', 'skipped', 'errors', and 'seconds' and 'per_sec'.
+    Documents we failed on are reported (in verbose mode) and counted, but not yielded or stored.
+    '''
+    progress = wetsuite.helpers.util.ProgressStats(verbose=verbose)
+    stats = progress.stats
+
+    def todo():
+        "yields (key, document), fetched only when needed, of the things not done yet"
+        if hasattr(documents, 'keys') and hasattr(documents, 'get'):
+            items = ( (key, documents.get(key))  for key in documents.keys() )
+        else:
+            items = documents
+        for key, document in items:
+            if dest_store is not None  and  key in dest_store:
+                stats["skipped"] += 1
+                continue
+            yield key, document
+
+    # checked here rather than (only) in chunked(), because that would not complain until the generator below is first used
+    if chunksize < 1:
+        raise ValueError("chunksize should be at least 1, not %r" % chunksize)
+
+    def each_document():
+        "yields (key, matches) for each document that worked, counts and reports the rest"
+        for chunk_results in wetsuite.helpers.util.map_chunks( _find_references_chunk, wetsuite.helpers.util.chunked(todo(), chunksize),
+                                                               workers=workers, args=(text_function, find_kwargs), initializer=_find_references_init ):
+            for key, matches, error in chunk_results:
+                if error is None:
+                    stats["done"] += 1
+                    yield key, matches
+                else:
+                    stats["errors"] += 1
+                    if verbose:
+                        print("ERROR finding references in %r: %s" % (key, error))
+            progress.report()
+        progress.finish()
+
+    if dest_store is None:
+        return each_document()
+
+    for key, matches in each_document():
+        dest_store.put(key, matches, commit=False)
+        if stats["done"] % 1000 == 0:
+            dest_store.commit()
+    dest_store.commit()
+    return stats
 
 
 def mark_references_spacy(doc, matches, # replace=True,
@@ -671,14 +862,11 @@ def mark_references_spacy(doc, matches, # replace=True,
 
 
 def simple_tokenize(string: str):
-    """ Quick and dirty splitter into words. Mainly used by C{abbrev_find}
+    """ Quick and dirty splitter into words. Mainly used by C{abbrev_find}.
+        Is helpers.strings.simple_tokenize, keeping brackets and periods in tokens, and stripping single quotes off them.
     @param string: the string to split up.    
     """
-    l = re.split(
-        '[\\s!@#$%^&*":;/,?\xab\xbb\u2018\u2019\u201a\u201b\u201c\u201d\u201e\u201f\u2039\u203a\u2358\u275b\u275c\u275d\u275e\u275f\u2760\u276e\u276f\u2e42\u301d\u301e\u301f\uff02\U0001f676\U0001f677\U0001f678-]+',
-        string,
-    )
-    return list(e.strip("'") for e in l if len(e) > 0)
+    return wetsuite.helpers.strings.simple_tokenize( string, keep_punctuation=True, strip_quotes=True )
 
 
 def abbrev_find(string: str):
@@ -84,13 +84,19 @@
 """
 
 
+import io
 import re
+import copy
 import warnings
 import pprint
+import functools
 
 import bs4   # arguably should be inside each class so we can function without some of these imports
+import lxml.etree
+import msgpack
 
 import wetsuite.helpers.strings
+import wetsuite.helpers.util
 import wetsuite.helpers.koop_parse
 import wetsuite.helpers.etree
 import wetsuite.extras.pdf
@@ -115,9 +121,21 @@ def fix_ascii_blah(bytesdata: bytes):
 
 
 def _split_officielepublicaties_xml(tree, start_at):
-    """Code shared between a lot of the officiele-publicaties XML extraction"""
-    ret = []  #  (metadata, intermediate, debugsomething, text)
+    """Code shared between a lot of the officiele-publicaties XML extraction.
+    Returns a list of (metadata, intermediate, text) - see _iter_officielepublicaties_xml for the generator form.
+    """
+    return list( _iter_officielepublicaties_xml(tree, start_at) )
+
+
+def _iter_officielepublicaties_xml(tree, start_at, raw=True, paths=True):
+    """Generator version of _split_officielepublicaties_xml, yielding each (metadata, intermediate, text) as it is found.
 
+    @param tree: a namespace-stripped tree (like DocumentContext.stripped_tree), which we only read from.
+
+    @param raw: whether to put 'raw' (serialized XML) and 'raw_etree' into the intermediate dict.
+    If False, that dict is empty, and we skip the serialization work.
+    @param paths: whether to put the xpath 'path' into the metadata.
+    """
     ## ensure start_at_node is a node object, and atart_at_path is a string path (to it)
     if (
         start_at is None
@@ -153,17 +171,22 @@ def _split_officielepublicaties_xml(tree, start_at):
             "Al",
             #'entry',
         ),
+        add_raw=raw,
+        add_path=paths,
+        strip_namespace=False,  # it already is, and copying it for each start_at would be wasteful
     ):
         # print('FR',fragment)
         meta = fragment
-        inter = {
-            "raw": fragment.pop("raw"),
-            "rawtype": "xml",
-            "raw_etree": fragment.pop("raw_etree"),
-        }
+        if raw:
+            inter = {
+                "raw": fragment.pop("raw"),
+                "rawtype": "xml",
+                "raw_etree": fragment.pop("raw_etree"),
+            }
+        else:
+            inter = {}
         text_flat = fragment.pop("text-flat")
-        ret.append((meta, inter, text_flat))
-    return ret
+        yield (meta, inter, text_flat)
 
 
 _op_re = re.compile(r".*officiele-publicatie.*")
@@ -254,16 +277,210 @@ def _split_officielepublicaties_html(soup):
 ###################################################################################################
 
 
+class DocumentContext:
+    """ Parsed forms of one document, shared between all the Fragments classes that look at it.
+
+        decide() asks every registered class about the same document,
+        and most of those would otherwise each do their own is_xml(), fromstring(), strip_namespace(), or BeautifulSoup parse.
+        Everything in here is worked out the first time something asks for it, and remembered after that,
+        so a document is sniffed and parsed (at most) once per form, however many classes look at it.
+
+        Since the trees are shared, Fragments classes should treat them as read-only.
+
+        You would typically not create one of these yourself, decide() does that,
+        but you can hand one to a Fragments class if you are driving one directly.
+    """
+
+    def __init__(self, docbytes: bytes):
+        """
+        @param docbytes: the document, as a bytestring
+        """
+        if not isinstance(docbytes, bytes):
+            raise ValueError("This class only accepts files as bytestrings")
+        self.docbytes = docbytes
+        self._xml_bytes = None
+        self._filetype = None
+        self._is_xml = None
+        self._root_tag = None
+        self._tag_names = None
+        self._html_bytes = None  # False means 'checked, and it is not HTML'
+        self._tree = None
+        self._stripped_tree = None
+        self._soup = None
+        self._html_etree = None
+
+    @property
+    def xml_bytes(self) -> bytes:
+        "the document bytes with fix_ascii_blah() applied, which is what we hand to the XML parser"
+        if self._xml_bytes is None:
+            self._xml_bytes = fix_ascii_blah(self.docbytes)
+        return self._xml_bytes
+
+    @property
+    def filetype(self) -> str:
+        "what wetsuite.helpers.util._filetype() says about this, e.g. 'xml', 'html', 'pdf', 'zip'"
+        if self._filetype is None:
+            self._filetype = wetsuite.helpers.util._filetype(self.xml_bytes)  # pylint: disable=protected-access
+            if self._filetype == 'xml':  # which means it ran is_xml, and it said yes
+                self._is_xml = True
+        return self._filetype
+
+    @property
+    def is_xml(self) -> bool:
+        "whether wetsuite.helpers.util.is_xml() thinks this is XML"
+        if self._is_xml is None:
+            self._is_xml = wetsuite.helpers.util.is_xml(self.xml_bytes)
+        return self._is_xml
+
+    @property
+    def root_tag(self) -> str:
+        """ The root element's tag name, without namespace.
+            Reads only as far as the root element, unless we already had the tree.
+            (may raise if it is not XML; check is_xml first)
+        """
+        if self._root_tag is None:
+            if self._tree is not None:
+                tag = self._tree.tag
+            else:
+                tag = None
+                for _, elem in lxml.etree.iterparse( io.BytesIO(self.xml_bytes), events=('start',) ):
+                    tag = elem.tag
+                    break
+            if tag is not None and tag.startswith('{'):
+                tag = tag[tag.index('}')+1:]
+            self._root_tag = tag
+        return self._root_tag
+
+    @property
+    def tag_names(self) -> set:
+        "the set of (namespace-stripped) element names that appear anywhere in the XML (see find_tags)"
+        if self._tag_names is None:
+            self.find_tags( () )
+        return self._tag_names
+
+    def find_tags(self, wanted) -> set:
+        """ Which of the given (namespace-stripped) element names appear anywhere in the XML.
+
+            This scans the XML with a parser that builds no tree, and stops as soon as it has seen all of them,
+            so it takes little memory even on large documents (the trees are only made if a Fragments class asks for them).
+            A scan that went to the end remembers all names, so later calls (and tag_names) are answered without another.
+            (may raise if it is not XML; check is_xml first)
+
+            @param wanted: a collection of element names
+            @return: a set, the subset of wanted that appears
+        """
+        wanted = set(wanted)
+        if self._tag_names is not None:
+            return wanted.intersection( self._tag_names )
+
+        seen = set()
+        class _TagCollector:  # the parser target interface; start() is all we need
+            def start(self, tag, attrib):  # pylint: disable=unused-argument
+                seen.add( tag[tag.index('}')+1:]  if tag.startswith('{')  else  tag )
+            def close(self):
+                pass
+
+        parser = lxml.etree.XMLParser( target=_TagCollector() )  # pylint: disable=c-extension-no-member
+        data, chunk_size = self.xml_bytes, 65536
+        for offset in range(0, len(data), chunk_size):
+            parser.feed( data[offset:offset + chunk_size] )
+            if len(wanted) > 0  and  wanted <= seen:
+                return wanted  # (not a complete scan, so we do not remember seen as tag_names)
+        parser.close()
+        self._tag_names = seen
+        return wanted.intersection( seen )
+
+    @property
+    def html_bytes(self):
+        """ If the document is HTML, that HTML;
+            if it is a .html.zip, the HTML within it;
+            None otherwise (this includes anything with an XML declaration, which we consider not HTML here).
+        """
+        if self._html_bytes is None:
+            if wetsuite.helpers.util.has_xml_header(self.docbytes):
+                self._html_bytes = False
+            elif wetsuite.helpers.util.is_html(self.docbytes):
+                self._html_bytes = self.docbytes
+            elif wetsuite.helpers.util.is_htmlzip(self.docbytes):
+                self._html_bytes = wetsuite.helpers.util.get_ziphtml(self.docbytes)
+            else:
+                self._html_bytes = False
+        if self._html_bytes is False:
+            return None
+        return self._html_bytes
+
+    @property
+    def tree(self):
+        "the document parsed as XML (may raise if it does not parse)"
+        if self._tree is None:
+            self._tree = wetsuite.helpers.etree.fromstring(self.xml_bytes)
+        return self._tree
+
+    @property
+    def stripped_tree(self):
+        "the XML tree, with namespaces removed (we do that unconditionally)"
+        if self._stripped_tree is None:
+            if self._tree is None:  # nothing asked for the tree with namespaces, so we need not keep it around, or copy it
+                self._stripped_tree = wetsuite.helpers.etree.fromstring_stripped(self.xml_bytes)
+            else:
+                self._stripped_tree = wetsuite.helpers.etree.strip_namespace(self._tree)
+        return self._stripped_tree
+
+    @property
+    def soup(self):
+        "html_bytes, parsed with BeautifulSoup (None if this is not HTML)"
+        if self._soup is None:
+            if self.html_bytes is None:
+                return None
+            with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
+                warnings.simplefilter("ignore")
+                self._soup = bs4.BeautifulSoup(self.html_bytes, features="lxml")
+        return self._soup
+
+    @property
+    def html_etree(self):
+        "html_bytes, parsed with wetsuite.helpers.etree.parse_html (None if this is not HTML)"
+        if self._html_etree is None:
+            if self.html_bytes is None:
+                return None
+            self._html_etree = wetsuite.helpers.etree.parse_html(self.html_bytes)
+        return self._html_etree
+
+
 class Fragments:
-    "Abstractish base class explaining the purpose of implementing this"
+    """ Abstractish base class explaining the purpose of implementing this
+
+        Subclasses can also declare what they handle, which decide() uses to skip asking classes that would say no anyway.
+        Each of these is a necessary condition, not a sufficient one - accepts() and suitableness() still have the final say.
+        Leaving one at None means 'do not filter on this', so a class that declares nothing is always asked.
+          - filetypes:   which wetsuite.helpers.util._filetype() answers this class handles (a .html.zip is 'zip')
+          - root_tags:   for XML, the namespace-stripped root element names it handles
+          - marker_tags: for XML, element names of which at least one must appear somewhere in the document
+            (checked with a scan that builds no tree, so a document that no marker-declaring class wants is never fully parsed here)
+    """
     # CONSIDER: adding a function that describes the parser
 
-    def __init__(self, docbytes: bytes, debug: bool = False):
-        """Hand the document bytestring into this. Nothing happens yet; you call accepts(), then suitableness(), then possibly fragments() -- see example use in decide()."""
+    filetypes = None
+    root_tags = None
+    marker_tags = None
+
+    # Bump this when a change to a class changes what it outputs,
+    # so that anything cached by feeling_lucky(cache_store=...) for the older version is no longer used.
+    version = 1
+
+    def __init__(self, docbytes: bytes, debug: bool = False, context: DocumentContext = None):
+        """Hand the document bytestring into this. Nothing happens yet; you call accepts(), then suitableness(), then possibly fragments() -- see example use in decide().
+
+        @param context: a DocumentContext for the same docbytes, to share parsing work with other Fragments objects.
+        If not given, we make our own.
+        """
         if not isinstance(docbytes, bytes):
             raise ValueError("This class only accepts files as bytestrings")
+        if context is None:
+            context = DocumentContext(docbytes)
         self.docbytes = docbytes
         self.debug = debug
+        self.context = context
 
     def accepts(self) -> bool:
         """whether we would consider parsing that at all.
@@ -286,11 +503,25 @@ class Fragments:
         )
 
     def fragments(self):
-        "yields a tuple for each fragment"
+        "returns a list with a (metadata, intermediate, text) tuple for each fragment"
         raise NotImplementedError(
             "Please implement this, it comes from an essentially-abstract class"
         )
 
+    def iter_fragments(self, raw: bool = True, paths: bool = True):
+        """ Like fragments(), but a generator, so that classes that can produce fragments as they find them
+            don't need to hold them all in memory.
+
+            The parameters say what you do not need, so that implementations can skip that work.
+            They are permission to leave things out, not a guarantee that they will be left out.
+            This base implementation just iterates over fragments(); classes that can do better override this.
+
+            @param raw: whether you want the raw form (e.g. serialized XML) in the intermediate dict.
+            @param paths: whether you want paths to the source element in the metadata.
+        """
+        # pylint: disable=unused-argument
+        yield from self.fragments()
+
     # CONSIDER: meta()
 
 
@@ -299,12 +530,15 @@ class Fragments:
 class Fragments_XML_BWB(Fragments):
     "Turn BWB in XML form into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    root_tags = ('toestand',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         #if self.tree.tag == "toestand":
@@ -314,12 +548,10 @@ class Fragments_XML_BWB(Fragments):
             return 5000
 
     def fragments(self):
-        self.tree = wetsuite.helpers.etree.fromstring(      self.docbytes )
-        self.tree = wetsuite.helpers.etree.strip_namespace( self.tree     ) # choice to remove namespaces unconditionally
-
         # PRELIMINARY TESTS
         ret = []
-        fragments = wetsuite.helpers.koop_parse.alineas_with_selective_path(self.tree)
+        # Some BWB laws are large, so we parse them streaming, which never holds the whole tree.   Merging uses neither raw nor path.
+        fragments = wetsuite.helpers.koop_parse.alineas_with_selective_path_streaming(self.context.xml_bytes, add_raw=False, add_path=False)
         # TODO: detect what level gives reasonably-sized chunks on average, to hand into mer
         for part_id, part_text_list in wetsuite.helpers.koop_parse.merge_alinea_data( fragments ):
             for part in part_text_list:
@@ -342,12 +574,15 @@ class Fragments_XML_BWB(Fragments):
 class Fragments_XML_CVDR(Fragments):
     "Turn CVDR in XML form into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    root_tags = ('cvdr',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         if b'standaarden.overheid.nl/cvdr/terms' in self.docbytes[:500]: #part of the namespace URL, seems better than '<cvdr' ?
@@ -360,22 +595,7 @@ class Fragments_XML_CVDR(Fragments):
         #    return 5000
 
     def fragments(self):
-        self.tree = wetsuite.helpers.etree.fromstring(      self.docbytes )
-        self.tree = wetsuite.helpers.etree.strip_namespace( self.tree     )  # choice to remove namespaces unconditionally
-
-        # PRELIMINARY TESTS
-        ret = []
-        for fragment in wetsuite.helpers.koop_parse.alineas_with_selective_path( self.tree ):
-            raw = fragment.pop("raw")
-            fragment.pop("raw_etree")
-            text_flat = fragment.pop("text-flat")
-            ret.append(
-                (
-                    fragment,
-                    {"raw": raw, "rawtype": "xml"},  #'raw':part_text_list},
-                    text_flat,
-                )
-            )
+        ret = list( self.iter_fragments() )
 
         # # TODO: detect what level gives reasonably-sized chunks on average, to hand into merge
         # for part_id, part_text_list in wetsuite.helpers.koop_parse.merge_alinea_data( fragments ):
@@ -388,12 +608,31 @@ class Fragments_XML_CVDR(Fragments):
         #         ) )
         return ret
 
+    def iter_fragments(self, raw=True, paths=True):
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
+
+        # PRELIMINARY TESTS
+        for fragment in wetsuite.helpers.koop_parse.alineas_with_selective_path( self.tree, add_raw=raw, add_path=paths, strip_namespace=False ):
+            text_flat = fragment.pop("text-flat")
+            if raw:
+                inter = {"raw": fragment.pop("raw"), "rawtype": "xml"}  #'raw':part_text_list},
+                fragment.pop("raw_etree")
+            else:
+                inter = {}
+            yield (
+                fragment,
+                inter,
+                text_flat,
+            )
+
 
 class Fragments_HTML_CVDR(Fragments):
     "Turn CVDR in HTML form into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
@@ -408,9 +647,7 @@ class Fragments_HTML_CVDR(Fragments):
             return 5000
 
     def fragments(self):
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
         return _split_officielepublicaties_html(
             self.soup
         )  # preliminary do-anything; TODO: this is a case where we can probably do better
@@ -419,21 +656,17 @@ class Fragments_HTML_CVDR(Fragments):
 class Fragments_HTML_OP_Stcrt(Fragments):
     "Turn staatscourat in HTML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         if b'OVERHEIDop.publicationName' in self.docbytes and b'Staatscourant' in self.docbytes: # TODO: this probably overaccepts, check
@@ -448,9 +681,7 @@ class Fragments_HTML_OP_Stcrt(Fragments):
         #    return 5000
 
     def fragments(self):
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
 
         ret = _split_officielepublicaties_html(self.soup)
         return ret
@@ -459,21 +690,17 @@ class Fragments_HTML_OP_Stcrt(Fragments):
 class Fragments_HTML_OP_Stb(Fragments):
     "Turn staatsblad in HTML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         if b'OVERHEIDop.publicationName' in self.docbytes and b'Staatsblad' in self.docbytes: # TODO: this probably overaccepts, check
@@ -490,6 +717,7 @@ class Fragments_HTML_OP_Stb(Fragments):
         #    return 5000
 
     def fragments(self):
+        self.soup = self.context.soup
         ret = _split_officielepublicaties_html(self.soup)
         return ret
 
@@ -497,21 +725,17 @@ class Fragments_HTML_OP_Stb(Fragments):
 class Fragments_HTML_OP_Gmb(Fragments):
     "Turn gemeenteblad in HTML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         if b'OVERHEIDop.publicationName' in self.docbytes and b'Gemeenteblad' in self.docbytes: # TODO: this probably overaccepts, check
@@ -528,9 +752,7 @@ class Fragments_HTML_OP_Gmb(Fragments):
         #    return 5000
 
     def fragments(self):
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
         ret = _split_officielepublicaties_html(self.soup)
         return ret
 
@@ -538,21 +760,17 @@ class Fragments_HTML_OP_Gmb(Fragments):
 class Fragments_HTML_OP_Trb(Fragments):
     "Turn tractatenblad in HTML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         if b'OVERHEIDop.publicationName' in self.docbytes and b'Tractatenblad' in self.docbytes: # TODO: this probably overaccepts, check
@@ -569,9 +787,7 @@ class Fragments_HTML_OP_Trb(Fragments):
         #    return 5000
 
     def fragments(self):
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
         ret = _split_officielepublicaties_html(self.soup)
         return ret
 
@@ -579,21 +795,17 @@ class Fragments_HTML_OP_Trb(Fragments):
 class Fragments_HTML_OP_Prb(Fragments):
     "Turn provincieblad in HTML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         if b'OVERHEIDop.publicationName' in self.docbytes and (
@@ -615,9 +827,7 @@ class Fragments_HTML_OP_Prb(Fragments):
         #    return 5000
 
     def fragments(self):
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
         ret = _split_officielepublicaties_html(self.soup)
         return ret
 
@@ -625,21 +835,17 @@ class Fragments_HTML_OP_Prb(Fragments):
 class Fragments_HTML_OP_Wsb(Fragments):
     "Turn waterschapsblad in HTML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         if b'OVERHEIDop.publicationName' in self.docbytes and b'Waterschapsblad' in self.docbytes: # TODO: this probably overaccepts, check
@@ -656,30 +862,24 @@ class Fragments_HTML_OP_Wsb(Fragments):
         #$    return 5000
 
     def fragments(self):
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
         ret = _split_officielepublicaties_html(self.soup)
         return ret
 
 class Fragments_HTML_OP_Bgr(Fragments):
     "Turn blad gemeenschappelijke regeling in HTML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         # TODO: (here and for all others): make a string from
@@ -700,9 +900,7 @@ class Fragments_HTML_OP_Bgr(Fragments):
         #    return 5000
 
     def fragments(self):
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
         ret = _split_officielepublicaties_html(self.soup)
         return ret
 
@@ -746,18 +944,20 @@ class Fragments_HTML_OP_Bgr(Fragments):
 class Fragments_XML_OP_Gmb(Fragments):
     "Turn gemeenteblad in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('gemeenteblad', 'Gemeenteblad')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace( self.tree )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         for test_xpath, score in (
             # ('//gemeenteblad//regeling-tekst', 5),
             ("//gemeenteblad//zakelijke-mededeling", 10),  # -tekst/tekst
@@ -776,30 +976,31 @@ class Fragments_XML_OP_Gmb(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
-        ret.extend(_split_officielepublicaties_xml(self.tree, '//gemeenteblad/kop')) # TODO: do this more robustly
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
+        yield from _iter_officielepublicaties_xml(self.tree, '//gemeenteblad/kop', raw=raw, paths=paths) # TODO: do this more robustly
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Stcrt(Fragments):
     "Turn staatscourant in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('staatscourant', 'stcart', 'avvcao')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
 
         for test_xpath, score in (
             ("//staatscourant//circulaire-tekst", 5),  # /tekst
@@ -822,30 +1023,31 @@ class Fragments_XML_OP_Stcrt(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
-        #ret.extend(_split_officielepublicaties_xml(self.tree, '//staatscourant/kop')) # TODO: do this more robustly
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
+        #yield from _iter_officielepublicaties_xml(self.tree, '//staatscourant/kop', raw=raw, paths=paths) # TODO: do this more robustly
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Stb(Fragments):
     "Turn sstaatsblad in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('staatsblad', 'staatsbl')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         for test_xpath, score in (
             ("//staatsblad//wettekst", 5),
             ("//staatsbl//body", 10),  # which excludes some
@@ -864,30 +1066,31 @@ class Fragments_XML_OP_Stb(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
-        #ret.extend(_split_officielepublicaties_xml(self.tree, '//staatsblad/kop')) # TODO: do this more robustly
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
+        #yield from _iter_officielepublicaties_xml(self.tree, '//staatsblad/kop', raw=raw, paths=paths) # TODO: do this more robustly
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Trb(Fragments):
     "Turn tractatenblad in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('tractatenblad', 'trblad')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         for test_xpath, score in (
             ("//tractatenblad//vrije-tekst", 5),
             ("//trblad//body", 10),  # which excludes some
@@ -904,29 +1107,30 @@ class Fragments_XML_OP_Trb(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Prb(Fragments):
     "Turn provincieblad in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('provinciaalblad', 'provincieblad', 'Provinciaalblad')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         for test_xpath, score in (
             ("//provinciaalblad//regeling", 15),  # -tekst/tekst
             # ('//provinciaalblad//regeling-tekst', 15),
@@ -948,29 +1152,30 @@ class Fragments_XML_OP_Prb(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Wsb(Fragments):
     "Turn waterschapsblad in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('waterschapsblad',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         for test_xpath, score in (
             ("//waterschapsblad//zakelijke-mededeling", 10),  # -tekst/tekst
             ("//waterschapsblad//regeling", 10),  # regeling-tekst
@@ -987,30 +1192,31 @@ class Fragments_XML_OP_Wsb(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
-        #ret.extend(_split_officielepublicaties_xml(self.tree, '//waterschapsblad/kop')) # TODO: do this more robustly
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
+        #yield from _iter_officielepublicaties_xml(self.tree, '//waterschapsblad/kop', raw=raw, paths=paths) # TODO: do this more robustly
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Bgr(Fragments):
     "Turn blad gemeenschappelijke regeling in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('bladgemeenschappelijkeregeling',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         for test_xpath, score in (
             ("//bladgemeenschappelijkeregeling//regeling", 5),  # -tekst
             (
@@ -1030,30 +1236,30 @@ class Fragments_XML_OP_Bgr(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Handelingen(Fragments):
     "Turn handelingen in XML form (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('handelingen', 'handeling')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        self.docbytes = fix_ascii_blah(self.docbytes)
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml  # which applied fix_ascii_blah
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         for test_xpath, score in (
             ("//handelingen", 5),
             ("/handeling", 50),  # is this wrong?
@@ -1070,31 +1276,30 @@ class Fragments_XML_OP_Handelingen(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
-        # print( self.startpaths )
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_XML_OP_Kamer(Fragments):
     "Turn other kamer XMLs (from KOOP's BUS) into fragments (TODO: re-check which these are)"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    marker_tags = ('kamerwrk', 'kamerstuk', 'kamervragen', 'niet-dossier-stuk', 'vraagdoc', 'agenda')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
         self.startpaths = None
 
     def accepts(self):
-        self.docbytes = fix_ascii_blah(self.docbytes)
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml  # which applied fix_ascii_blah
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
 
         for test_xpath, score in (
             ("/kamerwrk", 5),  # ?
@@ -1124,36 +1329,31 @@ class Fragments_XML_OP_Kamer(Fragments):
         return 5000
 
     def fragments(self):
-        ret = []
+        return list( self.iter_fragments() )
+
+    def iter_fragments(self, raw=True, paths=True):
         for sp in self.startpaths:
-            ret.extend(_split_officielepublicaties_xml(self.tree, sp))
-        return ret
+            yield from _iter_officielepublicaties_xml(self.tree, sp, raw=raw, paths=paths)
 
 
 class Fragments_HTML_OP_Kamer(Fragments):
     "Turn kamer-related HTMLs (from KOOP's BUS) into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # unpack the one-html zip into the html
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         # may raise - maybe return very high score instead?
-        with warnings.catch_warnings():  # meant to ignore the "It looks like you're parsing an XML document using an HTML parser." warning
-            warnings.simplefilter("ignore")
-            self.soup = bs4.BeautifulSoup(self.docbytes, features="lxml")
+        self.soup = self.context.soup
         pname = self.soup.find("meta", attrs={"name": "OVERHEIDop.publicationName"})
         if pname is not None and pname.get("content") == "Kamervragen (Aanhangsel)":
             return 5
@@ -1194,26 +1394,27 @@ class Fragments_XML_Rechtspraak(Fragments):
     # examples:
     # https://data.rechtspraak.nl/uitspraken/content?id=ECLI:NL:RBDHA:2023:18504
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+    root_tags = ('open-rechtspraak',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
-        self.tree = wetsuite.helpers.etree.fromstring(self.docbytes)
-        self.tree = wetsuite.helpers.etree.strip_namespace(
-            self.tree
-        )  # choice to remove namespaces unconditionally
+        self.tree = self.context.stripped_tree  # which removed namespaces unconditionally
         if self.tree.tag == "open-rechtspraak":
             return 5
         else:
             return 5000
 
     def fragments(self):
-        ret = []
+        return list( self.iter_fragments() )
 
+    def iter_fragments(self, raw=True, paths=True):
         # we currently ignore the 'inhoudsindicatie', being a sumamry, but it might be worth adding
         # if ii is not None:
         #     print( '[%s]  %s'%(
@@ -1236,24 +1437,32 @@ class Fragments_XML_Rechtspraak(Fragments):
                 pass
                 # print( "YAY %s"%list( tag.tag  for tag in t) )
 
+            if paths:
+                letree = lxml.etree.ElementTree(self.tree)  # what path_between() would make each call
+
             for structured_thing in structured_things:
                 last_nr = None
                 # last_title = None
+                if paths:
+                    part_path = letree.getpath(structured_thing)
                 for ch in structured_thing.getchildren():
                     # CONSIDER checking ch.tag for parablock, etc. to handle them more specifically, but for now:
-                    meta = {
-                        "part": wetsuite.helpers.etree.path_between(
-                            self.tree, structured_thing
-                        ),
-                        "path": wetsuite.helpers.etree.path_between(self.tree, ch),
-                    }
-                    raw = wetsuite.helpers.etree.tostring(ch)
+                    meta = {}
+                    if paths:
+                        meta["part"] = part_path
+                        meta["path"] = letree.getpath(ch)
+                    inter = {}
+                    if raw:
+                        inter = {"raw": wetsuite.helpers.etree.tostring(ch), "rawtype": "xml"}
 
                     hints = []
                     nr = ch.find("nr")
                     if nr is not None:
                         meta["nr"] = nr.text.strip()
-                        nr.text = ""  # so that it doesn't land in flat_text
+                        # so that it doesn't land in flat_text - done on a copy, because the tree is shared (see DocumentContext)
+                        ch = copy.deepcopy(ch)
+                        nr = ch.find("nr")
+                        nr.text = ""
                         last_nr = nr
                     if last_nr is not None and last_nr.text is not None:
                         meta["lastnr"] = last_nr.text.strip()
@@ -1286,12 +1495,10 @@ class Fragments_XML_Rechtspraak(Fragments):
                     # if len(hints)>0:
                     meta["hints"] = hints
 
-                    ret.append(
-                        (
-                            meta,
-                            {"raw": raw, "rawtype": "xml"},
-                            flat_text,
-                        )
+                    yield (
+                        meta,
+                        inter,
+                        flat_text,
                     )
 
         # # head before
@@ -1300,7 +1507,6 @@ class Fragments_XML_Rechtspraak(Fragments):
         # # smaller sections:
         # #   Proceskosten, Standpunt van verzoeker, Wettelijk kader, Bevoegdheid, Conclusie en gevolgen, Rechtsmiddel
         # # Bijlage
-        return ret
 
 
 ####################################################################################
@@ -1308,8 +1514,10 @@ class Fragments_XML_Rechtspraak(Fragments):
 class Fragments_HTML_Geschillencommissie(Fragments):
     "Turn HTML pages from degeschillencommissie.nl into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
@@ -1332,8 +1540,10 @@ class Fragments_HTML_Geschillencommissie(Fragments):
 class Fragments_HTML_Tuchtrecht(Fragments):
     "Turn HTML pages from  into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.soup = None
 
     def accepts(self):
@@ -1360,26 +1570,22 @@ class Fragments_HTML_Tuchtrecht(Fragments):
 class Fragments_HTML_Fallback(Fragments):
     "Extract text from HTML from non-specific source into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('html', 'zip')
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.etree = None
 
     def accepts(self):
-        if wetsuite.helpers.util.has_xml_header(self.docbytes):
+        if self.context.html_bytes is None:
             return False
-        if wetsuite.helpers.util.is_html(self.docbytes):
-            return True
-        if wetsuite.helpers.util.is_htmlzip(self.docbytes):
-            self.docbytes = wetsuite.helpers.util.get_ziphtml(
-                self.docbytes
-            )  # fetch the html from the one-html zip
-            return True
-        return False
+        self.docbytes = self.context.html_bytes  # which unpacked the one-html zip, if that's what it was
+        return True
 
     def suitableness(self):
         " Mostly just says we're a bad example but we'll try; our accepts() is the real filter here "
         # TODO: see whether lxml.html seems to creatively make it work regardless, or whether there are exceptions to catch and return worse scores
-        self.etree = wetsuite.helpers.etree.parse_html(self.docbytes)
+        self.etree = self.context.html_etree
         return 500
 
     def fragments(self):
@@ -1395,12 +1601,14 @@ class Fragments_HTML_Fallback(Fragments):
 class Fragments_XML_Fallback(Fragments):
     "Extract text from XML from non-specific source into fragments"
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('xml',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.tree = None
 
     def accepts(self):
-        return wetsuite.helpers.util.is_xml(self.docbytes)
+        return self.context.is_xml
 
     def suitableness(self):
         return 500
@@ -1423,8 +1631,10 @@ class Fragments_PDF_Fallback(Fragments):
     but is currently too crude to deal with page headers, footers.
     """
 
-    def __init__(self, docbytes, debug=False):
-        Fragments.__init__(self, docbytes, debug)
+    filetypes = ('pdf',)
+
+    def __init__(self, docbytes, debug=False, context=None):
+        Fragments.__init__(self, docbytes, debug, context)
         self.part_name = None
         self.part_ary = None
 
@@ -1490,6 +1700,47 @@ _registered_fragment_parsers = [
 ]
 
 
+@functools.lru_cache(maxsize=16)
+def _dispatch_index(parser_classes: tuple):
+    """ Given a tuple of Fragments classes, returns a dict from each filetype to the classes that might handle it
+        (in the original order, so that first_only still means 'first registered').
+        Cached, so this is only worked out again when the registered classes change.
+    """
+    index = {}
+    for filetype in ('pdf', 'doc', 'html', 'xml', 'zip', 'other'):
+        index[filetype] = tuple( cls  for cls in parser_classes  if cls.filetypes is None or filetype in cls.filetypes )
+    return index
+
+
+def _candidate_classes(context: DocumentContext, parser_classes=None):
+    """ Narrows the registered classes down to those whose declarations (filetypes, root_tags, marker_tags)
+        do not exclude this document, so that decide() only has to ask those.
+
+        @param context: the DocumentContext for the document
+        @param parser_classes: the classes to choose from; defaults to the registered ones.
+        @return: a list of classes
+    """
+    if parser_classes is None:
+        parser_classes = _registered_fragment_parsers
+    classes = _dispatch_index( tuple(parser_classes) ).get( context.filetype, () )
+
+    if context.filetype != 'xml':  # the XML-specific declarations only mean something for XML
+        return list(classes)
+
+    # root tags first, as they are cheap to check (and settle most of the common document types)
+    classes = list( cls  for cls in classes  if cls.root_tags is None  or  context.root_tag in cls.root_tags )
+
+    # then look for the marker tags of all remaining classes in one scan (that builds no tree, see DocumentContext.find_tags)
+    wanted = set()
+    for cls in classes:
+        if cls.marker_tags is not None:
+            wanted.update( cls.marker_tags )
+    if len(wanted) == 0:
+        return classes
+    present = context.find_tags( wanted )
+    return list( cls  for cls in classes  if cls.marker_tags is None  or  len( present.intersection(cls.marker_tags) ) > 0 )
+
+
 def decide(docbytes, thresh=1000, first_only=False, debug=False):
     """Ask all processors to say how well they would do,
     pick any that seem applicable enough (by our threshold).
@@ -1497,12 +1748,16 @@ def decide(docbytes, thresh=1000, first_only=False, debug=False):
     Note that that that the processing_objects that are returned has already had its accepts() and suitableness() called,
     so you can now call fragments() to get the fragments.
 
+    All of them share a single DocumentContext, so the document is parsed (in each form) only once, not once per class.
+    We also only ask the classes that declare they handle this type of document (see _candidate_classes).
+
     @return: a list of (score, processing_object)
     """
     options = []
+    context = DocumentContext(docbytes)
 
-    for PerhapsClass in _registered_fragment_parsers:
-        processing_object = PerhapsClass(docbytes, debug=debug)
+    for PerhapsClass in _candidate_classes(context):
+        processing_object = PerhapsClass(docbytes, debug=debug, context=context)
         if processing_object.accepts():  # does it say it's getting the right file type?
             score = (
                 processing_object.suitableness()
@@ -1516,29 +1771,159 @@ def decide(docbytes, thresh=1000, first_only=False, debug=False):
     return options
 
 
-def feeling_lucky(docbytes, flattened=True):
+def _registry_signature() -> str:
+    "A short string that changes whenever the set or order of registered classes changes (used in cache keys)"
+    names = ",".join( "%s.%s" % (cls.__module__, cls.__name__)  for cls in _registered_fragment_parsers )
+    return wetsuite.helpers.util.hash_hex(names)[:16]
+
+
+def _fragments_cache_key(dochash: str, cls, flattened: bool) -> str:
+    "the key under which feeling_lucky caches the output of a specific class (and version of it) for a specific document"
+    return "%s:%s:%s:%s" % (dochash, cls.__name__, cls.version, "flat" if flattened else "full")
+
+
+def feeling_lucky(docbytes, flattened=True, cache_store=None):
     """If you are sure this module understands a particular document format,
     you can hand it in here, and it will returns a list of strings for a document.
 
     If it is not actually a format we understand, it might still yield text through a rougher fallback.
 
     By default it gives just text.
+
+    If you hand in a cache_store, we remember both which class we chose for a document,
+    and what it produced, keyed by the document's hash and that class's name and version.
+    When you ask for the same document again, we can skip all parsing.
+    Changing the registered classes, or a class's version, means we will work it out again.
+    (when not flattened, the cached form cannot hold 'raw_etree' and turns tuples into lists,
+    so to be consistent we drop and change those on cache misses too)
     
     This needs to be renamed.  (And perhaps this should be in wetsuite.helpers.lazy as well?)
     
+    @param cache_store: None, or a MsgpackKV (or something else that stores lists under str keys) to cache results in.
     @return: if flattened==False, a list of strings. If flattened=False, a lst of the underlying output tuples of the splitter.
     """
+    if cache_store is not None:
+        dochash = wetsuite.helpers.util.hash_hex(docbytes)
+        decided_key = "%s:decided:%s" % (dochash, _registry_signature())
+        classname = cache_store.get(decided_key, missing_as_none=True)
+        if classname == "":  # we decided before that nothing could handle it
+            return []
+        if classname is not None:
+            for cls in _registered_fragment_parsers:
+                if cls.__name__ == classname:
+                    cached = cache_store.get( _fragments_cache_key(dochash, cls, flattened), missing_as_none=True )
+                    if cached is not None:
+                        if flattened:
+                            return cached
+                        return list( tuple(fragment)  for fragment in cached )
+                    break
+
     ret = []
+    chosen = None
     for _, fragclass in decide(docbytes):
-        for hint, inter, textfrag in fragclass.fragments():
-            if flattened:
+        chosen = fragclass
+        if flattened: # we only need the text, so tell it it can skip the rest
+            for _, _, textfrag in fragclass.iter_fragments(raw=False, paths=False):
                 ret.append(textfrag)
-            else:
-                ret.append( (hint, inter, textfrag) )
+        else:
+            ret.extend( fragclass.fragments() )
         break # ises the first one
+
+    if cache_store is not None:
+        if not flattened:
+            for _, inter, _ in ret:
+                inter.pop("raw_etree", None)
+            ret = list( tuple(fragment)  for fragment in msgpack.loads( msgpack.dumps(ret) ) )
+        if chosen is None:
+            cache_store.put(decided_key, "")
+        else:
+            cache_store.put( _fragments_cache_key(dochash, chosen.__class__, flattened), ret )
+            cache_store.put( decided_key, chosen.__class__.__name__ )
     return ret
 
 
+def _split_chunk(chunk):
+    """ Worker side of split_store: takes a list of (key, docbytes),
+        returns a list of (key, list_of_strings_or_None, error_string_or_None)
+        (module-level so that a process pool can pickle it)
+    """
+    ret = []
+    for key, docbytes in chunk:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # e.g. the "needs some basic refinement" one, which would be printed for every document
+                ret.append( (key, feeling_lucky(docbytes), None) )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            ret.append( (key, None, "%s: %s" % (e.__class__.__name__, e)) )
+    return ret
+
+
+def split_store(source_store, dest_store, workers: int = None, chunksize: int = 20,
+                error_store=None, retry_errors: bool = False, verbose: bool = False):
+    """ Runs feeling_lucky() over every document in a store, and puts the resulting list of strings into another,
+        spread over multiple processes.
+
+        This is made to be re-run: keys that are already in dest_store are skipped,
+        so when interrupted, just call it again and it continues where it left off.
+
+        Documents that fail to split are not put in dest_store.
+        If you give an error_store, the error message is stored there (under the same key),
+        and (unless retry_errors=True) later runs will skip those too, rather than failing on them every time.
+
+        For example::
+            src  = wetsuite.helpers.localdata.LocalKV('bwb.db', str, bytes, read_only=True)
+            dest = wetsuite.helpers.localdata.MsgpackKV('bwb_split.db')
+            errs = wetsuite.helpers.localdata.LocalKV('bwb_split_errors.db', str, str)
+            print( split_store(src, dest, error_store=errs, verbose=True) )
+
+        @param source_store: a str:bytes store (e.g. LocalKV) containing documents
+        @param dest_store: a MsgpackKV (or something else that will store lists of strings) to write the fragment texts to.
+        Only this (main) process writes to it, so there is no concern about concurrent sqlite access.
+        @param workers: number of worker processes. None means the amount of CPUs.
+        1 means do it in this process, which is slower but easier to debug.
+        @param chunksize: how many documents to hand to a worker at a time.
+        Larger means less overhead, smaller means less memory and more even spread.
+        @param error_store: optional str:str store to record errors in.
+        @param retry_errors: if True, documents that have an entry in error_store are tried again (and the entry removed when they now work).
+        @param verbose: whether to print progress and throughput every now and then.
+        @return: a dict with counts of 'done', 'skipped', 'errors', and 'seconds' and 'per_sec' (the latter two only about the documents we actually split)
+    """
+    progress = wetsuite.helpers.util.ProgressStats(verbose=verbose)
+    stats = progress.stats
+
+    def todo():
+        "yields (key, docbytes), fetched only when needed, of the things not done yet"
+        for key in source_store.keys():
+            if key in dest_store:
+                stats["skipped"] += 1
+                continue
+            if error_store is not None  and  not retry_errors  and  key in error_store:
+                stats["skipped"] += 1
+                continue
+            yield key, source_store.get(key)
+
+    for results in wetsuite.helpers.util.map_chunks( _split_chunk, wetsuite.helpers.util.chunked(todo(), chunksize), workers=workers ):
+        # store what a worker returned (main process only)
+        for key, fragments, error in results:
+            if error is None:
+                dest_store.put(key, fragments, commit=False)
+                if error_store is not None and retry_errors and key in error_store:
+                    error_store.delete(key, commit=False)
+                stats["done"] += 1
+            else:
+                if error_store is not None:
+                    error_store.put(key, error, commit=False)
+                if verbose:
+                    print("ERROR splitting %r: %s" % (key, error))
+                stats["errors"] += 1
+        dest_store.commit()
+        if error_store is not None:
+            error_store.commit()
+        progress.report()
+
+    return progress.finish()
+
+
 class SplitDebug:
     """A notebook-style formatter that does little more than take a list of tuple of three things
     (meant for the output of fragments()), and print them in a table.
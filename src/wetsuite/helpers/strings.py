@@ -448,7 +448,20 @@ def simplify_whitespace( string: str ):
 
 
 # TODO: add tests
-def simple_tokenize(text:str):
+# Quote-like characters that simple_tokenize splits on, besides the ASCII ones
+_TOKENIZE_QUOTES = "\xab\xbb\u2018\u2019\u201a\u201b\u201c\u201d\u201e\u201f\u2039\u203a\u2358\u275b\u275c\u275d\u275e\u275f\u2760\u276e\u276f\u2e42\u301d\u301e\u301f\uff02\U0001f676\U0001f677\U0001f678"
+
+# We match the tokens themselves (runs of what we do not split on), which is equivalent to splitting and removing empty strings, and a little faster.
+#   Compiled once here, rather than handing re a string on every call (which, past its small cache, means compiling it again)
+_RE_SIMPLE_TOKEN = re.compile( r'[^\s!@#$%^&*()\[\]":;/.,?' + _TOKENIZE_QUOTES + '-]+' )
+_RE_SIMPLE_TOKEN_KEEP_PUNCTUATION = re.compile( r'[^\s!@#$%^&*":;/,?' + _TOKENIZE_QUOTES + '-]+' )
+
+
+def _simple_token_re(keep_punctuation:bool):
+    return _RE_SIMPLE_TOKEN_KEEP_PUNCTUATION  if keep_punctuation  else  _RE_SIMPLE_TOKEN
+
+
+def simple_tokenize(text:str, keep_punctuation:bool=False, strip_quotes:bool=False):
     """Split string into words
     _Very_ basic, e.g. splits on and swallows spaces and many symbols.
 
@@ -456,14 +469,60 @@ def simple_tokenize(text:str):
     but for quick-to-evaluate tests we may prefer speed, and lack of a big depdenency
 
     @param text: a single string
+    @param keep_punctuation: if True, brackets and periods do not split, and stay part of tokens
+    (as patterns.abbrev_find wants, to see things like "(ABV)" and "W.P.")
+    @param strip_quotes: if True, strip single quotes off the start and end of each token
+    (which can leave an empty string, if the token was just quotes)
     @return: a list of strings (that are probably words)
     """
-    l = re.split(
-        r'[\s!@#$%^&*()\[\]":;/.,?\xab\xbb\u2018\u2019\u201a\u201b\u201c\u201d\u201e\u201f\u2039\u203a\u2358\u275b\u275c\u275d\u275e\u275f\u2760\u276e\u276f\u2e42\u301d\u301e\u301f\uff02\U0001f676\U0001f677\U0001f678-]+',
-        text,
-    )
-    return list(e for e in l if len(e) > 0)
-    # return list(e.strip("'")   for e in l  if len(e)>0)
+    tokens = _simple_token_re(keep_punctuation).findall(text)
+    if strip_quotes:
+        return list( token.strip("'")  for token in tokens )
+    return tokens
+
+
+def iter_tokens(text:str, keep_punctuation:bool=False, strip_quotes:bool=False, offsets:bool=False):
+    """ Like simple_tokenize, but a generator, so that you need not have all tokens of a large text in memory at once,
+        and optionally tells you where in the text each token was.
+
+        @param text: a single string
+        @param keep_punctuation: see simple_tokenize
+        @param strip_quotes: see simple_tokenize
+        @param offsets: if False, yields strings. If True, yields (start, end, token) tuples, where text[start:end] == token
+        @return: a generator
+    """
+    for match in _simple_token_re(keep_punctuation).finditer(text):
+        token = match.group()
+        start, end = match.span()
+        if strip_quotes:
+            stripped = token.lstrip("'")
+            start += len(token) - len(stripped)
+            token = stripped.rstrip("'")
+            end = start + len(token)
+        if offsets:
+            yield start, end, token
+        else:
+            yield token
+
+
+def tokenize_many(texts, keep_punctuation:bool=False, strip_quotes:bool=False):
+    """ simple_tokenize for many texts, e.g. a corpus: yields a list of tokens for each text.
+
+        Only slightly faster than calling simple_tokenize in a loop (it does the setup only once),
+        but mostly here so that the bulk case has an obvious name.
+
+        @param texts: an iterable of strings
+        @param keep_punctuation: see simple_tokenize
+        @param strip_quotes: see simple_tokenize
+        @return: a generator of lists of strings
+    """
+    findall = _simple_token_re(keep_punctuation).findall
+    if strip_quotes:
+        for text in texts:
+            yield list( token.strip("'")  for token in findall(text) )
+    else:
+        for text in texts:
+            yield findall(text)
 
 
 _ordinal_nl_20 = {
@@ -649,12 +708,19 @@ def ngram_sort_by_matches(string:str, option_strings:List[str],  gramlens:List[i
             ngram_sort_by_matches( 'for', ['spork', 'knife', 'spoon', 'fork']) == ['fork', 'spork', 'knife', 'spoon']
         Note that if you pick the first, this is effectively a "which one is the closest string?" function 
 
+        If you do this repeatedly against the same options, make an NgramIndex once and hand that in as option_strings
+        (or use its sort_by_matches), so that the options' n-grams are not counted again for every call.
+
         @param string: the string to be most similar to
-        @param option_strings: the string list to sort by similarity
+        @param option_strings: the string list to sort by similarity, or an NgramIndex (in which case gramlens is ignored)
         @param gramlens: the n-grams to use, defaults to (1,2,3,4), it may be a little faster to do (1,2,3)
         @param with_scores: if False, returns list of strings. If True, returns list of (string, score).
         @return: List of strings, or of tuples if with_scores==True
     '''
+    if isinstance(option_strings, NgramIndex):
+        return option_strings.sort_by_matches( string, with_scores=with_scores )
+
+    # for a one-off call, building an index is more work than just doing it like this
     string_counts = ngram_count(string, gramlens=gramlens)
     options_with_score = []
     for option in option_strings:
@@ -676,6 +742,90 @@ def ngram_sort_by_matches(string:str, option_strings:List[str],  gramlens:List[i
         return list(e[0]   for e in options_with_score)
 
 
+class NgramIndex:
+    ''' Precomputes the n-grams of a list of option strings,
+        so that scoring a query string against all of them (as ngram_sort_by_matches does) is cheap to do repeatedly::
+            index = NgramIndex( list_of_court_names )
+            index.sort_by_matches( 'rechtbank amsterdm', k=3 )
+
+        This is an inverted index: for each n-gram, which options contain it and with what weight,
+        so a query only touches the options that share n-grams with it, and adds up their scores with numpy.
+
+        Scores are the same as ngram_sort_by_matches has always given:
+        each n-gram the query and an option share adds 1 if it is a 1-gram, 
+        and otherwise its length times the count in the query times the count in the option.
+    '''
+
+    def __init__(self, option_strings:List[str], gramlens:List[int]=(1,2,3,4)):
+        """
+        @param option_strings: the strings to match against. Order matters only for ties (earlier options come first).
+        @param gramlens: the n-gram lengths to use
+        """
+        import numpy # only needed here, and slowish to import, so not at module level
+
+        self.option_strings = list( option_strings )
+        self.gramlens = tuple( gramlens )
+
+        postings = {} # n-gram -> ( list of option indices, list of weights )
+        for option_index, option in enumerate( self.option_strings ):
+            for gram, count in ngram_count(option, gramlens=self.gramlens).items():
+                if gram not in postings:
+                    postings[gram] = ([], [])
+                indices, weights = postings[gram]
+                indices.append( option_index )
+                weights.append( 1  if len(gram) == 1  else  len(gram) * count )
+
+        self._postings = {}
+        for gram, (indices, weights) in postings.items():
+            self._postings[gram] = ( numpy.array(indices, dtype=numpy.intp), numpy.array(weights, dtype=numpy.int64) )
+
+    def __len__(self):
+        return len(self.option_strings)
+
+    def scores(self, string:str):
+        ''' Scores the query string against all options.
+            @param string: the string to compare to the options
+            @return: a numpy array of integer scores, one for each option, in the order you gave them.
+        '''
+        import numpy
+        scores = numpy.zeros( len(self.option_strings), dtype=numpy.int64 )
+        for gram, count in ngram_count(string, gramlens=self.gramlens).items():
+            posting = self._postings.get( gram )
+            if posting is None:
+                continue
+            indices, weights = posting
+            # an option appears at most once in each posting, so this fancy-indexed add is correct
+            if len(gram) == 1:
+                scores[indices] += weights
+            else:
+                scores[indices] += weights * count
+        return scores
+
+    def sort_by_matches(self, string:str, k:int=None, with_scores:bool=False):
+        ''' The options, sorted by how well they match string, best first (ties in the order you gave the options).
+            @param string: the string to be most similar to
+            @param k: if not None, return only the best k (which is faster than sorting everything, for large option lists)
+            @param with_scores: if False, returns list of strings. If True, returns list of (string, score).
+            @return: List of strings, or of tuples if with_scores==True
+        '''
+        import numpy
+        scores = self.scores( string )
+        if k is not None  and  k < len(scores):
+            if k <= 0:
+                return []
+            # everything scoring at least the k-th best score, in option order; the stable sort keeps that order for ties
+            kth_score = numpy.partition( scores, len(scores) - k )[len(scores) - k]
+            candidates = numpy.flatnonzero( scores >= kth_score )
+            order = candidates[ numpy.argsort( -scores[candidates], kind='stable' ) ][:k]
+        else:
+            order = numpy.argsort( -scores, kind='stable' )
+
+        if with_scores:
+            return list( (self.option_strings[i], int(scores[i]))  for i in order )
+        else:
+            return list( self.option_strings[i]  for i in order )
+
+
 
 # some prepared stopword lists, mostly geared towards wordclouds  (and also based _on_ wordcloud.STOPWORDS)
 stopwords_en = [
@@ -962,6 +1112,34 @@ def count_normalized(
     @param stopwords_i:
        - defaults to not removing anything
 
+    @return: a { string: count } dict
+    """
+    # Counting first and filtering the distinct strings afterwards is equivalent (Counter keeps first-seen order),
+    #   and means the stopword and normalization work is done once per distinct string, not once per occurrence.
+    return normalize_counts(
+        collections.Counter(strings),
+        min_count=min_count,
+        min_word_length=min_word_length,
+        normalize_func=normalize_func,
+        stopwords=stopwords,
+        stopwords_i=stopwords_i,
+    )
+
+
+def normalize_counts(
+    counts: dict,
+    min_count: int = 1,
+    min_word_length=0,
+    normalize_func=None,
+    stopwords=(),
+    stopwords_i=(),
+):
+    """Does the filtering and normalizing that count_normalized() does, on counts you already have,
+    e.g. a string:count dict from the counters in wetsuite.helpers.counting, or a merge of several documents' counts.
+
+    See count_normalized() for what the parameters mean.
+
+    @param counts: a { string: count } dict
     @return: a { string: count } dict
     """
     stoplist = set()
@@ -970,11 +1148,11 @@ def count_normalized(
         stoplist.update(stopwords_nl)
     elif isinstance(stopwords, (list, tuple)):
         stoplist.update(stopwords)
-    stoplist_lower = list(sws.lower() for sws in stopwords_i)
+    stoplist_lower = set(sws.lower() for sws in stopwords_i)
 
     # count into { normalized_form: { real_form: count } }
     count = collections.defaultdict(lambda: collections.defaultdict(int))
-    for string in strings:
+    for string, string_count in counts.items():
         if string in stoplist:
             continue
         if string.lower() in stoplist_lower:
@@ -986,7 +1164,7 @@ def count_normalized(
 
         if len(norm_string) < min_word_length:
             continue
-        count[norm_string][string] += 1
+        count[norm_string][string] += string_count
 
     # filter counts, choose preferred form
     ret = {}
@@ -2,10 +2,13 @@
 """
 
 import os
+import time
 import difflib
 import hashlib
 import zipfile
 import io
+import concurrent.futures
+
 import lxml.etree
 
 
@@ -423,3 +426,100 @@ def _filetype(docbytes:bytes):
     if is_zip(docbytes):
         return 'zip'
     return 'other'
+
+
+def chunked(iterable, chunksize:int):
+    """ Groups an iterable into lists of (at most) chunksize items, reading it only as the lists are asked for.
+        @param iterable: anything iterable, e.g. a generator that reads from a store
+        @param chunksize: how many items to put in each list (the last one may have fewer)
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize should be at least 1, not %r" % chunksize)
+    chunk = []
+    for item in iterable:
+        chunk.append( item )
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def map_chunks(func, chunks, workers:int=None, args=(), initializer=None):
+    """ Yields func(chunk, *args) for each chunk, computed in worker processes, in the order they finish.
+
+        Keeps at most 2*workers chunks handed out at a time, so that if chunks is a generator
+        (e.g. from chunked() over a large store), it is read only about as fast as the workers get through it,
+        rather than all being read into memory ahead of them.
+
+        @param func: a function that takes a chunk (plus args). Must be picklable, so a module-level function, not a lambda.
+        @param chunks: an iterable of chunks, e.g. from chunked()
+        @param workers: number of worker processes. None means the amount of CPUs.
+        1 means do it in this process (in order), which is slower but easier to debug.
+        @param args: further arguments to hand to func (must be picklable)
+        @param initializer: called once in each worker process (e.g. to load things once per process rather than once per chunk)
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        if initializer is not None:
+            initializer()
+        for chunk in chunks:
+            yield func(chunk, *args)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+        pending = set()
+        for chunk in chunks:
+            pending.add( executor.submit(func, chunk, *args) )
+            if len(pending) >= 2 * workers:
+                finished, pending = concurrent.futures.wait( pending, return_when=concurrent.futures.FIRST_COMPLETED )
+                for future in finished:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+
+class ProgressStats:
+    """ Counts documents that were done, skipped, or failed, for functions that go through a lot of them,
+        and (if verbose) prints progress and throughput every now and then.
+
+        Use looks something like::
+            progress = ProgressStats(verbose=True)
+            for ...:
+                progress.stats["done"] += 1
+                progress.report()
+            return progress.finish()
+    """
+
+    def __init__(self, verbose:bool=False, interval:float=10):
+        """
+        @param verbose: whether to print anything at all
+        @param interval: print progress from report() at most once per this many seconds
+        """
+        self.verbose = verbose
+        self.interval = interval
+        self.stats = {"done": 0, "skipped": 0, "errors": 0}
+        self.start_time = time.time()
+        self.last_report = self.start_time
+
+    def report(self):
+        " if verbose and it has been a while since the last time, prints the counts so far and the documents per second "
+        if self.verbose and time.time() - self.last_report > self.interval:
+            self.last_report = time.time()
+            stats = self.stats
+            print( "%d done, %d errors, %d skipped, %.1f docs/sec" % (
+                stats["done"], stats["errors"], stats["skipped"], (stats["done"] + stats["errors"]) / (self.last_report - self.start_time) ) )
+
+    def finish(self):
+        """ Adds 'seconds' and 'per_sec' (the latter only about the documents we did not skip), and if verbose, prints a summary.
+            @return: the stats dict
+        """
+        stats = self.stats
+        stats["seconds"] = time.time() - self.start_time
+        stats["per_sec"] = (stats["done"] + stats["errors"]) / max(stats["seconds"], 0.000001)
+        if self.verbose:
+            print( "finished: %d done, %d errors, %d skipped, in %.1f sec (%.1f docs/sec)" % (
+                stats["done"], stats["errors"], stats["skipped"], stats["seconds"], stats["per_sec"] ) )
+        return stats
@@ -0,0 +1,72 @@
+" tests related to the citations module "
+import pytest
+
+import wetsuite.helpers.localdata
+from wetsuite.helpers.patterns import find_references
+from wetsuite.helpers.citations import CitationIndex, normalize_reference
+
+
+LAW_IDS = {'awb':'BWBR0005537', 'algemene wet bestuursrecht':'BWBR0005537'}
+
+
+def test_normalize_reference():
+    "test that different ways of writing the same thing end up as the same edge"
+    assert normalize_reference( {'type':'vindplaats', 'text':'Stb. 2000, 123', 'details':{'what':'Stb', 'jaar':'2000', 'nummer':'123'}} ) == ('bekend', 'stb-2000-123', '')
+    assert normalize_reference( {'type':'bekend', 'text':'stb-2000-123'} ) == ('bekend', 'stb-2000-123', '')
+    assert normalize_reference( {'type':'artikel', 'text':'artikel 8:1 Awb', 'details':{'artikel':'8:1', 'nameref':'Awb'}}, law_ids=LAW_IDS ) == ('artikel', 'BWBR0005537', '8:1')
+    assert normalize_reference( {'type':'artikel', 'text':'artikel 8:1 Fooweg', 'details':{'artikel':'8:1', 'nameref':'Foo\nwet'}}, law_ids={} ) == ('artikel', 'Foo wet', '8:1')
+    assert normalize_reference( {'type':'artikel', 'text':'artikel 8:1', 'details':{'artikel':'8:1'}}, law_ids=LAW_IDS ) is None
+    assert normalize_reference( {'type':'celex', 'text':'CELEX:32016r0679'} ) == ('celex', '32016R0679', '')
+    assert normalize_reference( {'type':'celex', 'text':'32016R0679,', 'invalid':True} ) == ('celex', '32016R0679', '')
+    assert normalize_reference( {'type':'celex', 'text':'3201,', 'invalid':True} ) is None
+    assert normalize_reference( {'type':'bekend', 'text':'stb-2000-x', 'invalid':True} ) is None
+    assert normalize_reference( {'type':'kamerstukken', 'text':'Kamerstukken II\n2001/02, 28000'} ) == ('kamerstukken', 'Kamerstukken II 2001/02, 28000', '')
+
+
+def test_citation_index():
+    "test adding, reverse lookups, replacing, and counting"
+    index = CitationIndex(':memory:', law_ids=LAW_IDS)
+    index.add('ECLI:NL:RBAMS:2020:1', find_references('zie ECLI:NL:HR:2005:AT4537, BWBR0005537 en Stb. 2000, 123 en ECLI:NL:HR:2005:AT4537'))
+    index.add('ECLI:NL:RBAMS:2021:2', find_references('zie ECLI:NL:HR:2005:AT4537 en ECLI:NL:RBAMS:2021:2'))
+    index.add('ECLI:NL:RBAMS:2021:3', [{'type':'artikel', 'text':'artikel 8:1 Awb', 'details':{'artikel':'8:1', 'nameref':'Awb'}}])
+    index.add('doc4', [], year=2021)
+
+    assert len(index) == 4
+    assert 'doc4' in index
+    assert index.cited_by('ecli:nl:hr:2005:at4537') == ['ECLI:NL:RBAMS:2020:1', 'ECLI:NL:RBAMS:2021:2']
+    assert index.cited_by('ECLI:NL:RBAMS:2021:2') == []     # self-references are not kept
+    assert index.cited_by('BWBR0005537') == ['ECLI:NL:RBAMS:2020:1', 'ECLI:NL:RBAMS:2021:3']
+    assert index.cited_by('BWBR0005537', '8:1') == ['ECLI:NL:RBAMS:2021:3']
+    assert index.cited_by('stb-2000-123') == ['ECLI:NL:RBAMS:2020:1']
+    assert ('ecli', 'ECLI:NL:HR:2005:AT4537', '', 2) in index.cites('ECLI:NL:RBAMS:2020:1')
+
+    assert index.most_cited(n=2) == [('BWBR0005537', 2), ('ECLI:NL:HR:2005:AT4537', 2)]
+    assert index.most_cited(kind='ecli', year=2021) == [('ECLI:NL:HR:2005:AT4537', 1)]
+
+    # re-adding replaces
+    index.add('ECLI:NL:RBAMS:2021:2', [])
+    assert index.cited_by('ECLI:NL:HR:2005:AT4537') == ['ECLI:NL:RBAMS:2020:1']
+    index.remove('ECLI:NL:RBAMS:2020:1')
+    assert index.cited_by('ECLI:NL:HR:2005:AT4537') == []
+    assert index.most_cited(kind='ecli') == []    # counts are kept up to date too
+    assert index.most_cited() == [('BWBR0005537', 1)]
+    assert len(index) == 3
+
+
+def test_citation_index_update_from_store(tmp_path):
+    "test that updating from a store of find_references output only does new documents, and that it persists"
+    store = wetsuite.helpers.localdata.MsgpackKV(':memory:')
+    store.put('a', find_references('ECLI:NL:HR:2005:AT4537'))
+    store.put('b', find_references('CELEX 32016R0679'))
+
+    path = str( tmp_path / 'citations.db' )
+    with CitationIndex(path, law_ids={}) as index:
+        assert index.update_from_store(store) == 2
+        store.put('c', find_references('32016R0679'))
+        store.put('d', find_references('zie 32016R0679, en verder'))  # (that match includes the comma)
+        assert index.update_from_store(store) == 2
+
+    with CitationIndex(path, read_only=True) as index:
+        assert index.cited_by('32016R0679') == ['b', 'c', 'd']
+        with pytest.raises(RuntimeError):
+            index.add('e', [])
@@ -1,6 +1,11 @@
 """ test functions in the wetsuite.helpers.collocation module """
 
 import os
+import time
+import random
+
+import pytest
+
 import wetsuite.helpers.collocation
 import wetsuite.helpers.etree
 
@@ -71,3 +76,94 @@ def test_that_cleanup_func_reduces():
     coll.cleanup_ngrams(mincount=None, disqualify_func=tup_has_van)
 
     assert coll.counts()['ngrams'] < before_ngram_count
+
+
+def test_merge_and_workers():
+    ' test that counting in parts and merging, also in worker processes, gives the same as counting everything at once '
+    text = test_text()
+    tokens = text.split()
+
+    whole = wetsuite.helpers.collocation.Collocation( connectors=('de', 'van') )
+    whole.consume_tokens( tokens, gramlens=(2,3) )
+
+    part1 = wetsuite.helpers.collocation.Collocation( connectors=('de', 'van') )
+    part1.consume_tokens( tokens[:3000], gramlens=(2,3) )
+    part2 = wetsuite.helpers.collocation.Collocation( connectors=('de', 'van') )
+    part2.consume_tokens( tokens[3000:], gramlens=(2,3) )
+    part1.merge( part2 )
+    # (the n-grams that cross the split are the only difference)
+    assert part1.uni == whole.uni
+    assert part1.grams[('als','bedoeld','in')] == whole.grams[('als','bedoeld','in')]
+    assert part1.counts()['ngrams'] >= whole.counts()['ngrams'] - 4
+
+    lines = text.split('\n')
+    single   = wetsuite.helpers.collocation.collocations_from_texts( lines, tokenizer=str.split, gramlens=(2,3) )
+    parallel = wetsuite.helpers.collocation.collocations_from_texts( lines, tokenizer=str.split, gramlens=(2,3), workers=2, chunksize=50 )
+    assert dict( single.grams.items() ) == dict( parallel.grams.items() )
+    assert sorted( single.score_ngrams() ) == sorted( parallel.score_ngrams() )   # (the order of equal scores may differ)
+
+
+def test_uni_and_grams_access():
+    "test that uni acts like the defaultdict it used to be, that grams is read-only, and that the add_ functions are how you change counts"
+    coll = wetsuite.helpers.collocation.Collocation()
+    coll.consume_tokens( ['a', 'b', 'a', 'b'], gramlens=(2,) )
+    assert coll.uni['a'] == 2
+    assert coll.uni['unseen'] == 0
+    assert coll.grams[('a', 'b')] == 2
+    with pytest.raises(KeyError):
+        coll.grams[('b', 'b')]  # pylint: disable=pointless-statement
+    with pytest.raises(TypeError):
+        coll.grams[('a', 'b')] = 5
+
+    coll.add_uni('a', 3)
+    coll.add_gram(('a', 'b'), 3)
+    assert coll.uni['a'] == 5
+    assert coll.grams[('a', 'b')] == 5
+
+
+def test_score_ngrams():
+    ' test that asking for the top few gives the last few of the complete sorted list, and that cleanup_unigrams removes n-grams too '
+    text = test_text()
+
+    coll = wetsuite.helpers.collocation.Collocation()
+    coll.consume_tokens( text.split(), gramlens=(2,3) )
+    scores = coll.score_ngrams()
+    assert list( score  for _, score, _, _ in coll.score_ngrams(top=10) ) == list( score  for _, score, _, _ in scores[-10:] )
+    strtup, _, count, uni_counts = scores[-1]
+    assert count == coll.grams[strtup]
+    assert uni_counts == list( coll.uni[s]  for s in strtup )
+
+    coll.cleanup_unigrams( mincount=10 )
+    uni = coll.uni
+    assert all( all(s in uni  for s in strtup)  for strtup in coll.grams )
+
+
+def test_max_ngrams():
+    ' test that memory-bounded counting keeps the amount of n-grams down, but still finds the common ones '
+    text = test_text()
+
+    coll = wetsuite.helpers.collocation.Collocation( max_ngrams=2000 )
+    coll._consolidate_at = 1000  # pylint: disable=protected-access
+    tokens = text.split()
+    for i in range(0, len(tokens), 500):
+        coll.consume_tokens( tokens[i:i+500], gramlens=(3,) )
+    assert coll.counts()['ngrams'] <= 2000
+    assert ('als','bedoeld','in') in coll.grams
+
+
+def test_workers_not_slower():
+    "test that counting in worker processes is not much slower than in this process (merging used to re-sort everything each time)"
+    rnd = random.Random(3)
+    words = list( 'w%d'%i  for i in range(5000) )
+    weights = list( 1.0/(i+1)  for i in range(len(words)) )
+    texts = list( ' '.join( rnd.choices(words, weights=weights, k=200) )  for _ in range(1500) )
+    start = time.time()
+    serial = wetsuite.helpers.collocation.collocations_from_texts( texts, tokenizer=str.split, gramlens=(2,3) )
+    serial_counts = serial.counts()
+    serial_took = time.time() - start
+    start = time.time()
+    parallel = wetsuite.helpers.collocation.collocations_from_texts( texts, tokenizer=str.split, gramlens=(2,3), workers=2, chunksize=10 )
+    parallel_counts = parallel.counts()
+    parallel_took = time.time() - start
+    assert parallel_counts == serial_counts
+    assert parallel_took < 2 * serial_took + 1.0  # (slack for starting processes)
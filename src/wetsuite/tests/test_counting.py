@@ -0,0 +1,85 @@
+" tests related to the counting module "
+import time
+import random
+
+import pytest
+
+from wetsuite.helpers.strings import count_case_insensitive, simple_tokenize
+from wetsuite.helpers.counting import ExactCounter, SpaceSavingCounter, CountMinSketch, count_texts
+
+
+def _texts(amount=200, seed=3):
+    " some texts with a skewed (roughly zipfian) word distribution "
+    rnd = random.Random(seed)
+    words = list( 'Word%d'%i  for i in range(2000) ) + ['de', 'De', 'het']
+    weights = list( 1.0/(i+1)  for i in range(len(words)) )
+    return list( ' '.join( rnd.choices(words, weights=weights, k=100) )  for _ in range(amount) )
+
+
+def test_exact_counter():
+    "test that counting in pieces gives what counting everything at once does"
+    texts = _texts()
+    counter = ExactCounter()
+    for text in texts:
+        counter.add( simple_tokenize(text) )
+    everything = []
+    for text in texts:
+        everything.extend( simple_tokenize(text) )
+    assert counter.total == len(everything)
+    assert counter.result( normalize_func=str.lower, stopwords=['het'], min_count=2 ) == count_case_insensitive( everything, stopwords=['het'], min_count=2 )
+
+
+def test_count_texts_workers():
+    "test that counting in worker processes and merging gives the same as counting in this process"
+    texts = _texts()
+    assert count_texts(texts, workers=2, chunksize=15).counts == count_texts(texts).counts
+
+
+def test_space_saving_counter():
+    "test that a small space-saving counter finds the most common strings, and never underestimates"
+    texts = _texts()
+    exact = count_texts(texts).counts
+    for workers in (1, 2):
+        approx = count_texts( texts, SpaceSavingCounter(capacity=50), workers=workers, chunksize=20 )
+        assert len(approx) <= 100
+        for string, count in approx.most_common(50):
+            assert exact[string] <= count <= exact[string] + approx.error(string)
+        top_exact = set( string  for string, _ in exact.most_common(10) )
+        top_approx = set( string  for string, _ in approx.most_common(20) )
+        assert top_exact <= top_approx
+
+    with pytest.raises(TypeError):
+        SpaceSavingCounter().merge( ExactCounter() )
+
+
+def test_count_min_sketch():
+    "test that estimates are never too low, mostly exact for a roomy sketch, and that merging works"
+    texts = _texts()
+    exact = count_texts(texts).counts
+    sketch = count_texts( texts, CountMinSketch(width=2**14, depth=4) )
+    estimates = sketch.estimate_many( exact.keys() )
+    assert all( estimate >= exact[string]  for string, estimate in zip(exact.keys(), estimates) )
+    assert sum( estimate == exact[string]  for string, estimate in zip(exact.keys(), estimates) ) > 0.9 * len(exact)
+    assert sketch.estimate('not in there') <= 3
+
+    merged = count_texts( texts[:100], CountMinSketch(width=2**14, depth=4) )
+    merged.merge( count_texts( texts[100:], CountMinSketch(width=2**14, depth=4) ) )
+    assert (merged.table == sketch.table).all()
+    assert merged.total == sketch.total == sum( exact.values() )
+
+    with pytest.raises(ValueError):
+        sketch.merge( CountMinSketch(width=2**10) )
+
+
+def test_count_min_sketch_workers():
+    "test that counting into a (default-sized, so large) sketch in worker processes gives the same, and is not much slower than in this process"
+    texts = list( "een korte tekst nummer %d" % i  for i in range(5000) )
+    start = time.time()
+    serial = count_texts( texts, CountMinSketch(), workers=1 )
+    serial_took = time.time() - start
+    start = time.time()
+    parallel = count_texts( texts, CountMinSketch(), workers=2 )
+    parallel_took = time.time() - start
+    assert (parallel.table == serial.table).all()
+    assert parallel.total == serial.total
+    assert parallel_took < 3 * serial_took + 2.0  # (slack for starting processes) - sending back a sketch per chunk took 20x as long
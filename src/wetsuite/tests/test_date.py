@@ -2,8 +2,9 @@
 import datetime
 
 import pytest
+import dateutil.parser
 
-from wetsuite.helpers.date import parse, find_dates_in_text
+from wetsuite.helpers.date import parse, find_dates_in_text, DutchParserInfo
 from wetsuite.helpers.date import (
     days_in_range,
     date_ranges,
@@ -128,6 +129,21 @@ def test_parse_date():
     assert parse("2022-01-01 11:22", as_date=True)     == datetime.date(2022, 1, 1)
 
 
+def test_parse_fast_path():
+    "test that the forms we parse without dateutil give what dateutil gives, including what it does not accept"
+    for text in ("2022-01-01", " 1988-11-1 ", "1 januari 2020", "1e mei 2020", "12 Okt. 1999", "3 nov, 2001", "5 may 1988"):
+        if "may" in text:
+            assert parse(text) == dateutil.parser.parse(text)
+        else:
+            assert parse(text) == dateutil.parser.parse(text, parserinfo=DutchParserInfo())
+    assert parse("31 februari 2020") is None
+    assert parse("2020-02-30") is None
+    assert parse("1e may 2020") is None  # dateutil's English parserinfo does not know the 'e'
+    # and cached answers are the same as the first ones
+    assert parse("1 januari 2020") == parse("1 januari 2020") == datetime.datetime(2020, 1, 1)
+    assert parse("1 januari 2020", as_date=True) == datetime.date(2020, 1, 1)
+
+
 def test_yy_mm_dd():
     "test that this formatter basically works"
     assert yyyy_mm_dd(datetime.date(2024, 1, 1)) == "2024-01-01"
@@ -5,6 +5,8 @@ from wetsuite.helpers.etree import (
     tostring,
     strip_namespace,
     _strip_namespace_inplace,
+    strip_namespace_inplace,
+    fromstring_stripped,
     strip_comment_pi,
     _strip_comment_pi_inplace, 
     all_text_fragments,
@@ -15,6 +17,7 @@ from wetsuite.helpers.etree import (
     node_walk,
     debug_pretty,
     html_text,
+    parse_html,
     debug_color
 )
 
@@ -79,6 +82,20 @@ def test_strip_comment_pi_copy():
     assert tostring( t ) == b'<html>1<a/>2<!-- -->3<b/>4<?xml-stylesheet type="text/xsl" href="style.xsl"?>5</html>'
 
 
+def test_fromstring_stripped():
+    "test that fromstring_stripped gives the same as strip_namespace(fromstring()), and that the public inplace function alters the tree it's given"
+    xml = b'<a xmlns="foo" xmlns:pre="bar"><pre:b pre:at="1"/><c/></a>'
+    assert tostring( fromstring_stripped(xml) ) == tostring( strip_namespace(fromstring(xml)) )
+    assert tostring( fromstring_stripped(xml) ) == b'<a><b at="1"/><c/></a>'
+
+    tree = fromstring(xml)
+    strip_namespace_inplace(tree)
+    assert tree.tag == "a"
+
+    with pytest.raises(ValueError):
+        strip_namespace_inplace(None)
+
+
 def test_attribute_stripping():
     "test that namespaces are aolso stripped from attribute names"
     with_attr = fromstring('<a xmlns:pre="foo"> <b pre:at="tr"/> </a>')
@@ -159,6 +176,23 @@ def test_all_text_fragments_join():
     )
 
 
+def test_all_text_fragments_order():
+    "test that all_text_fragments gives fragments in document order, including tails after comments, in both its code paths"
+    tree = fromstring("<a>foo<!--c-->ct<b>bar<c>x</c>ctail</b>quu</a>")
+    expect = ["foo", "ct", "bar", "x", "ctail", "quu"]
+    assert all_text_fragments(tree) == expect
+    assert all_text_fragments(tree, ignore_tags=["nonexistent"]) == expect
+    assert all_text_fragments(tree, stop_at=["c"]) == expect[:-1]
+
+
+def test_all_text_fragments_add_spaces():
+    "test that add_spaces separates word-splitting elements, and only those"
+    tree = fromstring("<r><al>een<nadruk>twee</nadruk></al><al>drie</al></r>")
+    assert all_text_fragments(tree, join="") == "eentweedrie"
+    assert all_text_fragments(tree, join="", add_spaces=True) == "eentwee drie"
+    assert all_text_fragments(tree, join="", add_spaces=["nadruk"]) == "een twee drie"
+
+
 def test_indent():
     "test reindenting"
     xml = '<a xmlns:pre="foo"> <pre:b/> </a>'
@@ -330,6 +364,19 @@ def test_html_text_bs4_input():
     assert html_text( soup ) == 'foobar'
 
 
+def test_html_text_streaming():
+    ' testing that the streaming variant gives the same text, and that neither alters the tree it is given '
+    html = b'<html><head><title>T</title></head><body><p>x<!--c-->y</p>q<script>s</script>r<div>a<style>s</style>b</div></body><script>x</script>tail</html>'
+    tree = parse_html( html )
+    before = tostring( tree )
+    text = html_text( tree )
+    assert text == html_text( html, streaming=True )
+    assert text == 'x\n\nqrab\ntail'
+    assert tostring( tree ) == before
+
+    assert html_text( html, join=False, bodynodename=None ) == html_text( html, join=False, bodynodename=None, streaming=True )
+
+
 def test_debug_color():
     ' just testing that it does not fail on some basic input '
     o = debug_color( fromstring( '<body><b>foo</b>bar</body>' ) )
@@ -1,7 +1,10 @@
 " test eurlex fetching and parsing code "
 import os
+import json
 import wetsuite.datacollect.eurlex
 import wetsuite.helpers.net
+import wetsuite.helpers.util
+import wetsuite.helpers.localdata
 
 
 def test_extract_html():
@@ -20,6 +23,35 @@ def test_extract_html():
     assert d["celex"] == "32016R0679"
 
 
+def test_iter_by_resource_type_paging():
+    """test the keyset paging, by pre-filling the page cache so that no fetching is necessary.
+    The first page ends in the middle of work b's rows, so those should be held back and come from the second page.
+    """
+    def binding(work, date):
+        return {"work": {"type": "uri", "value": work}, "date": {"type": "typed-literal", "value": date}}
+
+    pages = {
+        None: [binding("http://x/a", "2000-01-01"), binding("http://x/b", "2000-01-02"), binding("http://x/b", "2000-01-03")],
+        "http://x/a": [binding("http://x/b", "2000-01-02"), binding("http://x/b", "2000-01-03"), binding("http://x/c", "2000-01-04")],
+        "http://x/b": [binding("http://x/c", "2000-01-04")],
+    }
+    cache_store = wetsuite.helpers.localdata.LocalKV(":memory:", str, bytes)
+    for after_work, bindings in pages.items():
+        query = wetsuite.datacollect.eurlex._resource_type_query("JUDG", after_work=after_work, limit=3)  # pylint: disable=protected-access
+        cache_store.put(
+            wetsuite.helpers.util.hash_hex(query),
+            json.dumps({"head": {}, "results": {"bindings": bindings}}).encode("utf8"),
+        )
+
+    got = list(wetsuite.datacollect.eurlex.iter_by_resource_type("JUDG", page_size=3, cache_store=cache_store))
+    assert list((b["work"]["value"], b["date"]["value"]) for b in got) == [
+        ("http://x/a", "2000-01-01"),
+        ("http://x/b", "2000-01-02"),
+        ("http://x/b", "2000-01-03"),
+        ("http://x/c", "2000-01-04"),
+    ]
+
+
 # def test_fetch_by_resource_type():
 #     ' test that fetching from the sparql API does not return an error (does not do anything with the data) '
 #     wetsuite.datacollect.eurlex.fetch_by_resource_type('LET') # choosing something with very little output
@@ -21,6 +21,7 @@ from wetsuite.helpers.koop_parse import (
     parse_op_searchmeta,
 
     alineas_with_selective_path,
+    alineas_with_selective_path_streaming,
 )
 
 import wetsuite.datacollect.koop_sru
@@ -397,7 +398,7 @@ def test_alineas_with_selective_path():
     tree = wetsuite.helpers.etree.fromstring(
         b"<body><al>test1</al><!-- --><al>test2</al></body>"
     )
-    res = alineas_with_selective_path(tree)
+    res = list(alineas_with_selective_path(tree))
     assert res[0]["path"] == "/body/al[1]"
     assert res[0]["text-flat"] == "test1"
     assert res[0]["raw"] == b"<al>test1</al>"
@@ -406,6 +407,63 @@ def test_alineas_with_selective_path():
     assert res[1]["text-flat"] == "test2"
 
 
+def test_alineas_with_selective_path_structure():
+    "test that paths and parts are right for nested structure, and that it is a generator"
+    tree = wetsuite.helpers.etree.fromstring(
+        b"<body><hoofdstuk><kop><nr>1</nr></kop>"
+        b"<artikel><kop><nr>1</nr></kop><al>a</al><lid><lidnr>1</lidnr><al>b</al></lid></artikel>"
+        b"<artikel><kop><nr>2</nr></kop><al>c</al><al>d</al></artikel>"
+        b"</hoofdstuk></body>"
+    )
+    gen = alineas_with_selective_path(tree)
+    assert not isinstance(gen, list)
+    res = list(gen)
+    assert [r["text-flat"] for r in res] == ["a", "b", "c", "d"]
+    for r in res:
+        assert r["path"] == r["raw_etree"].getroottree().getpath(r["raw_etree"])
+    assert res[1]["path"] == "/body/hoofdstuk/artikel[1]/lid/al"
+    assert res[3]["path"] == "/body/hoofdstuk/artikel[2]/al[2]"
+    assert res[1]["parts"] == [
+        {"what": "hoofdstuk", "hoofdstuknr": "1"},
+        {"what": "artikel", "artikelnr": "1"},
+        {"what": "lid", "lidnr": "1"},
+    ]
+    assert res[3]["merged"] == {"hoofdstuknr": "1", "artikelnr": "2"}
+
+
+def test_alineas_with_selective_path_no_copy():
+    "test that on an already-stripped tree, strip_namespace=False gives the same, and works on that tree rather than a copy"
+    tree = wetsuite.helpers.etree.fromstring_stripped( get_test_data("cvdr_example3.xml") )
+    copied = list(alineas_with_selective_path(tree))
+    direct = list(alineas_with_selective_path(tree, strip_namespace=False))
+    assert len(direct) > 5
+    for copied_dict, direct_dict in zip(copied, direct):
+        assert copied_dict["path"] == direct_dict["path"]
+        assert copied_dict["raw"] == direct_dict["raw"]
+        assert copied_dict["text-flat"] == direct_dict["text-flat"]
+        assert direct_dict["raw_etree"].getroottree().getroot() is tree
+        assert copied_dict["raw_etree"].getroottree().getroot() is not tree
+
+
+def test_alineas_with_selective_path_streaming():
+    "test that the streaming variant gives the same parts and text as the tree variant"
+    for fn in ("bwb_toestand.xml", "cvdr_example3.xml"):
+        docbytes = get_test_data(fn)
+        tree_res = list(alineas_with_selective_path(wetsuite.helpers.etree.fromstring(docbytes), add_raw=False))
+        stream_res = list(alineas_with_selective_path_streaming(docbytes, add_raw=False))
+        assert len(tree_res) == len(stream_res) > 5
+        for tree_dict, stream_dict in zip(tree_res, stream_res):
+            assert tree_dict["parts"] == stream_dict["parts"]
+            assert tree_dict["merged"] == stream_dict["merged"]
+            assert tree_dict["text-flat"] == stream_dict["text-flat"]
+            # paths differ only in that streaming always has an index
+            assert tree_dict["path"].replace("[1]", "") == stream_dict["path"].replace("[1]", "")
+
+    res = list(alineas_with_selective_path_streaming(b"<body><al>test1</al><!-- --><al>test2</al></body>"))
+    assert res[0]["path"] == "/body/al[1]"
+    assert res[1]["raw"] == b"<al>test2</al>"
+
+
 def test_bwb_title_looks_boring():
     ' Just a substring test at this point.  TODO: more serious cases '
     assert bwb_title_looks_boring("Veegwet wonen") is True
@@ -1,7 +1,7 @@
 """ test functions in the wetsuite.helpers.split module """
 
 # import os
-# import pytest
+import pytest
 
 import wetsuite.helpers.localdata
 import wetsuite.datacollect.koop_frbr
@@ -35,3 +35,33 @@ def DISABLED_test_koop_frbr_fetch(): # disabled because it takes ~15 sec
     # IIRC three each
     assert len(fetch_store) > 0
     assert len(cache_store) > 0
+
+
+_listing_html = b'''<html><body>
+<div><ul class="browse__list">
+  <li class="browse__item"><a href="/frbr/cga/2020/x/1/xml">xml</a></li>
+  <li class="browse__item"><a href="/frbr/cga/2020/x/1/pdf">pdf</a></li>
+</ul></div>
+<ul class="list list--sources">
+  <li><div class="list--source__information">x.xml <span>12 KB</span></div><a href="/frbr/cga/2020/x/1/xml/x.xml">download</a></li>
+  <li><div class="list--source__information">x.pdf <span>80 KB</span></div><a href="https://repository.overheid.nl/frbr/cga/2020/x/1/pdf/x.pdf">download</a></li>
+</ul>
+<div class="pagination__index"><ul><li><a href="?start=2">2</a></li><li><a href="?start=3">3</a></li></ul></div>
+</body></html>'''
+
+
+def test_parse_listing():
+    " test that the lxml and bs4 listing parsers extract the same things "
+    base_url = 'https://repository.overheid.nl/frbr/cga/2020/x/1'
+    via_lxml = wetsuite.datacollect.koop_frbr.parse_listing(_listing_html, base_url, parser='lxml')
+    via_bs4  = wetsuite.datacollect.koop_frbr.parse_listing(_listing_html, base_url, parser='bs4')
+    assert via_lxml == via_bs4
+
+    assert via_lxml['items'][0] == ('https://repository.overheid.nl/frbr/cga/2020/x/1/xml/x.xml', 'x.xml ')
+    assert via_lxml['folders'] == [('https://repository.overheid.nl/frbr/cga/2020/x/1/xml', 'xml'),
+                                   ('https://repository.overheid.nl/frbr/cga/2020/x/1/pdf', 'pdf')]
+    assert via_lxml['pages'] == ['https://repository.overheid.nl/frbr/cga/2020/x/1?start=2',
+                                 'https://repository.overheid.nl/frbr/cga/2020/x/1?start=3']
+
+    with pytest.raises(ValueError):
+        wetsuite.datacollect.koop_frbr.parse_listing(_listing_html, base_url, parser='foo')
@@ -1,7 +1,8 @@
 " test network-related code "
 import os
+import time
 import pytest
-from wetsuite.helpers.net import download
+from wetsuite.helpers.net import download, download_many, RateLimiter
 
 
 def test_download():
@@ -25,3 +26,30 @@ def test_download_to_file( tmp_path ):  # note: pytest fixture will create a tem
     with pytest.raises(ValueError, match=r".*(404|500).*"):
         download("https://www.example.com/noexist", tofile_path=tofile_path)
         assert not os.path.exists(tofile_path)
+
+
+def test_ratelimiter():
+    "test that the rate limiter spaces out calls"
+    limiter = RateLimiter(20)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.wait()
+    assert time.monotonic() - start >= 0.15
+
+    # no limit means no waiting
+    limiter = RateLimiter(None)
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.wait()
+    assert time.monotonic() - start < 0.1
+
+
+def test_download_many_errors():
+    "test that failures are yielded, not raised  (uses a port that should refuse connections, so needs no internet)"
+    urls = ["http://127.0.0.1:9/%d" % i for i in range(5)]
+    results = list(download_many(urls, workers=2, retries=0))
+    assert len(results) == 5
+    assert sorted(url for url, _, _ in results) == sorted(urls)
+    for _, data, exc in results:
+        assert data is None
+        assert exc is not None
@@ -1,5 +1,13 @@
 """ Tests relating to the patterns module - mostly reference finding """
-from wetsuite.helpers.patterns import find_references, mark_references_spacy, abbrev_find, abbrev_count_results
+import os
+import time
+import pickle
+import threading
+
+import wetsuite.helpers.etree
+import wetsuite.helpers.localdata
+from wetsuite.helpers.patterns import find_references, mark_references_spacy, abbrev_find, abbrev_count_results, register_reference_finder, find_references_many
+import wetsuite.helpers.patterns
 
 
 def test_identifier_parse():
@@ -121,6 +129,115 @@ def test_found_artikel():
         assert len( find_references( test ) ) > 0   # found anything at all?
 
 
+def test_anchored_finders():
+    "test that finders with anchors still find matches that start before, at, or overlap other anchors"
+    matches = find_references("Council Council Directive 93/42/EEC, and Aanhangsel Handelingen II 2001/02, nr. 5", artikel=False)
+    assert [(m["type"], m["text"]) for m in matches] == [
+        ("eudir", "Council Directive 93/42/EEC"),
+        ("kamerstukken", "Aanhangsel Handelingen II 2001/02, nr. 5"),
+    ]
+
+
+def test_register_reference_finder():
+    "test that we can add our own kind of reference, and that it is only used when asked for"
+    register_reference_finder("testref", "test", r"TESTREF-([0-9]+)", lambda rematch: {"num": int(rematch.group(1))}, anchors=("TESTREF",))
+    try:
+        assert find_references("see TESTREF-12", others={"testref": True}) == [
+            {"type": "test", "start": 4, "end": 14, "text": "TESTREF-12", "details": {"num": 12}}
+        ]
+        assert find_references("see TESTREF-12") == []
+    finally:
+        del wetsuite.helpers.patterns._reference_finders["testref"]  # pylint: disable=protected-access
+
+
+def test_trie_longest_match():
+    "test the trie that law names are matched with: case insensitive, longest match, and anchored at the given offset"
+    trie = wetsuite.helpers.patterns._build_trie(["Wet", "Wet open overheid", "Awb"])  # pylint: disable=protected-access
+    match = wetsuite.helpers.patterns._trie_longest_match  # pylint: disable=protected-access
+    assert match(trie, "wet open overheid, en") == 17
+    assert match(trie, "Wet openbaarheid") == 3
+    assert match(trie, "de AWB", 3) == 6
+    assert match(trie, "de Awb") is None
+
+
+def test_wetnaam_in_artikel():
+    "test that known law names after an artikel reference end up in its details, using a name table we hand in"
+    old_trie = wetsuite.helpers.patterns._wetnamen_trie_cache  # pylint: disable=protected-access
+    wetsuite.helpers.patterns._wetnamen_trie_cache = wetsuite.helpers.patterns._build_trie(  # pylint: disable=protected-access
+        ["Algemene wet bestuursrecht", "Awb", "Wet open overheid"]
+    )
+    try:
+        matches = find_references("artikel 3:4, tweede lid, van de Algemene wet bestuursrecht en zo")
+        assert matches[0]["details"]["nameref"] == "Algemene wet bestuursrecht"
+        assert matches[0]["text"] == "artikel 3:4, tweede lid, van de Algemene wet bestuursrecht"
+
+        matches = find_references("artikel 5.1 Woo")
+        assert "nameref" not in matches[0]["details"]
+    finally:
+        wetsuite.helpers.patterns._wetnamen_trie_cache = old_trie  # pylint: disable=protected-access
+
+
+def test_wetnamen_trie_cache_concurrent(tmp_path, monkeypatch):
+    "test that building the law name trie in several places at once still leaves one whole cache file, and no temporary files"
+    monkeypatch.setattr(wetsuite.helpers.util, "wetsuite_dir", lambda: {"wetsuite_dir": str(tmp_path)})
+    monkeypatch.setattr(wetsuite.helpers.patterns, "_wetnamen", lambda: {"Wet naam %d"%i: "BWBR%07d"%i  for i in range(2000)})
+    old_trie = wetsuite.helpers.patterns._wetnamen_trie_cache  # pylint: disable=protected-access
+    try:
+        threads = list( threading.Thread(target=wetsuite.helpers.patterns._wetnamen_trie, kwargs={"refresh": True})  # pylint: disable=protected-access
+                        for _ in range(8) )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert os.listdir(tmp_path) == ["wetnamen_trie.pickle"]
+        with open(tmp_path / "wetnamen_trie.pickle", "rb") as f:
+            _, trie = pickle.load(f)
+        assert wetsuite.helpers.patterns._trie_longest_match(trie, "wet naam 1999") == 13  # pylint: disable=protected-access
+    finally:
+        wetsuite.helpers.patterns._wetnamen_trie_cache = old_trie  # pylint: disable=protected-access
+
+
+def _rechtspraak_sample_text():
+    " plain text of the rechtspraak.nl test documents, as a more realistic sample than the short strings above "
+    import test_patterns  # that's intentional pylint: disable=W0406
+
+    ret = []
+    for fn in ("rechtspraak1.xml", "rechtspraak2.xml"):
+        with open( os.path.join(os.path.dirname(test_patterns.__file__), "testfiles", fn), "rb" ) as f:
+            tree = wetsuite.helpers.etree.fromstring( f.read() )
+        ret.append( " ".join( wetsuite.helpers.etree.all_text_fragments(tree) ) )
+    return ret
+
+
+def test_find_references_rechtspraak():
+    "test that a real ruling gives a reasonable amount of artikel references, and that the results are stable between calls"
+    for text in _rechtspraak_sample_text():
+        matches = find_references(text)
+        assert len( list(m  for m in matches  if m["type"] == "artikel") ) > 5
+        assert matches == find_references(text)
+
+
+def test_find_references_many():
+    "test that the batch version gives the same as find_references, in-process and in worker processes, and that it resumes"
+    texts = _rechtspraak_sample_text() + ["ECLI:NL:HR:2005:AT4537 en artikel 3 van de Woo", b"artikel 5 Awb", "niets"]
+    docs = list( ("doc%d" % i, text)  for i, text in enumerate(texts) )
+    expect = dict( (key, find_references( text.decode('utf8') if isinstance(text, bytes) else text ))  for key, text in docs )
+
+    assert dict( find_references_many(docs, workers=1, chunksize=2) ) == expect
+
+    store = wetsuite.helpers.localdata.MsgpackKV(":memory:")
+    stats = find_references_many(docs[:3], dest_store=store, workers=2, chunksize=1)
+    assert (stats["done"], stats["skipped"], stats["errors"]) == (3, 0, 0)
+    stats = find_references_many(docs, dest_store=store, workers=2, chunksize=1)
+    assert (stats["done"], stats["skipped"], stats["errors"]) == (2, 3, 0)
+    assert dict( store.items() ) == expect
+
+    assert dict( find_references_many(docs, workers=1, artikel=False) )["doc2"][0]["type"] == "ecli"
+
+    stats = find_references_many([("bad", 5)], dest_store=wetsuite.helpers.localdata.MsgpackKV(":memory:"), workers=1)
+    assert stats["errors"] == 1
+
+
 def test_mark_up_spacy():
     " Test that article referencesm, detected via text, get marked up as entities on spacy docs"
     import spacy
@@ -200,3 +317,18 @@ def test_abbrev_count_results_case_insensitive():
         case_insensitive_explanations=True
     )
     assert results['ABV'] == {('A', 'bree', 'veation'): 3}
+
+
+if __name__ == '__main__':
+    # When run as a main script, this times find_references on the rechtspraak sample
+    sample = _rechtspraak_sample_text()
+    for func, kwargs in (
+        (find_references, {}),
+        (find_references, {"artikel": False}),
+    ):
+        start = time.time()
+        for _ in range(10):
+            for sample_text in sample:
+                func(sample_text, **kwargs)
+        took = time.time() - start
+        print(f" {func.__name__}({kwargs}) on {sum(len(t) for t in sample)} chars of rechtspraak text: {took/10:.3f}sec")
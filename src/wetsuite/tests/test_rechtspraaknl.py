@@ -3,10 +3,12 @@
 # import pytest
 
 import os
+import datetime
 
 import wetsuite.datacollect.rechtspraaknl
 
 import wetsuite.helpers.net
+import wetsuite.helpers.localdata
 import wetsuite.helpers.etree
 
 
@@ -39,6 +41,74 @@ def test_search():
     wetsuite.datacollect.rechtspraaknl.parse_search_results(results)
 
 
+def test_modified_ranges():
+    "test the splitting of date ranges that harvest() uses"
+    ranges = wetsuite.datacollect.rechtspraaknl._modified_ranges(  # pylint: disable=protected-access
+        datetime.datetime(2023, 1, 1), datetime.datetime(2023, 1, 3, 12), datetime.timedelta(days=1)
+    )
+    assert ranges == [
+        ("2023-01-01T00:00:00", "2023-01-02T00:00:00"),
+        ("2023-01-02T00:00:00", "2023-01-03T00:00:00"),
+        ("2023-01-03T00:00:00", "2023-01-03T12:00:00"),
+    ]
+
+
+def DISABLED_test_harvest(): # disabled because it fetches a few hundred documents
+    "test that harvest fetches into the store, and checkpoints"
+    content_store = wetsuite.helpers.localdata.LocalKV(":memory:", str, bytes)
+    checkpoint_store = wetsuite.helpers.localdata.LocalKV(":memory:", str, str)
+    entries = list(
+        wetsuite.datacollect.rechtspraaknl.harvest(
+            content_store,
+            datetime.datetime(2023, 11, 1, 12),
+            datetime.datetime(2023, 11, 1, 13),
+            checkpoint_store=checkpoint_store,
+        )
+    )
+    assert len(entries) > 0
+    assert len(content_store) > 0
+    assert checkpoint_store.get("rechtspraaknl_harvest_modified") == "2023-11-01T13:00:00"
+
+
+def test_harvest_retries_failures(monkeypatch):
+    "test that a fetch that failed is remembered and retried on the next call, even though the checkpoint moved past it"
+    def fake_search_all(params, rate_limiter=None):
+        if ("modified", "2023-01-01T00:00:00") in params:
+            return [{"ecli": "ECLI:NL:X:2023:%d" % i, "xml": "https://example.org/content?id=%d" % i}  for i in range(3)]
+        return []
+
+    fetched = []
+    def fake_download_many(urls, workers=4, rate_limiter=None):
+        for url in urls:
+            fetched.append(url)
+            if url.endswith("=1") and fetched.count(url) == 1:
+                yield url, None, ValueError("fails the first time")
+            else:
+                yield url, b"<xml/>", None
+
+    monkeypatch.setattr(wetsuite.datacollect.rechtspraaknl, "search_all", fake_search_all)
+    monkeypatch.setattr(wetsuite.helpers.net, "download_many", fake_download_many)
+    content_store = wetsuite.helpers.localdata.LocalKV(":memory:", str, bytes)
+    checkpoint_store = wetsuite.helpers.localdata.LocalKV(":memory:", str, str)
+
+    def harvest():
+        return list( wetsuite.datacollect.rechtspraaknl.harvest(
+            content_store, datetime.datetime(2023, 1, 1), datetime.datetime(2023, 1, 3),
+            checkpoint_store=checkpoint_store, max_per_sec=1000 ) )
+
+    entries = harvest()
+    assert len(entries) == 3
+    assert list( entry["xml"]  for entry in entries  if "error" in entry ) == ["https://example.org/content?id=1"]
+    assert "https://example.org/content?id=1" not in content_store
+    assert checkpoint_store.get("rechtspraaknl_harvest_modified") == "2023-01-03T00:00:00"
+
+    # the next call starts after the checkpoint, but does retry that one
+    entries = harvest()
+    assert entries == [{"ecli": "ECLI:NL:X:2023:1", "xml": "https://example.org/content?id=1"}]
+    assert "https://example.org/content?id=1" in content_store
+    assert harvest() == []
+
+
 def test_parse():
     "test that those documents parse without failing"
     import test_rechtspraaknl
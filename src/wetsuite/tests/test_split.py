@@ -30,6 +30,14 @@ _test_file_list = (  # these are test files also in the repo
 )
 
 
+def _test_file_bytes(fn):
+    "the contents of a file in the testfiles directory"
+    import test_split  # that's intentional pylint: disable=W0406
+
+    with open( os.path.join( os.path.dirname(test_split.__file__), "testfiles", fn ), "rb" ) as f:
+        return f.read()
+
+
 def test_ascii_fix():
     "test that this dumb fixing function does a thing, and does not break itself"
     assert b"UTF" in wetsuite.helpers.split.fix_ascii_blah(
@@ -140,6 +148,159 @@ def test_Fragments_notimplemented():
 
 
 
+def test_DocumentContext():
+    "test that the context parses once, and that decide() hands the same one to every candidate"
+    docbytes = _test_file_bytes("gmb.xml")
+
+    ctx = wetsuite.helpers.split.DocumentContext(docbytes)
+    assert ctx.is_xml
+    assert ctx.html_bytes is None
+    assert ctx.soup is None
+    assert ctx.stripped_tree is ctx.stripped_tree  # parsed only once
+
+    options = wetsuite.helpers.split.decide(docbytes)
+    assert len(options) > 0
+    assert len( set( id(procobj.context)  for _, procobj in options ) ) == 1
+
+    with pytest.raises(ValueError, match=r".*bytestrings.*"):
+        wetsuite.helpers.split.DocumentContext("")
+
+
+def test_DocumentContext_htmlzip():
+    "test that the context unpacks a .html.zip"
+    ctx = wetsuite.helpers.split.DocumentContext( _test_file_bytes("gmb.html.zip") )
+    assert b"<html" in ctx.html_bytes[:1000]
+    assert ctx.soup.find("body") is not None
+
+
+def test_fragments_leave_shared_tree_alone():
+    "test that asking for fragments twice gives the same, i.e. that splitting did not alter the shared parsed tree"
+    docbytes = _test_file_bytes("rechtspraak2.xml")
+    _, procobj = wetsuite.helpers.split.decide(docbytes)[0]
+    first = procobj.fragments()
+    assert any( "nr" in meta  and  meta["nr"] != ""  for meta, _, _ in first )
+    assert procobj.fragments() == first
+
+
+def test_candidate_classes():
+    "test that dispatch only suggests classes that declare they handle the document"
+    for fn, should, shouldnt in (
+        ("bwb_toestand.xml",  wetsuite.helpers.split.Fragments_XML_BWB,         wetsuite.helpers.split.Fragments_XML_OP_Gmb),
+        ("gmb.xml",           wetsuite.helpers.split.Fragments_XML_OP_Gmb,      wetsuite.helpers.split.Fragments_XML_BWB),
+        ("rechtspraak1.xml",  wetsuite.helpers.split.Fragments_XML_Rechtspraak, wetsuite.helpers.split.Fragments_HTML_Fallback),
+        ("gmb.html.zip",      wetsuite.helpers.split.Fragments_HTML_OP_Gmb,     wetsuite.helpers.split.Fragments_HTML_CVDR),
+        ("eggs.pdf",          wetsuite.helpers.split.Fragments_PDF_Fallback,    wetsuite.helpers.split.Fragments_XML_CVDR),
+    ):
+        ctx = wetsuite.helpers.split.DocumentContext( _test_file_bytes(fn) )
+        candidates = wetsuite.helpers.split._candidate_classes( ctx )  # pylint: disable=protected-access
+        assert should in candidates
+        assert shouldnt not in candidates
+
+    # a class that declares nothing is always asked
+    class Fragments_Anything(wetsuite.helpers.split.Fragments):
+        "test class"
+    assert Fragments_Anything in wetsuite.helpers.split._candidate_classes( ctx, [Fragments_Anything] )  # pylint: disable=protected-access
+
+
+def test_dispatch_without_tree():
+    "test that marker tags are found without parsing into a tree, and that deciding on a BWB document never makes one"
+    ctx = wetsuite.helpers.split.DocumentContext( _test_file_bytes("gmb.xml") )
+    assert ctx.find_tags( ["gemeenteblad", "staatscourant"] ) == {"gemeenteblad"}
+    assert ctx.tag_names == set( elem.tag  for elem in wetsuite.helpers.etree.fromstring_stripped( ctx.xml_bytes ).iter()  if isinstance(elem.tag, str) )
+    assert ctx.find_tags( ["gemeenteblad", "kop"] ) == {"gemeenteblad", "kop"}
+
+    docbytes = _test_file_bytes("bwb_toestand.xml")
+    ctx = wetsuite.helpers.split.DocumentContext( docbytes )
+    assert wetsuite.helpers.split.Fragments_XML_BWB in wetsuite.helpers.split._candidate_classes( ctx )  # pylint: disable=protected-access
+    options = wetsuite.helpers.split.decide( docbytes )
+    assert options[0][1].__class__ is wetsuite.helpers.split.Fragments_XML_BWB
+    options[0][1].fragments()
+    for _, procobj in options:
+        assert procobj.context._tree is None  and  procobj.context._stripped_tree is None  # pylint: disable=protected-access
+
+
+def test_split_store():
+    "test that split_store splits into the destination, records errors, and skips what it did before"
+    import wetsuite.helpers.localdata
+
+    source = wetsuite.helpers.localdata.LocalKV(":memory:", str, bytes)
+    for fn in ("gmb.xml", "stcrt.xml", "rechtspraak1.xml"):
+        source.put(fn, _test_file_bytes(fn))
+    source.put("broken.xml", b"<?xml version='1.0'?><a>")
+    # understood as rechtspraak, but the splitter chokes on the empty <nr/>
+    source.put("failing.xml", b"<?xml version='1.0'?><open-rechtspraak><uitspraak><section><para><nr/></para></section></uitspraak></open-rechtspraak>")
+    dest   = wetsuite.helpers.localdata.MsgpackKV(":memory:")
+    errors = wetsuite.helpers.localdata.LocalKV(":memory:", str, str)
+
+    stats = wetsuite.helpers.split.split_store(source, dest, workers=2, chunksize=1, error_store=errors)
+    assert stats["done"] == 4  # broken.xml is not understood, which gives an empty list, not an error
+    assert stats["errors"] == 1
+    assert dest.get("gmb.xml") == wetsuite.helpers.split.feeling_lucky( source.get("gmb.xml") )
+    assert "failing.xml" not in dest
+    assert list( errors.keys() ) == ["failing.xml"]
+    assert "Error" in errors.get("failing.xml")
+
+    # both the done and the failed ones are skipped next time...
+    stats = wetsuite.helpers.split.split_store(source, dest, workers=1, error_store=errors)
+    assert (stats["done"], stats["errors"], stats["skipped"]) == (0, 0, 5)
+
+    # ...unless we ask to retry the errors
+    stats = wetsuite.helpers.split.split_store(source, dest, workers=1, error_store=errors, retry_errors=True)
+    assert (stats["done"], stats["errors"], stats["skipped"]) == (0, 1, 4)
+
+
+def test_iter_fragments():
+    "test that iter_fragments gives the same text as fragments, and leaves out raw and paths when asked"
+    import types
+
+    for fn in ("gmb.xml", "cvdr_example1.xml", "rechtspraak1.xml", "stcrt.html"):
+        docbytes = _test_file_bytes(fn)
+        for _, procobj in wetsuite.helpers.split.decide(docbytes):
+            gen = procobj.iter_fragments(raw=False, paths=False)
+            assert isinstance(gen, types.GeneratorType)
+            lean = list(gen)
+            full = procobj.fragments()
+            assert [text for _, _, text in lean] == [text for _, _, text in full]
+            if "xml" in fn:
+                for meta, inter, _ in lean:
+                    assert "raw" not in inter
+                    assert "path" not in meta
+
+
+def test_feeling_lucky_cache():
+    "test that feeling_lucky's cache gives the same, is actually used, and is invalidated by a version change"
+    import wetsuite.helpers.localdata
+
+    docbytes = _test_file_bytes("gmb.xml")
+    cache = wetsuite.helpers.localdata.MsgpackKV(":memory:")
+
+    uncached = wetsuite.helpers.split.feeling_lucky(docbytes)
+    assert wetsuite.helpers.split.feeling_lucky(docbytes, cache_store=cache) == uncached
+    assert len(cache) == 2  # the decision, and the fragments
+    assert wetsuite.helpers.split.feeling_lucky(docbytes, cache_store=cache) == uncached
+
+    # poke a different value into the cache, to see that that is what we get back
+    for key in cache.keys():
+        if key.endswith(":flat"):
+            cache.put(key, ["from cache"])
+    assert wetsuite.helpers.split.feeling_lucky(docbytes, cache_store=cache) == ["from cache"]
+
+    # ...until the class's version changes
+    cls = wetsuite.helpers.split.Fragments_XML_OP_Gmb
+    old_version = cls.version
+    try:
+        cls.version = old_version + 1
+        assert wetsuite.helpers.split.feeling_lucky(docbytes, cache_store=cache) == uncached
+    finally:
+        cls.version = old_version
+
+    full = wetsuite.helpers.split.feeling_lucky(docbytes, flattened=False, cache_store=cache)
+    assert full == wetsuite.helpers.split.feeling_lucky(docbytes, flattened=False, cache_store=cache)
+    assert [text for _, _, text in full] == uncached
+
+    assert wetsuite.helpers.split.feeling_lucky(b"not a document", cache_store=cache) == []
+    assert wetsuite.helpers.split.feeling_lucky(b"not a document", cache_store=cache) == []
+
 
 if __name__ == '__main__':
     # When run as a main script this profiles (primarily) test_decide and test_fragments
@@ -157,6 +318,12 @@ if __name__ == '__main__':
         test_fragments,
         test_Fragments_nonbytes,
         test_Fragments_notimplemented,
+        test_DocumentContext,
+        test_DocumentContext_htmlzip,
+        test_candidate_classes,
+        test_split_store,
+        test_iter_fragments,
+        test_feeling_lucky_cache,
     ):
         start = time.time()
         func()
@@ -22,12 +22,15 @@ from wetsuite.helpers.strings import (
     interpret_ordinal_nl,
     ordinal_nl,
     simple_tokenize,
+    iter_tokens,
+    tokenize_many,
     simplify_whitespace,
 
     ngram_generate,
     ngram_count,
     ngram_matchcount,
     ngram_sort_by_matches,
+    NgramIndex,
 
     count_normalized,
     count_case_insensitive,
@@ -239,6 +242,18 @@ def test_simple_tokenize():
     ]
 
 
+def test_tokenize_variants():
+    "test that the generator, offset, batch and keep-punctuation variants agree with simple_tokenize"
+    text = "Zie art. 3 (Wet W.P.), 'quoted' \u201cen\u201d verder-op"
+    assert simple_tokenize(text) == ['Zie', 'art', '3', 'Wet', 'W', 'P', "'quoted'", 'en', 'verder', 'op']
+    assert simple_tokenize(text, keep_punctuation=True, strip_quotes=True) == ['Zie', 'art.', '3', '(Wet', 'W.P.)', 'quoted', 'en', 'verder', 'op']
+    assert list( iter_tokens(text) ) == simple_tokenize(text)
+    for start, end, token in iter_tokens(text, strip_quotes=True, offsets=True):
+        assert text[start:end] == token
+    assert list( tokenize_many([text, '', 'a b']) ) == [simple_tokenize(text), [], ['a', 'b']]
+    assert list( tokenize_many([text], keep_punctuation=True, strip_quotes=True) ) == [simple_tokenize(text, keep_punctuation=True, strip_quotes=True)]
+
+
 def test_interpret_ordinal_nl():
     'do we e.g. turn "vierde" into 4?'
     assert interpret_ordinal_nl("vierde") == 4
@@ -314,6 +329,20 @@ def test_ngram_sort_by_matches_with_scores():
     # those scores might change with the implementation, maybe only test that we have str,int tuples?
 
 
+def test_ngram_index():
+    "test that the precomputed index gives the same as ngram_sort_by_matches, also when asking for only the best few"
+    options = ['spork', 'knife', 'spoon', 'fork', 'forklift', 'spoon', 'fork']
+    index = NgramIndex( options )
+    assert len(index) == 7
+    for query in ('for', 'spoon', 'kni', 'xyz', ''):
+        full = ngram_sort_by_matches( query, options, with_scores=True )
+        assert index.sort_by_matches( query, with_scores=True ) == full
+        assert ngram_sort_by_matches( query, index, with_scores=True ) == full
+        for k in (0, 1, 3, 7, 10):
+            assert index.sort_by_matches( query, k=k, with_scores=True ) == full[:k]
+    assert list( index.scores('for') ) == [4, 1, 1, 10, 10, 1, 10]   # in option order
+
+
 def test_count_normalized():
     "test the count-normalized-form function"
 
@@ -415,3 +444,22 @@ def test_remove_deheteen():
 
 #def test_remove_initial():
 #    remove_initial
+
+
+if __name__ == '__main__':
+    # When run as a main script, this is a micro-benchmark of the tokenizers
+    import re
+    import time
+    sample = ["Het college van burgemeester en wethouders (hierna: het college) heeft bij besluit van 3 mei 2021, "
+              "verzonden op 4 mei 2021, het verzoek \u2018om handhaving\u2019 afgewezen; zie art. 5:31d Awb." * 20] * 2000
+    old_pattern = r'[\s!@#$%^&*()\[\]":;/.,?\xab\xbb\u2018\u2019\u201a\u201b\u201c\u201d\u201e\u201f\u2039\u203a\u2358\u275b\u275c\u275d\u275e\u275f\u2760\u276e\u276f\u2e42\u301d\u301e\u301f\uff02\U0001f676\U0001f677\U0001f678-]+'
+    for name, func in (
+        ('re.split and filter (the old way)', lambda texts: [list(e for e in re.split(old_pattern, text) if len(e) > 0)  for text in texts]),
+        ('simple_tokenize', lambda texts: [simple_tokenize(text)  for text in texts]),
+        ('tokenize_many', lambda texts: list(tokenize_many(texts))),
+        ('iter_tokens', lambda texts: [sum(1 for _ in iter_tokens(text))  for text in texts]),
+    ):
+        start = time.time()
+        func(sample)
+        took = time.time() - start
+        print(f" {name:40s} {sum(len(t) for t in sample)/took/1e6:6.1f} Mchars/sec")
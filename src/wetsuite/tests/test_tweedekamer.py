@@ -2,6 +2,7 @@
 
 import pytest
 import wetsuite.datacollect.tweedekamer_nl
+import wetsuite.helpers.etree
 
 
 def DISABLED_test_fetch_all():  # disabled because it takes ~20 sec
@@ -19,3 +20,49 @@ def DISABLED_test_fetch_resource():
         wetsuite.datacollect.tweedekamer_nl.fetch_resource('sdfsdf')
 
     wetsuite.datacollect.tweedekamer_nl.fetch_resource('2d1a7837-c0c4-4971-9e32-feacaa50961b')
+
+
+_feed_page = b'''<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Zaal</title>
+  <link rel="self" href="https://gegevensmagazijn.tweedekamer.nl/SyncFeed/2.0/Feed?category=Zaal"/>
+  <entry>
+    <title>11111111-aaaa-bbbb-cccc-000000000001</title>
+    <id>https://gegevensmagazijn.tweedekamer.nl/SyncFeed/2.0/Entiteiten/11111111-aaaa-bbbb-cccc-000000000001</id>
+    <updated>2020-01-01T00:00:00Z</updated>
+    <category term="zaal"/>
+    <link rel="self" href="https://gegevensmagazijn.tweedekamer.nl/SyncFeed/2.0/Entiteiten/11111111-aaaa-bbbb-cccc-000000000001"/>
+    <content type="application/xml">
+      <zaal xmlns="http://www.tweedekamer.nl/xsd/tkData/v1-0" id="11111111-aaaa-bbbb-cccc-000000000001">
+        <naam>Thorbeckezaal</naam><reservering ref="22222222-aaaa-bbbb-cccc-000000000002"/>
+      </zaal>
+    </content>
+  </entry>
+  <entry>
+    <title>11111111-aaaa-bbbb-cccc-000000000003</title>
+    <id>https://gegevensmagazijn.tweedekamer.nl/SyncFeed/2.0/Entiteiten/11111111-aaaa-bbbb-cccc-000000000003</id>
+    <updated>2020-01-02T00:00:00Z</updated>
+    <category term="zaal"/>
+    <content type="application/xml">
+      <zaal xmlns="http://www.tweedekamer.nl/xsd/tkData/v1-0" id="11111111-aaaa-bbbb-cccc-000000000003">
+        <naam>Groen van Prinstererzaal</naam>
+      </zaal>
+    </content>
+  </entry>
+  <link rel="next" href="https://gegevensmagazijn.tweedekamer.nl/SyncFeed/2.0/Feed?category=Zaal&amp;skiptoken=12345"/>
+</feed>'''
+
+
+def test_iterparse_feed_page():
+    "test that the streaming parse gives the same as the merge-then-parse route, and finds the next link"
+    gen = wetsuite.datacollect.tweedekamer_nl._iterparse_feed_page(_feed_page)  # pylint: disable=protected-access
+    streamed = []
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            streamed.append(next(gen))
+    assert stop.value.value == "https://gegevensmagazijn.tweedekamer.nl/SyncFeed/2.0/Feed?category=Zaal&skiptoken=12345"
+
+    merged_tree = wetsuite.datacollect.tweedekamer_nl.merge_etrees([wetsuite.helpers.etree.fromstring(_feed_page)])
+    assert streamed == wetsuite.datacollect.tweedekamer_nl.entry_dicts(merged_tree)
+    assert streamed[0]["content"]["naam"] == "Thorbeckezaal"
+    assert streamed[0]["content"]["refs"] == {"reservering": "22222222-aaaa-bbbb-cccc-000000000002"}
@@ -324,3 +324,38 @@ def test__filetype():
         with open( test_ffn, 'rb' ) as f:
             filedata = f.read()
             assert wetsuite.helpers.util._filetype( filedata ) == expected_type_str
+
+
+def test_chunked():
+    "test grouping into lists"
+    assert list( wetsuite.helpers.util.chunked(range(5), 2) ) == [[0, 1], [2, 3], [4]]
+    assert list( wetsuite.helpers.util.chunked([], 2) ) == []
+    with pytest.raises(ValueError):
+        list( wetsuite.helpers.util.chunked(range(5), 0) )
+
+
+def test_map_chunks():
+    "test that in-process and in worker processes give the same, and that the input is not read far ahead of the workers"
+    chunks = list( wetsuite.helpers.util.chunked(range(100), 7) )
+    assert list( wetsuite.helpers.util.map_chunks(sum, chunks, workers=1) ) == list( sum(chunk) for chunk in chunks )
+    assert sorted( wetsuite.helpers.util.map_chunks(sum, chunks, workers=2, args=(1000,)) ) == sorted( sum(chunk) + 1000 for chunk in chunks )
+
+    read = []
+    def reading():
+        for chunk in chunks:
+            read.append( chunk )
+            yield chunk
+    results = wetsuite.helpers.util.map_chunks(sum, reading(), workers=2)
+    next(results)
+    assert len(read) <= 4
+    results.close()
+
+
+def test_progress_stats():
+    "test that finish() adds the timing"
+    progress = wetsuite.helpers.util.ProgressStats()
+    progress.stats["done"] += 3
+    progress.report()
+    stats = progress.finish()
+    assert stats["done"] == 3
+    assert stats["seconds"] >= 0  and  stats["per_sec"] > 0